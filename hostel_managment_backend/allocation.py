@@ -0,0 +1,481 @@
+import asyncio
+import heapq
+import sys
+import time
+
+from async_database import get_connection, close_pool
+
+
+class AllocationError(Exception):
+    """Allocation could not be made (no free bed, bed taken, student missing...)."""
+
+
+# Oldest free bed first. FOR UPDATE SKIP LOCKED lets concurrent allocations each
+# grab a *different* free bed instead of queueing on (or double-booking) the same row.
+FREE_BED_QUERY = """
+    SELECT bed_id, room_no, bed_no
+    FROM bed
+    WHERE occupied_by IS NULL
+    ORDER BY bed_id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+"""
+
+# same, limited to one room
+FREE_BED_IN_ROOM_QUERY = """
+    SELECT bed_id, room_no, bed_no
+    FROM bed
+    WHERE room_no = %s AND occupied_by IS NULL
+    ORDER BY bed_id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+"""
+
+# every free bed for /auto-allocate/bulk; beds being claimed by single /auto-allocate
+# calls right now are skipped, not waited on
+BULK_FREE_BEDS_QUERY = """
+    SELECT bed_id, room_no, bed_no
+    FROM bed
+    WHERE occupied_by IS NULL
+    ORDER BY room_no, bed_no
+    FOR UPDATE SKIP LOCKED
+"""
+
+CHOSEN_BED_QUERY = """
+    SELECT bed_id, room_no, bed_no, occupied_by
+    FROM bed
+    WHERE room_no = %s AND bed_no = %s
+    FOR UPDATE
+"""
+
+
+async def _lock_pending_student(cursor, usn):
+    # row lock on the student serialises two allocations for the same USN
+    await cursor.execute(
+        "SELECT room_allocation_status FROM student WHERE usn = %s FOR UPDATE",
+        (usn,),
+    )
+    student = await cursor.fetchone()
+    if not student:
+        raise AllocationError(f"Student {usn} not found")
+    if student["room_allocation_status"] == "Allocated":
+        raise AllocationError(f"Student {usn} is already allocated")
+
+
+async def _assign(cursor, usn, bed):
+    await cursor.execute(
+        "INSERT INTO allocation (usn, room_no, bed_no) VALUES (%s, %s, %s)",
+        (usn, bed["room_no"], bed["bed_no"]),
+    )
+    await cursor.execute(
+        "UPDATE room SET no_of_occupancy = no_of_occupancy + 1 WHERE room_no = %s",
+        (bed["room_no"],),
+    )
+    await cursor.execute(
+        "UPDATE student SET room_allocation_status = 'Allocated' WHERE usn = %s",
+        (usn,),
+    )
+    await cursor.execute(
+        "UPDATE bed SET occupied_by = %s WHERE bed_id = %s",
+        (usn, bed["bed_id"]),
+    )
+
+
+async def allocate_free_bed(conn, usn, room_no=None):
+    """
+    Atomically give `usn` the first free bed (in `room_no` only, if given).
+    Returns {"usn", "room_no", "bed_no"}; raises AllocationError if nothing can be allocated.
+    """
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        await _lock_pending_student(cursor, usn)
+
+        if room_no is None:
+            await cursor.execute(FREE_BED_QUERY)
+        else:
+            await cursor.execute(FREE_BED_IN_ROOM_QUERY, (room_no,))
+        bed = await cursor.fetchone()
+        if not bed:
+            raise AllocationError("No vacant beds available!")
+
+        await _assign(cursor, usn, bed)
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {"usn": usn, "room_no": bed["room_no"], "bed_no": bed["bed_no"]}
+
+
+async def allocate_bed(conn, usn, room_no, bed_no):
+    """Atomically give `usn` a specific bed; fails if someone else already holds it."""
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        await _lock_pending_student(cursor, usn)
+
+        await cursor.execute(CHOSEN_BED_QUERY, (room_no, bed_no))
+        bed = await cursor.fetchone()
+        if not bed:
+            raise AllocationError(f"Room {room_no} has no bed {bed_no}")
+        if bed["occupied_by"] is not None:
+            raise AllocationError(f"Room {room_no}, Bed {bed_no} is already occupied")
+
+        await _assign(cursor, usn, bed)
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {"usn": usn, "room_no": bed["room_no"], "bed_no": bed["bed_no"]}
+
+
+async def deallocate(conn, usn):
+    """Atomically free the bed held by `usn` and put the student back to Pending."""
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        await cursor.execute("SELECT room_no, bed_no FROM allocation WHERE usn = %s FOR UPDATE", (usn,))
+        allocation = await cursor.fetchone()
+        if not allocation:
+            raise AllocationError(f"Student {usn} has no room allocation")
+
+        await cursor.execute("UPDATE bed SET occupied_by = NULL WHERE occupied_by = %s", (usn,))
+        await cursor.execute("DELETE FROM allocation WHERE usn = %s", (usn,))
+        await cursor.execute(
+            "UPDATE room SET no_of_occupancy = GREATEST(no_of_occupancy - 1, 0) WHERE room_no = %s",
+            (allocation["room_no"],),
+        )
+        await cursor.execute(
+            "UPDATE student SET room_allocation_status = 'Pending' WHERE usn = %s",
+            (usn,),
+        )
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {"usn": usn, "room_no": allocation["room_no"], "bed_no": allocation["bed_no"]}
+
+
+# ---------------------------------------------------------------------
+# Bulk allocation: read once, plan in memory, write in batches
+# ---------------------------------------------------------------------
+
+BATCH_SIZE = 500
+
+ALLOCATION_POLICIES = {}
+
+
+def allocation_policy(name):
+    """Register a bulk allocation policy: fn(students, free_beds, rooms) -> [(usn, bed), ...]"""
+    def register(fn):
+        ALLOCATION_POLICIES[name] = fn
+        return fn
+    return register
+
+
+def _beds_by_room(free_beds):
+    by_room = {}
+    for bed in free_beds:
+        by_room.setdefault(bed["room_no"], []).append(bed)
+    return by_room
+
+
+def _fullest_rooms_first(free_beds, rooms):
+    # rooms that are already partly occupied get topped up before empty ones are opened
+    by_room = _beds_by_room(free_beds)
+    order = sorted(by_room, key=lambda r: (-rooms.get(r, {}).get("no_of_occupancy", 0), r))
+    return [bed for room_no in order for bed in by_room[room_no]]
+
+
+@allocation_policy("fill_rooms")
+def fill_rooms(students, free_beds, rooms):
+    return list(zip((s["usn"] for s in students), _fullest_rooms_first(free_beds, rooms)))
+
+
+@allocation_policy("spread")
+def spread(students, free_beds, rooms):
+    # always place the next student in the room with the fewest occupants so far
+    by_room = _beds_by_room(free_beds)
+    heap = [(rooms.get(r, {}).get("no_of_occupancy", 0), r) for r in by_room]
+    heapq.heapify(heap)
+
+    plan = []
+    for student in students:
+        if not heap:
+            break
+        occupied, room_no = heapq.heappop(heap)
+        plan.append((student["usn"], by_room[room_no].pop(0)))
+        if by_room[room_no]:
+            heapq.heappush(heap, (occupied + 1, room_no))
+    return plan
+
+
+def _grouped(key):
+    # same-group students are placed on consecutive beds, so they end up sharing rooms
+    def policy(students, free_beds, rooms):
+        ordered = sorted(students, key=lambda s: (key(s), s["usn"]))
+        return fill_rooms(ordered, free_beds, rooms)
+    return policy
+
+
+allocation_policy("by_department")(_grouped(lambda s: (s["department_name"] or "", s["year"] or 0)))
+allocation_policy("by_year")(_grouped(lambda s: (s["year"] or 0, s["department_name"] or "")))
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def bulk_allocate(conn, policy="fill_rooms", usns=None):
+    """
+    Place pending students (all of them when usns is None, else just `usns`) in one transaction.
+    Returns {"policy", "placed", "unplaced", "allocations"}.
+    """
+    plan_fn = ALLOCATION_POLICIES.get(policy)
+    if plan_fn is None:
+        raise AllocationError(f"Unknown policy '{policy}' — use one of {sorted(ALLOCATION_POLICIES)}")
+    # an empty list must never widen to "everyone": only None means all pending students
+    if usns is not None and not usns:
+        raise AllocationError("No students to allocate — leave out usns to place every pending student")
+
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        # 1️⃣ read everything once
+        query = """
+            SELECT usn, department_name, year
+            FROM student
+            WHERE room_allocation_status = 'Pending'
+        """
+        params = None
+        if usns is not None:
+            query += f" AND usn IN ({', '.join(['%s'] * len(usns))})"
+            params = list(usns)
+        await cursor.execute(query + " ORDER BY usn FOR UPDATE", params)
+        students = await cursor.fetchall()
+
+        await cursor.execute(BULK_FREE_BEDS_QUERY)
+        free_beds = await cursor.fetchall()
+
+        await cursor.execute("SELECT room_no, no_of_beds, no_of_occupancy FROM room")
+        rooms = {r["room_no"]: r for r in await cursor.fetchall()}
+
+        # 2️⃣ plan in memory
+        plan = plan_fn(students, free_beds, rooms)
+
+        # 3️⃣ write in multi-row batches
+        for batch in _chunks(plan):
+            await cursor.executemany(
+                "INSERT INTO allocation (usn, room_no, bed_no) VALUES (%s, %s, %s)",
+                [(usn, bed["room_no"], bed["bed_no"]) for usn, bed in batch],
+            )
+
+            # one UPDATE for the whole batch, by primary key (no upsert: VALUES() in
+            # ON DUPLICATE KEY UPDATE is deprecated since MySQL 8.0.20, and its row-alias
+            # replacement stops aiomysql from sending a multi-row INSERT)
+            cases = " ".join(["WHEN %s THEN %s"] * len(batch))
+            await cursor.execute(
+                f"UPDATE bed SET occupied_by = CASE bed_id {cases} END "
+                f"WHERE bed_id IN ({', '.join(['%s'] * len(batch))})",
+                [v for usn, bed in batch for v in (bed["bed_id"], usn)] + [bed["bed_id"] for _, bed in batch],
+            )
+
+            await cursor.execute(
+                f"UPDATE student SET room_allocation_status = 'Allocated' "
+                f"WHERE usn IN ({', '.join(['%s'] * len(batch))})",
+                [usn for usn, _ in batch],
+            )
+
+        added = {}
+        for _, bed in plan:
+            added[bed["room_no"]] = added.get(bed["room_no"], 0) + 1
+        for batch in _chunks(list(added.items())):
+            cases = " ".join(["WHEN %s THEN %s"] * len(batch))
+            await cursor.execute(
+                f"UPDATE room SET no_of_occupancy = no_of_occupancy + CASE room_no {cases} END "
+                f"WHERE room_no IN ({', '.join(['%s'] * len(batch))})",
+                [v for pair in batch for v in pair] + [room_no for room_no, _ in batch],
+            )
+
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {
+        "policy": policy,
+        "placed": len(plan),
+        "unplaced": len(students) - len(plan),
+        "allocations": [{"usn": usn, "room_no": bed["room_no"], "bed_no": bed["bed_no"]} for usn, bed in plan],
+    }
+
+
+# ---------------------------------------------------------------------
+# Stress check: python allocation.py [students] [concurrency]
+#
+# Creates a scratch room plus STRESS* students, fires concurrent
+# auto-allocations limited to that room and checks no bed was handed
+# out twice. Nothing outside the scratch room is read or touched, and
+# everything it creates is deleted afterwards.
+# tests/test_allocation.py runs the same check under pytest.
+# ---------------------------------------------------------------------
+
+STRESS_ROOM = 999999
+
+
+async def run_stress(students, concurrency):
+    """
+    Concurrent allocate_free_bed() calls for `students` students into a scratch room with
+    fewer beds. Returns {"elapsed", "outcomes", "double_booked", "mismatched", "occupancy", "used"}.
+    """
+    conn = await get_connection()
+    if conn is None:
+        raise AllocationError("Database connection failed")
+
+    usns = [f"STRESS{i:05d}" for i in range(students)]
+    beds = students // 2 + 1   # fewer beds than students, so some allocations must fail cleanly
+    cursor = await conn.cursor()
+    try:
+        await cursor.execute("SELECT 1 FROM room WHERE room_no = %s", (STRESS_ROOM,))
+        if await cursor.fetchone():
+            raise AllocationError(f"Room {STRESS_ROOM} already exists — refusing to use it as the scratch room")
+        await cursor.execute(
+            "INSERT INTO room (room_no, no_of_beds, no_of_occupancy) VALUES (%s, %s, 0)",
+            (STRESS_ROOM, beds),
+        )
+        await cursor.executemany(
+            "INSERT INTO bed (room_no, bed_no, occupied_by) VALUES (%s, %s, %s)",
+            [(STRESS_ROOM, b, None) for b in range(1, beds + 1)],
+        )
+        await cursor.executemany(
+            "INSERT INTO student (usn, name, student_mobile, email, password, department_name, year) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [(u, u, "0", f"{u.lower()}@stress.test", u, "STRESS", 1) for u in usns],
+        )
+    finally:
+        await cursor.close()
+        await conn.close()
+
+    gate = asyncio.Semaphore(concurrency)
+    outcomes = {"ok": 0, "no_bed": 0, "error": 0}
+
+    async def one(usn):
+        async with gate:
+            c = await get_connection()
+            if c is None:
+                outcomes["error"] += 1
+                return
+            try:
+                await allocate_free_bed(c, usn, room_no=STRESS_ROOM)
+                outcomes["ok"] += 1
+            except AllocationError:
+                outcomes["no_bed"] += 1
+            except Exception as e:
+                outcomes["error"] += 1
+                print(f"   ❌ {usn}: {e}")
+            finally:
+                await c.close()
+
+    conn = None
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(u) for u in usns))
+        elapsed = time.perf_counter() - started
+
+        conn = await get_connection()
+        if conn is None:
+            raise AllocationError("Database connection failed")
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute("""
+            SELECT bed_no, COUNT(*) AS holders
+            FROM allocation
+            WHERE room_no = %s
+            GROUP BY bed_no
+            HAVING COUNT(*) > 1
+        """, (STRESS_ROOM,))
+        double_booked = await cursor.fetchall()
+
+        await cursor.execute("""
+            SELECT COUNT(*) AS n FROM bed b
+            LEFT JOIN allocation a ON a.usn = b.occupied_by
+            WHERE b.room_no = %s AND b.occupied_by IS NOT NULL
+              AND (a.usn IS NULL OR a.room_no <> b.room_no OR a.bed_no <> b.bed_no)
+        """, (STRESS_ROOM,))
+        mismatched = (await cursor.fetchone())["n"]
+
+        await cursor.execute(
+            "SELECT no_of_occupancy, (SELECT COUNT(*) FROM bed WHERE room_no = %s AND occupied_by IS NOT NULL) AS used "
+            "FROM room WHERE room_no = %s",
+            (STRESS_ROOM, STRESS_ROOM),
+        )
+        room = await cursor.fetchone()
+        await cursor.close()
+    finally:
+        # clean up: only rows this run created (every allocation went to the scratch room)
+        if conn is None:
+            conn = await get_connection()
+        if conn is not None:
+            cursor = await conn.cursor()
+            placeholders = ", ".join(["%s"] * len(usns))
+            await cursor.execute(f"DELETE FROM allocation WHERE usn IN ({placeholders})", usns)
+            await cursor.execute("DELETE FROM bed WHERE room_no = %s", (STRESS_ROOM,))
+            await cursor.execute(f"DELETE FROM student WHERE usn IN ({placeholders})", usns)
+            await cursor.execute("DELETE FROM room WHERE room_no = %s", (STRESS_ROOM,))
+            await conn.commit()
+            await cursor.close()
+            await conn.close()
+
+    return {
+        "elapsed": elapsed,
+        "outcomes": outcomes,
+        "beds": beds,
+        "double_booked": double_booked,
+        "mismatched": mismatched,
+        "occupancy": room["no_of_occupancy"],
+        "used": room["used"],
+    }
+
+
+async def _stress(students, concurrency):
+    try:
+        result = await run_stress(students, concurrency)
+    except AllocationError as e:
+        print(f"❌ {e}")
+        return False
+
+    outcomes, elapsed = result["outcomes"], result["elapsed"]
+    print(f"\n{students} concurrent auto-allocations ({concurrency} in flight) in {elapsed:.2f}s "
+          f"→ {students / elapsed:.0f} allocations/s")
+    print(f"   allocated: {outcomes['ok']}, no bed left: {outcomes['no_bed']}, errors: {outcomes['error']}")
+    print(f"   double-booked beds: {len(result['double_booked'])}, bed/allocation mismatches: {result['mismatched']}")
+    print(f"   stress room occupancy counter: {result['occupancy']} (beds actually used: {result['used']})")
+
+    return (not result["double_booked"] and result["mismatched"] == 0
+            and result["occupancy"] == result["used"] and outcomes["error"] == 0)
+
+
+async def _main(argv):
+    students = int(argv[1]) if len(argv) > 1 else 300
+    concurrency = int(argv[2]) if len(argv) > 2 else 100
+    try:
+        return await _stress(students, concurrency)
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(_main(sys.argv))
+    print("\n✅ No bed was assigned twice" if ok else "\n❌ Allocation stress check FAILED")
+    sys.exit(0 if ok else 1)
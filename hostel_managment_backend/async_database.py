@@ -0,0 +1,371 @@
+import asyncio
+import logging
+import os
+import time
+
+import mysql.connector
+
+import database
+import metrics
+from database import DB_CONFIG, POOL_SIZE, POOL_TIMEOUT, POOL_MAX_LIFETIME, CONNECT_TIMEOUT, health
+from logging_config import SAMPLED
+from replicas import router
+
+try:
+    import aiomysql
+    import pymysql
+except ImportError:  # aiomysql is only needed for HOSTEL_DB_MODE=async
+    aiomysql = None
+    pymysql = None
+
+log = logging.getLogger(__name__)
+
+
+# "async" -> aiomysql pool, handlers never block the event loop
+# "sync"  -> the original mysql.connector pool, each call pushed to a worker thread
+#            (kept so the two paths can be benchmarked against each other)
+DB_MODE = os.environ.get("HOSTEL_DB_MODE", "async").lower()
+if DB_MODE == "async" and aiomysql is None:
+    log.warning("HOSTEL_DB_MODE=async but aiomysql is not installed (pip install aiomysql) — using sync mode")
+    DB_MODE = "sync"
+
+# Both drivers' errors, so handlers can keep writing `except Error as e`
+Error = (mysql.connector.Error,) + ((pymysql.err.MySQLError,) if pymysql else ())
+
+
+# ---------------------------------------------------------------------
+# Cursor / connection wrappers with one awaitable API for both drivers
+# ---------------------------------------------------------------------
+
+class AsyncCursor:
+    """
+    Awaitable cursor. Every statement and fetch is timed and booked against the
+    current request in metrics (statements, DB time, rows).
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    async def execute(self, query, params=None):
+        started = time.perf_counter()
+        try:
+            await self._execute(query, params)
+        finally:
+            metrics.record_statement(query, time.perf_counter() - started)
+
+    async def executemany(self, query, seq_params):
+        started = time.perf_counter()
+        try:
+            await self._executemany(query, seq_params)
+        finally:
+            metrics.record_statement(query, time.perf_counter() - started)
+
+    async def _timed_fetch(self, fetch, *args):
+        started = time.perf_counter()
+        rows = await fetch(*args)
+        # unbuffered cursors do their network reads here, so fetch time counts as DB time
+        metrics.record_statement_time(time.perf_counter() - started)
+        return rows
+
+    async def fetchone(self):
+        row = await self._timed_fetch(self._fetchone)
+        if row is not None:
+            metrics.record_rows(1)
+        return row
+
+    async def fetchmany(self, size):
+        rows = await self._timed_fetch(self._fetchmany, size)
+        metrics.record_rows(len(rows))
+        return rows
+
+    async def fetchall(self):
+        rows = await self._timed_fetch(self._fetchall)
+        metrics.record_rows(len(rows))
+        return rows
+
+
+class _AiomysqlCursor(AsyncCursor):
+    async def _execute(self, query, params=None):
+        await self._cursor.execute(query, params)
+
+    async def _executemany(self, query, seq_params):
+        await self._cursor.executemany(query, seq_params)
+
+    async def _fetchone(self):
+        return await self._cursor.fetchone()
+
+    async def _fetchmany(self, size):
+        return await self._cursor.fetchmany(size)
+
+    async def _fetchall(self):
+        return await self._cursor.fetchall()
+
+    async def close(self):
+        await self._cursor.close()
+
+
+class _ThreadedCursor(AsyncCursor):
+    async def _execute(self, query, params=None):
+        await asyncio.to_thread(self._cursor.execute, query, params)
+
+    async def _executemany(self, query, seq_params):
+        await asyncio.to_thread(self._cursor.executemany, query, seq_params)
+
+    async def _fetchone(self):
+        return await asyncio.to_thread(self._cursor.fetchone)
+
+    async def _fetchmany(self, size):
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+    async def _fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+    async def close(self):
+        await asyncio.to_thread(self._cursor.close)
+
+
+class AsyncConnection:
+    """
+    Connection borrowed from the active pool.
+    `await conn.close()` gives it back; calling it twice is harmless.
+    `await conn.discard()` closes it instead (use when a streaming result was abandoned half read).
+    """
+
+    def __init__(self, raw, pool=None):
+        self._raw = raw
+        self._pool = pool
+        self._released = False
+
+    async def commit(self):
+        await self._commit()
+        # read-your-writes: this caller's next reads skip the replicas for a while
+        router.note_write()
+
+
+class _AiomysqlConnection(AsyncConnection):
+    async def cursor(self, dictionary=False, unbuffered=False):
+        # unbuffered -> server-side cursor: rows stay on the wire until fetched
+        if unbuffered:
+            cursor_class = aiomysql.SSDictCursor if dictionary else aiomysql.SSCursor
+        else:
+            cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+        return _AiomysqlCursor(await self._raw.cursor(cursor_class))
+
+    async def start_transaction(self):
+        await self._raw.begin()
+
+    async def _commit(self):
+        await self._raw.commit()
+
+    async def rollback(self):
+        await self._raw.rollback()
+
+    async def close(self):
+        if self._released:
+            return
+        self._released = True
+        try:
+            if self._raw.get_transaction_status():
+                # never hand an open transaction to the next request
+                await self._raw.rollback()
+        except Exception:
+            self._raw.close()
+        self._pool.release(self._raw)
+
+    async def discard(self):
+        if self._released:
+            return
+        self._released = True
+        self._raw.close()
+        self._pool.release(self._raw)
+
+
+class _ThreadedConnection(AsyncConnection):
+    async def cursor(self, dictionary=False, unbuffered=False):
+        options = {"buffered": False} if unbuffered else {}
+        return _ThreadedCursor(await asyncio.to_thread(self._raw.cursor, dictionary=dictionary, **options))
+
+    async def start_transaction(self):
+        await asyncio.to_thread(self._raw.start_transaction)
+
+    async def _commit(self):
+        await asyncio.to_thread(self._raw.commit)
+
+    async def rollback(self):
+        await asyncio.to_thread(self._raw.rollback)
+
+    async def close(self):
+        if self._released:
+            return
+        self._released = True
+        await asyncio.to_thread(self._raw.close)
+
+    async def discard(self):
+        if self._released:
+            return
+        self._released = True
+        await asyncio.to_thread(self._raw.discard)
+
+
+# ---------------------------------------------------------------------
+# aiomysql pool
+# ---------------------------------------------------------------------
+
+_async_pool = None
+_pool_lock = asyncio.Lock()
+_stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "wait_time": 0.0, "max_wait": 0.0}
+
+
+async def _create_pool(config):
+    try:
+        return await aiomysql.create_pool(
+            minsize=0,
+            maxsize=POOL_SIZE,
+            pool_recycle=POOL_MAX_LIFETIME,
+            autocommit=True,
+            connect_timeout=CONNECT_TIMEOUT,
+            host=config["host"],
+            port=config["port"],
+            user=config["user"],
+            password=config["password"],
+            db=config["database"],
+        )
+    except Exception as e:
+        log.error("Could not create async MySQL pool for %s:%s: %s", config["host"], config["port"], e, extra=SAMPLED)
+        return None
+
+
+async def open_pool():
+    global _async_pool
+    if DB_MODE != "async" or _async_pool is not None:
+        return _async_pool
+    async with _pool_lock:
+        if _async_pool is None:
+            _async_pool = await _create_pool(DB_CONFIG)
+    return _async_pool
+
+
+async def _open_replica_pool(replica):
+    if replica.async_pool is None:
+        async with _pool_lock:
+            if replica.async_pool is None:
+                replica.async_pool = await _create_pool(replica.config)
+    return replica.async_pool
+
+
+async def close_pool():
+    global _async_pool
+    pools = [_async_pool] + [replica.async_pool for replica in router.replicas]
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+    _async_pool = None
+    for replica in router.replicas:
+        replica.async_pool = None
+        replica.pool.close_all()
+    database.pool.close_all()
+
+
+async def _acquire_async(pool, monitor=health, stats=_stats):
+    started = time.monotonic()
+    must_wait = pool.freesize == 0 and pool.size >= pool.maxsize
+    try:
+        raw = await asyncio.wait_for(pool.acquire(), timeout=POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        stats["timeouts"] += 1
+        log.warning("No free database connection after %ss (pool size %d)", POOL_TIMEOUT, POOL_SIZE, extra=SAMPLED)
+        return None
+    except Exception as e:
+        monitor.record_failure(e)
+        log.error("MySQL connect failed: %s", e, extra={"errno": e.args[0] if e.args else None, **SAMPLED})
+        return None
+
+    monitor.record_success()
+    stats["checkouts"] += 1
+    if must_wait:
+        waited = time.monotonic() - started
+        stats["waits"] += 1
+        stats["wait_time"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+    return _AiomysqlConnection(raw, pool)
+
+
+async def _primary_connection():
+    if DB_MODE == "async":
+        # fail fast while the shared circuit breaker says MySQL is down
+        if not health.allow_request():
+            return None
+        pool = await open_pool()
+        if pool is None:
+            return None
+        return await _acquire_async(pool)
+
+    raw = await asyncio.to_thread(database.get_connection)
+    if raw is None:
+        return None
+    return _ThreadedConnection(raw)
+
+
+async def _replica_connection(replica):
+    if DB_MODE == "async":
+        if not replica.health.allow_request():
+            return None
+        pool = await _open_replica_pool(replica)
+        if pool is None:
+            return None
+        return await _acquire_async(pool, replica.health, replica.async_stats)
+
+    raw = await asyncio.to_thread(replica.pool.acquire)
+    if raw is None:
+        return None
+    return _ThreadedConnection(raw)
+
+
+# Borrow a connection from the pool selected by HOSTEL_DB_MODE (None if unavailable).
+# read_only=True may hand out a replica connection (see replicas.py); never write through it.
+async def get_connection(read_only=False):
+    started = time.perf_counter()
+    try:
+        replica = router.pick() if read_only else None
+        if replica is not None:
+            conn = await _replica_connection(replica)
+            if conn is not None:
+                return conn
+            router.fell_back(replica)
+        return await _primary_connection()
+    finally:
+        metrics.record_acquire(time.perf_counter() - started)
+
+
+def pool_stats():
+    if DB_MODE != "async":
+        return {"mode": DB_MODE, **database.pool_stats()}
+
+    size = _async_pool.size if _async_pool else 0
+    idle = _async_pool.freesize if _async_pool else 0
+    waits = _stats["waits"]
+    return {
+        "mode": DB_MODE,
+        "size": POOL_SIZE,
+        "in_use": size - idle,
+        "idle": idle,
+        "checkouts": _stats["checkouts"],
+        "waits": waits,
+        "timeouts": _stats["timeouts"],
+        "total_wait_ms": round(_stats["wait_time"] * 1000, 3),
+        "avg_wait_ms": round(_stats["wait_time"] * 1000 / waits, 3) if waits else 0.0,
+        "max_wait_ms": round(_stats["max_wait"] * 1000, 3),
+    }
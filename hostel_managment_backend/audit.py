@@ -0,0 +1,192 @@
+"""
+Audit trail in activity_log, written off the request path.
+
+- handlers call `await audit.record("allocated U1 to room 101 bed 2")` after their
+  write commits; that only appends to an in-memory buffer
+- a background writer inserts the buffer in multi-row batches: as soon as
+  HOSTEL_AUDIT_BATCH_SIZE entries are waiting, or every HOSTEL_AUDIT_FLUSH_INTERVAL seconds
+- once HOSTEL_AUDIT_QUEUE_SIZE entries are waiting (e.g. MySQL is down), record() waits
+  for the writer to make room (backpressure), up to HOSTEL_AUDIT_MAX_WAIT seconds; only
+  then is the entry dropped and counted
+- stop() (app shutdown) flushes everything still buffered
+
+The actor (who did it) comes from the session token of the current request, picked up
+by bind_actor (see request_context), so handlers don't have to pass it around. Requests without a valid
+token are logged with user_type / user_id NULL: the caller is unknown, not a warden.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from async_database import get_connection, Error
+from logging_config import SAMPLED
+from request_context import bearer_token
+from sessions import verify_token, TokenError
+
+log = logging.getLogger(__name__)
+
+
+AUDIT_BATCH_SIZE = int(os.environ.get("HOSTEL_AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("HOSTEL_AUDIT_FLUSH_INTERVAL", "1"))
+AUDIT_QUEUE_SIZE = int(os.environ.get("HOSTEL_AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_MAX_WAIT = float(os.environ.get("HOSTEL_AUDIT_MAX_WAIT", "2"))
+
+# plain %s placeholders only, so both drivers send executemany() as one multi-row INSERT
+INSERT_QUERY = "INSERT INTO activity_log (user_type, user_id, action, timestamp) VALUES (%s, %s, %s, %s)"
+
+# activity_log.user_type values per session role
+_USER_TYPES = {"warden": "Warden", "student": "Student"}
+
+# (user_type, user_id) of the current request, or None
+_actor = ContextVar("hostel_audit_actor", default=None)
+
+
+def bind_actor(scope):
+    """Remember who is calling (from the bearer token, if any) for audit.record()."""
+    actor = None
+    token = bearer_token(scope)
+    if token is not None:
+        try:
+            session = verify_token(token)
+            actor = (_USER_TYPES[session.role], str(session.subject))
+        except TokenError:
+            pass
+    return _actor.set(actor)
+
+
+class AuditLog:
+    """Everything but the INSERT runs on the event loop, so no locking is needed."""
+
+    def __init__(self):
+        self._buffer = deque()
+        self._wakeup = asyncio.Event()    # batch ready (or stopping)
+        self._space = asyncio.Event()     # buffer below AUDIT_QUEUE_SIZE again
+        self._space.set()
+        self._task = None
+        self._stopping = False
+
+        # stats
+        self._recorded = 0
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._waits = 0
+        self._failures = 0
+        self._last_flush_ms = 0.0
+
+    async def record(self, action, user_type=None, user_id=None):
+        """Queue one activity_log row; user_type / user_id default to the current session (None if anonymous)."""
+        if user_type is None:
+            user_type, user_id = _actor.get() or (None, None)
+
+        if len(self._buffer) >= AUDIT_QUEUE_SIZE:
+            # backpressure: let the writer catch up before adding more. Every waiter wakes on
+            # the same event, so re-check the length: only the ones that still fit may append
+            self._waits += 1
+            deadline = time.monotonic() + AUDIT_MAX_WAIT
+            while len(self._buffer) >= AUDIT_QUEUE_SIZE:
+                self._space.clear()
+                try:
+                    await asyncio.wait_for(self._space.wait(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    self._dropped += 1
+                    log.warning("Audit buffer full, entry dropped: %s", action, extra=SAMPLED)
+                    return False
+
+        self._buffer.append((user_type, user_id, action[:255], datetime.now()))
+        self._recorded += 1
+        if len(self._buffer) >= AUDIT_BATCH_SIZE:
+            self._wakeup.set()
+        return True
+
+    async def flush(self):
+        """Write everything buffered so far, in batches. False if a batch could not be written."""
+        while self._buffer:
+            batch = [self._buffer[i] for i in range(min(AUDIT_BATCH_SIZE, len(self._buffer)))]
+            if not await self._write(batch):
+                return False
+            for _ in batch:
+                self._buffer.popleft()
+            if len(self._buffer) < AUDIT_QUEUE_SIZE:
+                self._space.set()
+        return True
+
+    async def _write(self, batch):
+        conn = await get_connection()
+        if conn is None:
+            self._failures += 1
+            return False
+
+        started = time.perf_counter()
+        try:
+            cursor = await conn.cursor()
+            await cursor.executemany(INSERT_QUERY, batch)
+            await conn.commit()
+            await cursor.close()
+        except Error as e:
+            self._failures += 1
+            log.warning("Audit flush failed (%d entries kept for retry): %s", len(batch), e, extra=SAMPLED)
+            return False
+        finally:
+            await conn.close()
+
+        self._written += len(batch)
+        self._batches += 1
+        self._last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+        return True
+
+    async def _writer_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), AUDIT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # keep the writer alive: whatever failed, the batch is still buffered for the next try
+                self._failures += 1
+                log.exception("Audit flush crashed", extra=SAMPLED)
+            if self._stopping:
+                return
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._writer_loop())
+
+    async def stop(self):
+        """Stop the writer and flush what is left (graceful shutdown)."""
+        if self._task is not None:
+            # let the writer finish its current batch rather than cancelling it mid-INSERT
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        try:
+            flushed = await self.flush()
+        except Exception:
+            log.exception("Audit flush crashed on shutdown")
+            flushed = False
+        if not flushed:
+            log.error("Audit entries lost on shutdown", extra={"entries": len(self._buffer)})
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self._recorded,
+            "written": self._written,
+            "batches": self._batches,
+            "dropped": self._dropped,
+            "backpressure_waits": self._waits,
+            "failed_flushes": self._failures,
+            "last_flush_ms": self._last_flush_ms,
+        }
+
+
+audit = AuditLog()
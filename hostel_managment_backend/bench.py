@@ -0,0 +1,313 @@
+"""
+Load benchmark for the API.
+
+Seeds the database (see seed.py), drives one or more workloads against the app and
+reports p50/p95/p99 latency and throughput per route. Results can be saved as a JSON
+baseline and later runs compared against it.
+
+    python bench.py --seed --students 5000 --rooms 1500 --complaints 10000
+    python bench.py --workload mixed --concurrency 50 --duration 30 --save baseline.json
+    python bench.py --workload mixed --concurrency 50 --duration 30 --compare baseline.json
+
+By default requests go through httpx's ASGITransport to the app in this process;
+--url http://127.0.0.1:8000 benchmarks a running server instead (uvicorn, workers...).
+Point HOSTEL_DB_NAME at a scratch database: the allocation workload writes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+try:
+    import httpx
+except ImportError:  # only needed for benchmarking
+    httpx = None
+
+import database
+import seed as seeder
+
+
+# ---------------------------------------------------------------------
+# Workloads: each step sends one request and returns (route label, response)
+# ---------------------------------------------------------------------
+
+async def _login(client, rng, ctx):
+    usn, email = rng.choice(ctx["students"])
+    return "POST /student-login", await client.post("/student-login", json={"email": email, "password": usn})
+
+
+async def _dashboard(client, rng, ctx):
+    path = rng.choice(["/dashboard/summary", "/dashboard/summary", "/dashboard/recent-complaints", "/dashboard/recent-leaves"])
+    return "GET " + path, await client.get(path)
+
+
+async def _rooms(client, rng, ctx):
+    path = rng.choice(["/rooms", "/available-rooms"])
+    return "GET " + path, await client.get(path)
+
+
+async def _notices(client, rng, ctx):
+    return "GET /notice/all", await client.get("/notice/all")
+
+
+async def _auto_allocate(client, rng, ctx):
+    if not ctx["pending"]:
+        # everyone is placed; keep the worker busy with the read side of allocation
+        return await _rooms(client, rng, ctx)
+    usn = ctx["pending"].pop()
+    return "POST /auto-allocate", await client.post("/auto-allocate", json={"usn": usn})
+
+
+async def _student_pages(client, rng, ctx):
+    usn, _ = rng.choice(ctx["students"])
+    path = rng.choice([f"/student/{usn}", f"/student-room/{usn}", f"/roommates/{usn}", f"/student-leaves/{usn}"])
+    return "GET " + path.rsplit("/", 1)[0] + "/{usn}", await client.get(path)
+
+
+async def _pending_lists(client, rng, ctx):
+    path = rng.choice(["/leaves/pending", "/complaints/unresolved"])
+    return "GET " + path, await client.get(path)
+
+
+# name -> [(weight, step)]
+WORKLOADS = {
+    # everyone logs in at 9am
+    "login_storm": [(1, _login)],
+    # wardens leave the dashboard open; it polls every few seconds
+    "dashboard_polling": [(6, _dashboard), (2, _rooms), (1, _notices), (1, _pending_lists)],
+    # first day of semester: pending students get auto-allocated while wardens watch room lists
+    "semester_start": [(6, _auto_allocate), (3, _rooms), (1, _dashboard)],
+    # a normal day
+    "mixed": [(3, _login), (3, _student_pages), (2, _dashboard), (1, _rooms), (1, _notices), (1, _pending_lists)],
+}
+
+
+def _pick(steps, rng):
+    total = sum(weight for weight, _ in steps)
+    roll = rng.uniform(0, total)
+    for weight, step in steps:
+        roll -= weight
+        if roll <= 0:
+            return step
+    return steps[-1][1]
+
+
+# ---------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _is_error(response):
+    if response.status_code >= 400:
+        return True
+    if response.headers.get("content-type", "").startswith("application/json") and response.content:
+        body = response.json()
+        return isinstance(body, dict) and body.get("status") == "error"
+    return False
+
+
+async def run_workload(client, name, ctx, concurrency, duration, max_requests, random_seed):
+    steps = WORKLOADS[name]
+    samples = {}   # route -> [latency seconds]
+    errors = {}
+    sent = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(worker_id):
+        nonlocal sent
+        rng = random.Random(random_seed * 1000 + worker_id)
+        while time.monotonic() < deadline and (max_requests is None or sent < max_requests):
+            sent += 1
+            step = _pick(steps, rng)
+            started = time.perf_counter()
+            route, response = await step(client, rng, ctx)
+            samples.setdefault(route, []).append(time.perf_counter() - started)
+            if _is_error(response):
+                errors[route] = errors.get(route, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, latencies in sorted(samples.items()):
+        latencies.sort()
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": errors.get(route, 0),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+    }
+
+
+def _load_context():
+    """Seeded students to log in as / allocate (synchronous, before the event loop starts)."""
+    conn = database.get_connection()
+    if conn is None:
+        raise SystemExit("❌ Could not connect to MySQL")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT usn, email FROM student WHERE usn LIKE %s", (seeder.SEED_PREFIX + "%",))
+        students = cursor.fetchall()
+        cursor.execute(
+            "SELECT usn FROM student WHERE usn LIKE %s AND room_allocation_status = 'Pending'",
+            (seeder.SEED_PREFIX + "%",),
+        )
+        pending = [usn for (usn,) in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+    if not students:
+        raise SystemExit("❌ No seeded students — run with --seed first")
+    return {"students": students, "pending": pending}
+
+
+async def run(args, workloads, ctx):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        app = None
+    else:
+        import main
+        app = main.app
+        # ASGITransport doesn't send lifespan events; run the app's startup/shutdown ourselves
+        await main.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://bench", timeout=60)
+
+    results = {}
+    try:
+        for name in workloads:
+            print(f"\n▶️  {name}: {args.concurrency} concurrent clients, {args.duration:g}s"
+                  + (f" / {args.requests} requests" if args.requests else ""))
+            results[name] = await run_workload(client, name, ctx, args.concurrency, args.duration,
+                                               args.requests, args.random_seed)
+            _print_report(results[name])
+    finally:
+        await client.aclose()
+        if app is not None:
+            await main.shutdown()
+    return results
+
+
+def _print_report(result):
+    print(f"   {'route':<36} {'reqs':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, r in result["routes"].items():
+        print(f"   {route:<36} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>9} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    print(f"   {'total':<36} {result['requests']:>7} {result['errors']:>5} {result['throughput_rps']:>9}"
+          f"   ({result['elapsed_s']}s)")
+
+
+# ---------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------
+
+def compare(baseline, results, tolerance):
+    """Regressions vs. a saved baseline: p95 up or throughput down by more than `tolerance`."""
+    regressions = []
+    for name, result in results.items():
+        base_workload = baseline.get("workloads", {}).get(name)
+        if base_workload is None:
+            continue
+        for route, r in result["routes"].items():
+            base = base_workload["routes"].get(route)
+            if base is None or base["requests"] < 20 or r["requests"] < 20:
+                continue   # too few samples for the percentiles to mean anything
+            if r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {route}: p95 {base['p95_ms']} → {r['p95_ms']} ms")
+            if r["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{name} {route}: throughput {base['throughput_rps']} → {r['throughput_rps']} req/s")
+            if r["errors"] > base["errors"]:
+                regressions.append(f"{name} {route}: errors {base['errors']} → {r['errors']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hostel API")
+    parser.add_argument("--workload", default="all", choices=["all"] + list(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per workload")
+    parser.add_argument("--requests", type=int, default=None, help="stop a workload after this many requests")
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--seed", action="store_true", help="(re)seed the database before running")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--rooms", type=int, default=1500)
+    parser.add_argument("--complaints", type=int, default=10000)
+    parser.add_argument("--leaves", type=int, default=10000)
+    parser.add_argument("--save", metavar="FILE", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="fail if results regressed against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if httpx is None:
+        raise SystemExit("❌ bench.py needs httpx (pip install httpx)")
+
+    if args.seed:
+        conn = database.get_connection()
+        if conn is None:
+            raise SystemExit("❌ Could not connect to MySQL")
+        try:
+            seeder.clear(conn)
+            counts = seeder.seed(conn, students=args.students, rooms=args.rooms,
+                                 complaints=args.complaints, leaves=args.leaves)
+            seeder.analyze(conn)
+            print("✅ Seeded " + ", ".join(f"{n} {table}" for table, n in counts.items()))
+        finally:
+            conn.close()
+
+    workloads = list(WORKLOADS) if args.workload == "all" else [args.workload]
+    ctx = _load_context()
+    results = asyncio.run(run(args, workloads, ctx))
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "target": args.url or "asgi",
+            "db_mode": os.environ.get("HOSTEL_DB_MODE", "async"),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "requests": args.requests,
+            "students": len(ctx["students"]),
+            "python": platform.python_version(),
+        },
+        "workloads": results,
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.compare}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
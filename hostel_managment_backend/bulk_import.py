@@ -0,0 +1,154 @@
+import asyncio
+import codecs
+import csv
+import tempfile
+
+try:
+    import openpyxl
+except ImportError:  # only needed for .xlsx uploads
+    openpyxl = None
+
+
+CHUNK_ROWS = 500
+# xlsx is a zip archive and can't be parsed as it arrives; spill to disk past this size
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+XLSX_CONTENT_TYPES = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.ms-excel",
+)
+
+
+class ImportFormatError(Exception):
+    """The uploaded file can't be read (unknown format, missing header, no openpyxl...)."""
+
+
+def detect_format(content_type, explicit=None):
+    if explicit:
+        fmt = explicit.lower()
+    elif content_type and content_type.split(";")[0].strip() in XLSX_CONTENT_TYPES:
+        fmt = "xlsx"
+    else:
+        fmt = "csv"
+    if fmt not in ("csv", "xlsx"):
+        raise ImportFormatError(f"Unsupported format '{fmt}' — use csv or xlsx")
+    return fmt
+
+
+def _normalise_header(header):
+    return [str(h or "").strip().lower().replace(" ", "_") for h in header]
+
+
+async def _csv_records(byte_stream):
+    """
+    Yield parsed CSV rows as bytes arrive. A record may span several lines
+    (quoted newlines); it is complete once its quote count is even.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    record = ""
+
+    def parse(text):
+        return next(csv.reader([text]))
+
+    async for chunk in byte_stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            record += line + "\n"
+            if record.count('"') % 2 == 0:
+                if record.strip():
+                    yield parse(record.rstrip("\r\n"))
+                record = ""
+
+    record += pending + decoder.decode(b"", final=True)
+    if record.strip():
+        yield parse(record.rstrip("\r\n"))
+
+
+def _cell_text(cell):
+    if cell is None:
+        return ""
+    # numeric cells (phone numbers, year) come back as floats: 9876543210.0 -> "9876543210"
+    if isinstance(cell, float) and cell.is_integer():
+        return str(int(cell))
+    return str(cell)
+
+
+def _xlsx_records(fileobj):
+    if openpyxl is None:
+        raise ImportFormatError("xlsx import needs openpyxl (pip install openpyxl)")
+    # read_only mode streams rows from the sheet XML instead of building the whole workbook
+    workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            if row and any(cell is not None for cell in row):
+                yield [_cell_text(cell) for cell in row]
+    finally:
+        workbook.close()
+
+
+async def iter_row_chunks(byte_stream, fmt, chunk_rows=CHUNK_ROWS):
+    """
+    Yield lists of (line_no, row_dict) of at most `chunk_rows` rows.
+    The first record is the header; keys are lower_snake_case header names.
+    """
+    if fmt == "csv":
+        records = _csv_records(byte_stream)
+        header = None
+        chunk = []
+        line_no = 1
+        async for values in records:
+            if header is None:
+                header = _normalise_header(values)
+                continue
+            line_no += 1
+            chunk.append((line_no, dict(zip(header, values))))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if header is None:
+            raise ImportFormatError("The file is empty — expected a header row")
+        if chunk:
+            yield chunk
+        return
+
+    # xlsx: spool to a temp file (memory up to XLSX_SPOOL_BYTES, disk beyond that)
+    with tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES) as spool:
+        async for chunk in byte_stream:
+            spool.write(chunk)
+        spool.seek(0)
+
+        rows = _xlsx_records(spool)
+
+        def next_batch(n):
+            batch = []
+            for values in rows:
+                batch.append(values)
+                if len(batch) >= n:
+                    break
+            return batch
+
+        # parsing is CPU work; keep it off the event loop
+        first = await asyncio.to_thread(next_batch, 1)
+        if not first:
+            raise ImportFormatError("The sheet is empty — expected a header row")
+        header = _normalise_header(first[0])
+        line_no = 1
+        while True:
+            batch = await asyncio.to_thread(next_batch, chunk_rows)
+            if not batch:
+                break
+            chunk = []
+            for values in batch:
+                line_no += 1
+                chunk.append((line_no, dict(zip(header, values))))
+            yield chunk
+
+
+async def iter_json_chunks(rows, chunk_rows=CHUNK_ROWS):
+    """Same shape as iter_row_chunks for an already-parsed JSON list."""
+    if not isinstance(rows, list):
+        raise ImportFormatError("Expected a JSON list")
+    for start in range(0, len(rows), chunk_rows):
+        yield list(enumerate(rows[start:start + chunk_rows], start=start + 1))
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import time
+
+from async_database import get_connection, Error
+from logging_config import SAMPLED
+
+log = logging.getLogger(__name__)
+
+
+# seconds between background reconciles against the real tables
+RECONCILE_INTERVAL = float(os.environ.get("HOSTEL_DASHBOARD_RECONCILE_INTERVAL", "60"))
+
+# Pending definitions shared with the original COUNT(*) queries
+PENDING_LEAVE_STATUSES = ("No", "Pending")
+RESOLVED_COMPLAINT_STATUS = "Resolved"
+
+COUNTS_QUERY = f"""
+    SELECT
+        (SELECT COUNT(*) FROM student) AS total_students,
+        (SELECT COUNT(*) FROM complaint WHERE status != '{RESOLVED_COMPLAINT_STATUS}') AS pending_complaints,
+        (SELECT COUNT(*) FROM leave_request
+          WHERE warden_approval IN ({", ".join(f"'{s}'" for s in PENDING_LEAVE_STATUSES)})) AS pending_leaves
+"""
+ROOMS_QUERY = "SELECT room_no, no_of_occupancy, no_of_beds FROM room"
+
+
+def leave_is_pending(status):
+    return status in PENDING_LEAVE_STATUSES
+
+
+def complaint_is_pending(status):
+    return status != RESOLVED_COMPLAINT_STATUS
+
+
+class DashboardStats:
+    """
+    In-memory counters behind /dashboard/summary.
+
+    - write endpoints report what they committed (students_added, beds_allocated, ...)
+    - reconcile() recounts everything from MySQL; a background task runs it every
+      RECONCILE_INTERVAL seconds so writes made outside the API are picked up too.
+      Updates reported while its queries run are re-applied on top of the recount
+    - occupied/vacant rooms are derived from a room_no -> (occupancy, beds) map, so an
+      allocation only has to touch the room it landed in (room numbers keyed as strings)
+
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self._stale = False
+        self._counts = {"total_students": 0, "pending_complaints": 0, "pending_leaves": 0}
+        self._rooms = {}
+        self._occupied_rooms = 0
+        self._vacant_rooms = 0
+        self._task = None
+        self._reconcile_lock = asyncio.Lock()
+        self._pending = None     # [(update, args)] reported during a recount; None = not recounting
+
+        # stats
+        self._reconciles = 0
+        self._last_reconcile = None
+        self._last_reconcile_ms = 0.0
+        self._last_drift = {}
+
+    # ---- incremental updates (call after the write has committed) ----
+
+    def _remember(self, update, *args):
+        """While reconcile() is querying, keep the update to re-apply to its fresh counts."""
+        if self._pending is not None:
+            self._pending.append((update, args))
+
+    def _add(self, name, delta):
+        self._remember(self._add, name, delta)
+        if self._loaded and delta:
+            self._counts[name] += delta
+
+    def _set_room(self, room_no, occupancy, beds):
+        old = self._rooms.get(room_no)
+        if old is not None:
+            self._occupied_rooms -= old[0] > 0
+            self._vacant_rooms -= old[0] < old[1]
+        self._rooms[room_no] = (occupancy, beds)
+        self._occupied_rooms += occupancy > 0
+        self._vacant_rooms += occupancy < beds
+
+    def students_added(self, count=1):
+        self._add("total_students", count)
+
+    def rooms_added(self, rooms):
+        """rooms: iterable of (room_no, no_of_beds) for newly created, empty rooms."""
+        rooms = list(rooms)
+        self._remember(self.rooms_added, rooms)
+        if not self._loaded:
+            return
+        for room_no, beds in rooms:
+            self._set_room(str(room_no), 0, beds)
+
+    def beds_allocated(self, room_nos, delta=1):
+        """One call per allocated (or, with delta=-1, released) bed's room_no."""
+        room_nos = list(room_nos)
+        self._remember(self.beds_allocated, room_nos, delta)
+        if not self._loaded:
+            return
+        for room_no in map(str, room_nos):
+            room = self._rooms.get(room_no)
+            if room is None:
+                # a room created outside the API; let the next read recount
+                self._stale = True
+                continue
+            self._set_room(room_no, max(room[0] + delta, 0), room[1])
+
+    def complaint_opened(self):
+        self._add("pending_complaints", 1)
+
+    def complaint_status_changed(self, old_status, new_status):
+        self._add("pending_complaints", complaint_is_pending(new_status) - complaint_is_pending(old_status))
+
+    def leave_applied(self):
+        self._add("pending_leaves", 1)
+
+    def leave_status_changed(self, old_status, new_status):
+        self._add("pending_leaves", leave_is_pending(new_status) - leave_is_pending(old_status))
+
+    # ---- reads ----
+
+    def _snapshot(self):
+        return {
+            "total_students": self._counts["total_students"],
+            "occupied_rooms": self._occupied_rooms,
+            "vacant_rooms": self._vacant_rooms,
+            "pending_complaints": self._counts["pending_complaints"],
+            "pending_leaves": self._counts["pending_leaves"],
+        }
+
+    async def summary(self):
+        """Current counters; only the first call (or one after a stale mark) touches MySQL."""
+        if not self._loaded or self._stale:
+            if not await self.reconcile():
+                return None
+        return self._snapshot()
+
+    async def reconcile(self):
+        """Recount from MySQL (2 queries). Returns False if no connection was available."""
+        # one recount at a time, so each has its own list of updates to re-apply
+        async with self._reconcile_lock:
+            return await self._reconcile()
+
+    async def _reconcile(self):
+        conn = await get_connection()
+        if conn is None:
+            return False
+
+        started = time.perf_counter()
+        # writes committed while the queries run may or may not be in their result; their
+        # updates are re-applied below, so at worst one is counted twice until the next
+        # recount, instead of being lost until then
+        self._pending = []
+        try:
+            cursor = await conn.cursor(dictionary=True)
+            await cursor.execute(COUNTS_QUERY)
+            counts = await cursor.fetchone()
+            await cursor.execute(ROOMS_QUERY)
+            rooms = await cursor.fetchall()
+            await cursor.close()
+        finally:
+            await conn.close()
+            pending, self._pending = self._pending, None
+
+        before = self._snapshot() if self._loaded else None
+
+        self._counts = {name: int(counts[name]) for name in self._counts}
+        self._rooms = {}
+        self._occupied_rooms = self._vacant_rooms = 0
+        for room in rooms:
+            self._set_room(str(room["room_no"]), room["no_of_occupancy"] or 0, room["no_of_beds"] or 0)
+        self._loaded = True
+        self._stale = False
+        for update, args in pending:
+            update(*args)
+
+        # how far the incremental counters had drifted (non-zero means a write path is missing a hook)
+        after = self._snapshot()
+        self._last_drift = {k: after[k] - before[k] for k in after if after[k] != before[k]} if before else {}
+        self._reconciles += 1
+        self._last_reconcile = time.time()
+        self._last_reconcile_ms = round((time.perf_counter() - started) * 1000, 3)
+        return True
+
+    # ---- background reconcile ----
+
+    async def _reconcile_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Error as e:
+                log.warning("Dashboard reconcile failed: %s", e, extra=SAMPLED)
+
+    def start(self, interval=RECONCILE_INTERVAL):
+        if self._task is None and interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._reconcile_loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "loaded": self._loaded,
+            "rooms_tracked": len(self._rooms),
+            "reconciles": self._reconciles,
+            "reconcile_interval": RECONCILE_INTERVAL,
+            "last_reconcile": self._last_reconcile,
+            "last_reconcile_ms": self._last_reconcile_ms,
+            "last_drift": self._last_drift,
+        }
+
+
+dashboard = DashboardStats()
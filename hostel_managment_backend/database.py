@@ -1,106 +1,446 @@
 import mysql.connector
-from mysql.connector import Error
-import sys
-import socket
+from collections import deque
+import logging
+import os
 import threading
+import time
 
-print("PYTHON EXECUTABLE:", sys.executable)
+from logging_config import SAMPLED, configure_logging
 
+log = logging.getLogger(__name__)
 
-# Database connection function with forced timeout
-def get_connection():
-    print("\n🔍 Attempting to connect to MySQL database...")
-    print(f"   Host: localhost")
-    print(f"   User: root")
-    print(f"   Database: mit_hostel_solutions")
-    
-    # First, check if we can reach the MySQL port
-    try:
-        print("   Checking if MySQL port 3306 is accessible...")
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(3)
-        result = sock.connect_ex(('localhost', 3306))
-        sock.close()
-        if result != 0:
-            print("   ⚠️  Port 3306 is not accessible. MySQL server might not be running.")
-            print("   💡 Try: net start MySQL (in PowerShell as Administrator)")
-            return None
-        else:
-            print("   ✅ Port 3306 is accessible")
-    except Exception as e:
-        print(f"   ⚠️  Could not check port: {e}")
-    
-    # Use threading to enforce timeout since connection_timeout might not work
-    connection_result = [None]
-    connection_error = [None]
-    
-    def attempt_connection():
-        try:
-            print("   Connecting to database (timeout: 5 seconds)...")
-            # Try with 127.0.0.1 instead of localhost (avoids IPv6 issues)
-            # use_pure=True forces pure Python implementation (more reliable on Windows)
-            conn = mysql.connector.connect(
-                host="127.0.0.1",  # Use IP instead of localhost
-                user="root",
-                password="Eternal_Flame",
-                database="mit_hostel_solutions",
-                port=3306,
-                autocommit=True,
-                use_pure=True,  # Force pure Python implementation
-                connect_timeout=5,  # Additional timeout parameter
-                allow_local_infile=True
-            )
-            connection_result[0] = conn
-        except Error as e:
-            connection_error[0] = e
-        except Exception as e:
-            connection_error[0] = e
-    
-    # Start connection in a separate thread
-    thread = threading.Thread(target=attempt_connection, daemon=True)
-    thread.start()
-    thread.join(timeout=5)  # Wait maximum 5 seconds
-    
-    if thread.is_alive():
-        print("   ⏱️  Connection attempt timed out after 5 seconds!")
-        print("   💡 MySQL server might not be responding or is not running")
-        print("   💡 Try: net start MySQL (in PowerShell as Administrator)")
+
+# ---- Connection settings (override with environment variables) ----
+DB_CONFIG = {
+    "host": os.environ.get("HOSTEL_DB_HOST", "127.0.0.1"),  # Use IP instead of localhost (avoids IPv6 issues)
+    "port": int(os.environ.get("HOSTEL_DB_PORT", "3306")),
+    "user": os.environ.get("HOSTEL_DB_USER", "root"),
+    "password": os.environ.get("HOSTEL_DB_PASSWORD", "Eternal_Flame"),
+    "database": os.environ.get("HOSTEL_DB_NAME", "mit_hostel_solutions"),
+}
+
+# ---- Pool settings (override with environment variables) ----
+POOL_SIZE = int(os.environ.get("HOSTEL_DB_POOL_SIZE", "10"))
+# max seconds a request waits for a free connection before giving up
+POOL_TIMEOUT = float(os.environ.get("HOSTEL_DB_POOL_TIMEOUT", "5"))
+# idle connections older than this are closed instead of being reused
+POOL_IDLE_TIMEOUT = float(os.environ.get("HOSTEL_DB_POOL_IDLE_TIMEOUT", "300"))
+# connections are recycled after this many seconds, even if healthy
+POOL_MAX_LIFETIME = float(os.environ.get("HOSTEL_DB_POOL_MAX_LIFETIME", "1800"))
+# ping a connection on checkout if it has been idle longer than this (0 = always)
+POOL_PING_INTERVAL = float(os.environ.get("HOSTEL_DB_POOL_PING_INTERVAL", "30"))
+
+
+# ---- Circuit breaker settings ----
+# seconds to wait for the MySQL handshake before giving up
+CONNECT_TIMEOUT = float(os.environ.get("HOSTEL_DB_CONNECT_TIMEOUT", "3"))
+# consecutive connect failures before the breaker opens
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("HOSTEL_DB_BREAKER_THRESHOLD", "3"))
+# seconds between background probes while the breaker is open
+BREAKER_RETRY_INTERVAL = float(os.environ.get("HOSTEL_DB_BREAKER_RETRY_INTERVAL", "5"))
+
+
+class HealthMonitor:
+    """
+    Circuit breaker shared by every request.
+
+    closed    -> connections are attempted normally
+    open      -> MySQL is known to be down; callers fail immediately
+    half_open -> the single background prober is testing the server
+
+    Only the prober thread ever retries while the breaker is not closed,
+    so a dead database costs a request microseconds instead of a timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, probe, threshold=BREAKER_FAILURE_THRESHOLD, retry_interval=BREAKER_RETRY_INTERVAL):
+        self._probe = probe
+        self.threshold = threshold
+        self.retry_interval = retry_interval
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._prober = None
+
+        # stats
+        self._trips = 0
+        self._rejected = 0
+        self._probes = 0
+        self._opened_at = None
+        self._last_error = None
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow_request(self):
+        # plain attribute read: no lock on the hot path
+        if self._state == self.CLOSED:
+            return True
+        self._rejected += 1
+        return False
+
+    def record_success(self):
+        if self._state == self.CLOSED and self._consecutive_failures == 0:
+            return
+        with self._lock:
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._opened_at = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = str(error) if error else self._last_error
+            if self._state == self.CLOSED and self._consecutive_failures >= self.threshold:
+                self._trip()
+
+    def _trip(self):
+        # caller holds the lock
+        self._state = self.OPEN
+        self._trips += 1
+        self._opened_at = time.time()
+        log.error("Database circuit breaker OPEN after %d failures: %s", self._consecutive_failures, self._last_error)
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(target=self._probe_loop, name="db-health-prober", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.retry_interval)
+            with self._lock:
+                if self._state != self.OPEN:
+                    # a request got through meanwhile and record_success() closed the breaker
+                    self._prober = None
+                    return
+                self._state = self.HALF_OPEN
+                self._probes += 1
+            try:
+                ok = self._probe()
+            except Exception as e:
+                ok = False
+                self._last_error = str(e)
+            with self._lock:
+                if self._state == self.CLOSED:
+                    # closed by a successful request while probing: leave it closed
+                    self._prober = None
+                    return
+                if self._state == self.OPEN:
+                    # closed and tripped again meanwhile: this thread is still the prober
+                    continue
+                if ok:
+                    self._state = self.CLOSED
+                    self._consecutive_failures = 0
+                    self._opened_at = None
+                    self._prober = None
+                    log.warning("Database reachable again — circuit breaker CLOSED")
+                    return
+                self._state = self.OPEN
+
+    def stats(self):
+        return {
+            "state": self._state,
+            "trips": self._trips,
+            "consecutive_failures": self._consecutive_failures,
+            "rejected_requests": self._rejected,
+            "probes": self._probes,
+            "opened_at": self._opened_at,
+            "last_error": self._last_error,
+        }
+
+
+def _open_raw_connection(config=DB_CONFIG):
+    # use_pure=True forces pure Python implementation (more reliable on Windows)
+    return mysql.connector.connect(
+        **config,
+        autocommit=True,
+        use_pure=True,  # Force pure Python implementation
+        connect_timeout=CONNECT_TIMEOUT,
+        allow_local_infile=True
+    )
+
+
+def _probe():
+    conn = _open_raw_connection()
+    conn.close()
+    return True
+
+
+health = HealthMonitor(_probe)
+
+
+_CONNECT_HINTS = {
+    2003: "MySQL server is not running or not accessible (try: net start MySQL)",
+    1045: "username/password is incorrect",
+    1049: f"database '{DB_CONFIG['database']}' does not exist",
+}
+
+
+# Open a brand new MySQL connection to `config` (used by the pools); fails fast while `monitor` is open
+def connect_to(config, monitor):
+    if not monitor.allow_request():
         return None
-    
-    if connection_error[0]:
-        error = connection_error[0]
-        print(f"   ❌ MySQL Error: {error}")
-        if hasattr(error, 'errno'):
-            print(f"   Error Code: {error.errno}")
-            if error.errno == 2003:
-                print("   💡 This means MySQL server is not running or not accessible")
-            elif error.errno == 1045:
-                print("   💡 This means username/password is incorrect")
-            elif error.errno == 1049:
-                print("   💡 This means the database 'mit_hostel_solutions' does not exist")
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Connecting to MySQL %s@%s:%s/%s (timeout %gs)", config["user"], config["host"],
+                  config["port"], config["database"], CONNECT_TIMEOUT)
+
+    try:
+        connection = _open_raw_connection(config)
+    except Exception as error:
+        monitor.record_failure(error)
+        errno = getattr(error, "errno", None)
+        log.error("MySQL connect failed: %s", error,
+                  extra={"errno": errno, "hint": _CONNECT_HINTS.get(errno), "host": config["host"], **SAMPLED})
         return None
-    
-    if connection_result[0]:
-        connection = connection_result[0]
+
+    monitor.record_success()
+    log.info("New MySQL connection opened", extra=SAMPLED)
+    return connection
+
+
+def _connect():
+    return connect_to(DB_CONFIG, health)
+
+
+class _PoolEntry:
+    __slots__ = ("raw", "created_at", "last_used")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class PooledConnection:
+    """
+    Thin wrapper handed out by the pool. Behaves like a normal
+    mysql.connector connection, except close() gives it back to the pool.
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def __getattr__(self, name):
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise mysql.connector.errors.InterfaceError("Connection has already been returned to the pool")
+        return getattr(entry.raw, name)
+
+    def close(self):
+        entry = self.__dict__.get("_entry")
+        if entry is not None:
+            self._entry = None
+            self._pool.release(entry)
+
+    def discard(self):
+        """Close the physical connection instead of reusing it (e.g. a result set that was only half read)."""
+        entry = self.__dict__.get("_entry")
+        if entry is not None:
+            try:
+                entry.raw.close()
+            except Exception:
+                pass
+            self.close()
+
+    # safety net: a handler that returns early without close() still gives the connection back
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+
+    - at most `size` connections exist at once; callers wait up to `timeout` seconds
+    - connections idle for more than `ping_interval` are pinged before being handed out
+    - idle connections older than `idle_timeout` are evicted
+    - connections older than `max_lifetime` are recycled
+    """
+
+    def __init__(self, connect, size=POOL_SIZE, timeout=POOL_TIMEOUT, idle_timeout=POOL_IDLE_TIMEOUT,
+                 max_lifetime=POOL_MAX_LIFETIME, ping_interval=POOL_PING_INTERVAL):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._idle = deque()
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # stats
+        self._created = 0
+        self._closed = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._failed_pings = 0
+
+    def _expired(self, entry, now):
+        return now - entry.created_at > self.max_lifetime
+
+    def _discard(self, entry):
+        self._closed += 1
+        try:
+            entry.raw.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now):
+        # idle deque is ordered oldest-used first; stop at the first fresh one
+        while self._idle and (now - self._idle[0].last_used > self.idle_timeout or self._expired(self._idle[0], now)):
+            self._discard(self._idle.popleft())
+
+    def _healthy(self, entry, now):
+        if now - entry.last_used < self.ping_interval:
+            return True
         try:
-            if connection.is_connected():
-                db_info = connection.get_server_info()
-                print(f"   ✅ Database connected successfully!")
-                print(f"   MySQL Server version: {db_info}")
-                return connection
+            entry.raw.ping(reconnect=False)
+            return True
+        except Exception:
+            self._failed_pings += 1
+            return False
+
+    def acquire(self):
+        """Borrow a connection. Returns a PooledConnection, or None if the pool is exhausted or MySQL is unreachable."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._evict_idle(now)
+                    if self._idle:
+                        # most recently used connection first (keeps the rest idle so they can be evicted)
+                        entry = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.size:
+                        self._in_use += 1
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._record_wait(now - started)
+                        log.warning("No free database connection after %ss (pool size %d)", self.timeout, self.size, extra=SAMPLED)
+                        return None
+                    waited = True
+                    self._cond.wait(remaining)
+
+            now = time.monotonic()
+            if entry is None:
+                # a slot was reserved; open the physical connection outside the lock
+                raw = self._connect()
+                if raw is None:
+                    with self._cond:
+                        self._in_use -= 1
+                        self._cond.notify()
+                    return None
+                entry = _PoolEntry(raw)
+                with self._cond:
+                    self._created += 1
+            elif not self._healthy(entry, now):
+                with self._cond:
+                    self._discard(entry)
+                    self._in_use -= 1
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._checkouts += 1
+                if waited:
+                    self._record_wait(time.monotonic() - started)
+            return PooledConnection(self, entry)
+
+    def _record_wait(self, seconds):
+        self._waits += 1
+        self._wait_time += seconds
+        self._max_wait = max(self._max_wait, seconds)
+
+    def release(self, entry):
+        now = time.monotonic()
+        reusable = True
+        try:
+            if entry.raw.in_transaction:
+                # never hand an open transaction to the next request
+                entry.raw.rollback()
+            reusable = entry.raw.is_connected()
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable and not self._expired(entry, now):
+                entry.last_used = now
+                self._idle.append(entry)
             else:
-                print("   ❌ Connection object created but not connected")
-                return None
-        except Exception as e:
-            print(f"   ❌ Error checking connection: {e}")
-            return None
-    
-    print("   ❌ Connection failed for unknown reason")
-    return None
+                self._discard(entry)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.popleft())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "created": self._created,
+                "closed": self._closed,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "failed_pings": self._failed_pings,
+                "total_wait_ms": round(self._wait_time * 1000, 3),
+                "avg_wait_ms": round(self._wait_time * 1000 / self._waits, 3) if self._waits else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+
+pool = ConnectionPool(_connect)
+
+
+# Borrow a connection from the shared pool; conn.close() hands it back
+def get_connection():
+    return pool.acquire()
+
+
+def pool_stats():
+    return pool.stats()
+
+
+def breaker_stats():
+    return health.stats()
 
 
 # Test the connection
 if __name__ == "__main__":
+    configure_logging()
     print("\n" + "="*50)
     print("Testing MySQL Connection")
     print("="*50)
@@ -110,7 +450,8 @@ if __name__ == "__main__":
     if conn:
         print("\n✅ Connection successful! You can use this connection object.")
         conn.close()
-        print("Connection closed.")
+        print("Connection returned to the pool.")
+        print("Pool stats:", pool_stats())
     else:
         print("\n❌ Connection failed. Please check:")
         print("   1. Is MySQL server running? (net start MySQL)")
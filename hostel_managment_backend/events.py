@@ -0,0 +1,134 @@
+"""
+In-process event bus for the leave / complaint workflow, pushed to browsers over SSE.
+
+- write endpoints call publish() after their transaction commits
+- each connected client gets a bounded queue; wardens see every event, students only
+  events carrying their own usn
+- the last HOSTEL_EVENT_BACKLOG events are kept, so a client reconnecting with
+  Last-Event-ID gets what it missed; if that is too old (or the client fell more than
+  HOSTEL_EVENT_QUEUE_SIZE events behind) it gets a "resync" event and should refetch
+  its lists once
+- a ":" comment line every HOSTEL_EVENT_HEARTBEAT seconds keeps proxies from closing idle streams
+
+Events only reach clients of the worker that published them; run a single worker
+(or put a shared broker behind publish()) when serving SSE from several processes.
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+
+EVENT_QUEUE_SIZE = int(os.environ.get("HOSTEL_EVENT_QUEUE_SIZE", "100"))
+EVENT_BACKLOG = int(os.environ.get("HOSTEL_EVENT_BACKLOG", "500"))
+EVENT_HEARTBEAT = float(os.environ.get("HOSTEL_EVENT_HEARTBEAT", "15"))
+
+_CLOSED = object()
+
+
+class _Subscriber:
+    __slots__ = ("queue", "role", "usn", "overflowed")
+
+    def __init__(self, role, usn):
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        self.role = role
+        self.usn = usn
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.role == "warden" or event["data"].get("usn") == self.usn
+
+
+class EventBus:
+    """Everything runs on the event loop, so no locking is needed."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._backlog = deque(maxlen=EVENT_BACKLOG)
+        self._subscribers = set()
+
+        # stats
+        self._published = 0
+        self._overflows = 0
+
+    def publish(self, event_type, **data):
+        event = {"id": next(self._ids), "type": event_type, "ts": time.time(), "data": data}
+        self._backlog.append(event)
+        self._published += 1
+
+        for sub in self._subscribers:
+            if sub.overflowed or not sub.wants(event):
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # slow client: stop queueing for it, it will be told to resync
+                sub.overflowed = True
+                self._overflows += 1
+        return event
+
+    def _missed(self, sub, last_event_id):
+        """Backlog events after last_event_id, or None if some of them are gone."""
+        if last_event_id is None:
+            return []
+        newest = self._backlog[-1]["id"] if self._backlog else 0
+        if last_event_id > newest:
+            return None   # id from before a restart
+        if self._backlog and self._backlog[0]["id"] > last_event_id + 1:
+            return None
+        return [e for e in self._backlog if e["id"] > last_event_id and sub.wants(e)]
+
+    async def stream(self, role, usn=None, last_event_id=None):
+        """SSE text for one client until it disconnects or the bus closes."""
+        sub = _Subscriber(role, usn)
+        self._subscribers.add(sub)
+        try:
+            missed = self._missed(sub, last_event_id)
+            if missed is None:
+                yield _format("resync", {"reason": "missed events"})
+            else:
+                for event in missed:
+                    yield _format(event["type"], event["data"], event["id"])
+
+            while True:
+                if sub.overflowed:
+                    yield _format("resync", {"reason": "client too slow"})
+                    return
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), EVENT_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is _CLOSED:
+                    return
+                yield _format(event["type"], event["data"], event["id"])
+        finally:
+            self._subscribers.discard(sub)
+
+    def close(self):
+        """End every open stream (on shutdown, so the server isn't held open)."""
+        for sub in self._subscribers:
+            while True:
+                try:
+                    sub.queue.put_nowait(_CLOSED)
+                    break
+                except asyncio.QueueFull:
+                    sub.queue.get_nowait()
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self._published,
+            "overflows": self._overflows,
+            "backlog": len(self._backlog),
+        }
+
+
+def _format(event_type, data, event_id=None):
+    lines = f"id: {event_id}\n" if event_id is not None else ""
+    return lines + f"event: {event_type}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+events = EventBus()
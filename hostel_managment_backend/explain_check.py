@@ -0,0 +1,121 @@
+"""
+EXPLAIN every route query against a seeded dataset and fail on full table scans.
+The statements are the routes' own module-level constants / builders, so they can't drift.
+
+    python migrate.py upgrade
+    python seed.py --students 5000 --rooms 1500
+    python explain_check.py
+
+A plan row with type=ALL is a full table scan. Listings that return every row by
+design (/rooms, /fees/all, ...) list the table aliases they are allowed to scan.
+"""
+import sys
+
+from database import get_connection
+from seed import SEED_PREFIX, analyze
+from allocation import FREE_BED_QUERY, CHOSEN_BED_QUERY, BULK_FREE_BEDS_QUERY
+from dashboard_stats import COUNTS_QUERY, ROOMS_QUERY
+from occupancy import BED_COUNTS_QUERY
+from search import SEARCH_QUERIES, boolean_query
+from room_details import STUDENT_ROOM_QUERY, ROOMMATES_QUERY, room_details_query, room_details_params
+from main import (
+    UNRESOLVED_COMPLAINTS_QUERY, ALL_FEES_QUERY, WARDEN_LOGIN_QUERY, STUDENT_LOGIN_QUERY, ROOM_LIST_QUERY,
+    PENDING_STUDENTS_QUERY, STUDENT_QUERY, STUDENT_LEAVES_QUERY, STUDENT_COMPLAINTS_QUERY, PENDING_LEAVES_QUERY,
+    NOTICES_QUERY, STUDENT_FEE_QUERY, STUDENT_PAYMENTS_QUERY, RECENT_COMPLAINTS_QUERY, RECENT_LEAVES_QUERY,
+    ACTIVE_COMPLAINTS_QUERY, STUDENT_RECENT_LEAVES_QUERY, DEFAULT_STUDENT_FIELDS, students_query,
+)
+
+
+def _students(**filters):
+    # the exact statement GET /students builds for these filters (limit 50 -> 51 rows fetched)
+    query, params = students_query(DEFAULT_STUDENT_FIELDS, **filters)
+    return query, tuple(params) or None
+
+
+def route_queries(sample):
+    """(route, query, params, tables allowed to be scanned) — params come from seeded rows."""
+    usn, room_no, email = sample["usn"], sample["room_no"], sample["email"]
+    return [
+        ("POST /warden-login", WARDEN_LOGIN_QUERY, ("warden@mit.edu",), set()),
+        ("POST /student-login", STUDENT_LOGIN_QUERY, (email,), set()),
+        ("GET /students (all)", *_students(), {"s"}),
+        ("GET /students?allocation_status", *_students(allocation_status="Pending", after=usn, limit=51), set()),
+        ("GET /students?department", *_students(department="CSE", limit=51), set()),
+        ("GET /students?year", *_students(year=2, limit=51), set()),
+        ("GET /rooms", ROOM_LIST_QUERY, None, {"r"}),
+        ("GET /available-rooms (index rebuild)", BED_COUNTS_QUERY, None, {"bed"}),
+        ("GET /pending-students", PENDING_STUDENTS_QUERY, None, set()),
+        ("GET /student/{usn}", STUDENT_QUERY, (usn,), set()),
+        ("GET /student-room/{usn}", STUDENT_ROOM_QUERY, (usn,), set()),
+        ("GET /roommates/{usn}", ROOMMATES_QUERY, (usn,), set()),
+        ("GET /student-leaves/{usn}", STUDENT_LEAVES_QUERY, (usn,), set()),
+        ("GET /student-complaints/{usn}", STUDENT_COMPLAINTS_QUERY, (usn,), set()),
+        ("GET /leaves/pending", PENDING_LEAVES_QUERY, None, set()),
+        ("GET /complaints/unresolved", UNRESOLVED_COMPLAINTS_QUERY, None, set()),
+        ("GET /notice/all", NOTICES_QUERY, None, {"notice"}),
+        ("POST /fees/student", STUDENT_FEE_QUERY, (usn,), set()),
+        ("GET /fees/all", ALL_FEES_QUERY, None, {"f"}),
+        ("GET /fees/payments/{usn}", STUDENT_PAYMENTS_QUERY, (usn,), set()),
+        ("GET /dashboard/summary (reconcile)", COUNTS_QUERY, None, set()),
+        ("GET /dashboard/summary (rooms)", ROOMS_QUERY, None, {"room"}),
+        ("GET /dashboard/recent-complaints", RECENT_COMPLAINTS_QUERY, None, set()),
+        ("GET /dashboard/recent-leaves", RECENT_LEAVES_QUERY, None, set()),
+        ("POST /complaint/active-count", ACTIVE_COMPLAINTS_QUERY, (usn,), set()),
+        ("POST /room/details", room_details_query(1), room_details_params([room_no]), set()),
+        ("GET /search (student)", SEARCH_QUERIES["student"], (boolean_query(usn[:6]),) * 2 + (21, 0), set()),
+        ("GET /search (complaint)", SEARCH_QUERIES["complaint"], (boolean_query("water"),) * 2 + (21, 0), set()),
+        ("GET /search (notice)", SEARCH_QUERIES["notice"], (boolean_query("hostel"),) * 2 + (21, 0), set()),
+        ("POST /student/recent-leaves", STUDENT_RECENT_LEAVES_QUERY, (usn,), set()),
+        ("POST /auto-allocate", FREE_BED_QUERY, None, set()),
+        ("POST /allocate-room", CHOSEN_BED_QUERY, (room_no, 1), set()),
+        ("POST /auto-allocate/bulk (beds)", BULK_FREE_BEDS_QUERY, None, set()),
+    ]
+
+
+def _sample(cursor):
+    cursor.execute(
+        "SELECT a.usn, a.room_no, s.email FROM allocation a JOIN student s ON s.usn = a.usn "
+        "WHERE a.usn LIKE %s ORDER BY a.usn LIMIT 1",
+        (SEED_PREFIX + "%",),
+    )
+    return cursor.fetchone()
+
+
+def check(conn):
+    """Returns [(route, table, plan_row)] for every unexpected full table scan."""
+    analyze(conn)
+    cursor = conn.cursor(dictionary=True)
+    sample = _sample(cursor)
+    if sample is None:
+        cursor.close()
+        raise RuntimeError("No seeded data found — run `python seed.py` first")
+
+    problems = []
+    for route, query, params, allowed in route_queries(sample):
+        cursor.execute("EXPLAIN " + query, params)
+        for row in cursor.fetchall():
+            table = row.get("table")
+            if row.get("type") == "ALL" and table not in allowed:
+                problems.append((route, table, row))
+            print(f"   {route:<38} {str(table):<12} {str(row.get('type')):<7} key={row.get('key')} rows={row.get('rows')}")
+    cursor.close()
+    return problems
+
+
+if __name__ == "__main__":
+    conn = get_connection()
+    if conn is None:
+        print("❌ Could not connect to MySQL")
+        sys.exit(1)
+
+    try:
+        problems = check(conn)
+    finally:
+        conn.close()
+
+    if problems:
+        print(f"\n❌ {len(problems)} full table scan(s):")
+        for route, table, row in problems:
+            print(f"   {route}: table {table} (rows={row.get('rows')}, possible_keys={row.get('possible_keys')})")
+        sys.exit(1)
+    print("\n✅ No unexpected full table scans")
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+class ExportFormatError(Exception):
+    """Unknown ?format= value for a streaming export."""
+
+
+def check_format(fmt):
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unsupported export format '{fmt}' — use {' or '.join(EXPORT_FORMATS)}")
+    return fmt
+
+
+def _ndjson_lines(rows):
+    # default=str covers dates and Decimals the same way FastAPI's JSON output would read them
+    return "".join(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in rows)
+
+
+def _csv_lines(rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    for row in rows:
+        writer.writerow("" if value is None else value for value in row.values())
+    return buffer.getvalue()
+
+
+async def _stream_rows(conn, query, params, fmt, transform, chunk_rows, columns):
+    """
+    Run `query` on an unbuffered cursor and yield encoded chunks of at most `chunk_rows` rows.
+    Owns `conn`: it goes back to the pool once every row was read, and is closed if the client
+    disconnects half way (the rest of the result is still on the wire).
+    """
+    finished = False
+    try:
+        cursor = await conn.cursor(dictionary=True, unbuffered=True)
+        await cursor.execute(query, params)
+        if fmt == "csv":
+            # header up front, so an empty result is still a valid CSV file
+            header = columns if columns is not None else [d[0] for d in cursor.description]
+            yield _csv_lines([], header)
+        while True:
+            rows = await cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            if transform is not None:
+                rows = [transform(row) for row in rows]
+            if fmt == "csv":
+                yield _csv_lines(rows, None)
+            else:
+                yield _ndjson_lines(rows)
+        await cursor.close()
+        finished = True
+    finally:
+        if finished:
+            await conn.close()
+        else:
+            await conn.discard()
+
+
+class _ExportResponse(StreamingResponse):
+    """
+    StreamingResponse that always lets go of the export's connection. If the client is gone
+    before the first chunk (or a send fails), the row generator never runs or is left
+    suspended, and its own cleanup would not free the pooled connection.
+    """
+
+    def __init__(self, rows, conn, **kwargs):
+        super().__init__(rows, **kwargs)
+        self._rows = rows
+        self._conn = conn
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._rows.aclose()     # runs the generator's finally if it had started
+            await self._conn.discard()    # no-op if the generator already released it
+
+
+def streaming_export(conn, query, params=None, fmt="ndjson", transform=None, filename="export",
+                     chunk_rows=EXPORT_CHUNK_ROWS, columns=None):
+    """
+    StreamingResponse for a listing: memory stays at one chunk of rows however large the result is.
+    `transform` (optional) reshapes each row dict before it is written; pass the keys it returns
+    as `columns` so a CSV header can be written (the query's own column names are used otherwise).
+    """
+    if fmt == "csv" and transform is not None and columns is None:
+        raise ValueError("columns is required for a CSV export with a transform")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    return _ExportResponse(
+        _stream_rows(conn, query, params, fmt, transform, chunk_rows, columns),
+        conn,
+        media_type=EXPORT_FORMATS[fmt],
+        headers=headers,
+    )
@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+
+# rows per transaction for bulk payment uploads
+PAYMENT_BATCH_ROWS = 500
+
+# fees.status from fees.paid. Single-table UPDATE assignments run left to right, so when
+# this follows "paid = ..." in the same SET it sees the new paid value.
+STATUS_FROM_PAID = "CASE WHEN paid >= total_fee THEN 'Paid' WHEN paid > 0 THEN 'Partially Paid' ELSE 'Pending' END"
+
+
+class PaymentError(Exception):
+    """Payment could not be recorded (unknown USN...)."""
+
+
+def _placeholders(n):
+    return ", ".join(["%s"] * n)
+
+
+async def record_payments(conn, payments, source="api"):
+    """
+    Append `payments` to the fee_payment ledger and add them to fees.paid, in ONE
+    transaction.
+
+    payments: list of dicts with usn, amount (Decimal > 0), idempotency_key, reference, paid_on.
+    Payments whose idempotency_key is already in the ledger are skipped, so re-sending
+    a batch (or a retried request) never pays twice. fees.paid is capped at total_fee
+    as before; the ledger keeps the full amount.
+
+    Returns {"applied": [payment...], "duplicates": [payment...], "unknown": [payment...]}.
+    """
+    if not payments:
+        return {"applied": [], "duplicates": [], "unknown": []}
+
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        # 1️⃣ lock the fee rows (sorted, so concurrent batches can't deadlock on each other)
+        usns = sorted({p["usn"] for p in payments})
+        await cursor.execute(
+            f"SELECT usn FROM fees WHERE usn IN ({_placeholders(len(usns))}) ORDER BY usn FOR UPDATE",
+            usns,
+        )
+        known = {row["usn"] for row in await cursor.fetchall()}
+
+        # 2️⃣ already-applied idempotency keys
+        keys = [p["idempotency_key"] for p in payments if p.get("idempotency_key")]
+        seen = set()
+        if keys:
+            await cursor.execute(
+                f"SELECT idempotency_key FROM fee_payment WHERE idempotency_key IN ({_placeholders(len(keys))})",
+                keys,
+            )
+            seen = {row["idempotency_key"] for row in await cursor.fetchall()}
+
+        applied, duplicates, unknown = [], [], []
+        for p in payments:
+            key = p.get("idempotency_key")
+            if key and key in seen:
+                duplicates.append(p)
+            elif p["usn"] not in known:
+                unknown.append(p)
+            else:
+                if key:
+                    seen.add(key)   # same key twice in one batch counts once
+                applied.append(p)
+
+        if applied:
+            # 3️⃣ ledger rows (append-only)
+            await cursor.executemany(
+                "INSERT INTO fee_payment (usn, amount, idempotency_key, reference, paid_on, source) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [(p["usn"], p["amount"], p.get("idempotency_key"), p.get("reference"), p.get("paid_on"), source)
+                 for p in applied],
+            )
+
+            # 4️⃣ one UPDATE for the whole batch: paid += that USN's total, status recomputed
+            totals = defaultdict(int)
+            for p in applied:
+                totals[p["usn"]] += p["amount"]
+            case = " ".join(["WHEN %s THEN %s"] * len(totals))
+            params = [v for pair in totals.items() for v in pair] + list(totals)
+            await cursor.execute(
+                f"""
+                UPDATE fees
+                SET paid = LEAST(paid + CASE usn {case} END, total_fee),
+                    status = {STATUS_FROM_PAID}
+                WHERE usn IN ({_placeholders(len(totals))})
+                """,
+                params,
+            )
+
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {"applied": applied, "duplicates": duplicates, "unknown": unknown}
+
+
+async def record_payment(conn, usn, amount, idempotency_key=None, reference=None, paid_on=None):
+    """Single payment; returns (applied?, {"paid", "status"} as they stand after it)."""
+    payment = {"usn": usn, "amount": amount, "idempotency_key": idempotency_key,
+               "reference": reference, "paid_on": paid_on}
+
+    result = await record_payments(conn, [payment])
+    if result["unknown"]:
+        raise PaymentError(f"No fee record found for USN {usn}")
+
+    cursor = await conn.cursor(dictionary=True)
+    await cursor.execute("SELECT paid, status FROM fees WHERE usn = %s", (usn,))
+    fee = await cursor.fetchone()
+    await cursor.close()
+    return bool(result["applied"]), fee
@@ -0,0 +1,148 @@
+"""
+Structured logging for the backend.
+
+- records go onto an in-memory queue (QueueHandler); a single QueueListener thread
+  formats and writes them, so request handlers never block on console / file I/O
+- HOSTEL_LOG_LEVEL sets the default level, HOSTEL_LOG_LEVELS overrides it per module:
+      HOSTEL_LOG_LEVELS="database=DEBUG,metrics=WARNING"
+- HOSTEL_LOG_FORMAT=json (one JSON object per line) or text
+- records logged with extra=SAMPLED are rate limited per message template: the first
+  one in each HOSTEL_LOG_SAMPLE_INTERVAL window is written, the rest are counted and the
+  count is attached to the next one that gets through
+
+Keyword fields passed through `extra=` (e.g. extra={"errno": 2003}) become JSON fields.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+
+LOG_LEVEL = os.environ.get("HOSTEL_LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.environ.get("HOSTEL_LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("HOSTEL_LOG_FORMAT", "text").lower()
+LOG_SAMPLE_INTERVAL = float(os.environ.get("HOSTEL_LOG_SAMPLE_INTERVAL", "10"))
+# records dropped (and counted) once this many are waiting for the writer thread
+LOG_QUEUE_SIZE = int(os.environ.get("HOSTEL_LOG_QUEUE_SIZE", "10000"))
+
+# pass as extra= to opt a repetitive message into sampling
+SAMPLED = {"sampled": True}
+
+# attributes every LogRecord has; anything else on a record is a structured field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sampled", "suppressed"}
+
+
+def _fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = _fields(record)
+        if fields:
+            text += "  " + " ".join(f"{k}={v}" for k, v in fields.items())
+        if getattr(record, "suppressed", 0):
+            text += f"  (+{record.suppressed} similar suppressed)"
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """Lets one SAMPLED record per (logger, template) through every `interval` seconds."""
+
+    def __init__(self, interval=LOG_SAMPLE_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._windows = {}   # (logger, template) -> [window_start, suppressed]
+
+    def filter(self, record):
+        if not getattr(record, "sampled", False):
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            record.suppressed = window[1] if window else 0
+            self._windows[key] = [now, 0]
+            return True
+        window[1] += 1
+        return False
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all formatting to the listener thread and never blocks."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def configure_logging():
+    """Install the queue handler on the root logger (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = _NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    for item in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+        name, _, level = item.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush everything still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats():
+    return {"dropped": _NonBlockingQueueHandler.dropped, "level": LOG_LEVEL, "format": LOG_FORMAT}
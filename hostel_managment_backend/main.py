@@ -1,9 +1,37 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from database import get_connection
+from fastapi import Depends, FastAPI, Query, Request
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import List, Optional
+from datetime import date
+from decimal import Decimal, InvalidOperation
+import logging
+import time
+from async_database import get_connection, pool_stats, open_pool, close_pool, Error
+from database import breaker_stats
+from fee_payments import record_payment, record_payments, PaymentError, PAYMENT_BATCH_ROWS
+from workflow import bulk_set_status, LEAVE_FLOW, COMPLAINT_FLOW, WorkflowError
+from allocation import allocate_bed, allocate_free_bed, bulk_allocate, deallocate, AllocationError
+from bulk_import import detect_format, iter_row_chunks, iter_json_chunks, ImportFormatError
+from export import streaming_export, check_format, ExportFormatError
+from dashboard_stats import dashboard
+from response_cache import response_cache
+from metrics import metrics_response
+from occupancy import occupancy, check_consistency
+from search import search, parse_types, SearchError, SEARCH_MAX_LIMIT
+from room_details import fetch_room_details, room_number, ROOM_DETAILS_MAX, STUDENT_ROOM_QUERY, ROOMMATES_QUERY
+from passwords import passwords, PasswordBusyError
+from sessions import issue_token, current_session, require_role, verify_token, revocations, TokenError
+from events import events
+from audit import audit, bind_actor
+from replicas import router as replica_router, bind_caller
+from request_context import RequestContextMiddleware
+from logging_config import configure_logging, stop_logging, logging_stats
 from fastapi.middleware.cors import CORSMiddleware
-from mysql.connector import Error
+from fastapi.responses import JSONResponse, StreamingResponse
+
 
+# ✅ Logs go through a queue to a writer thread (see logging_config for HOSTEL_LOG_* settings)
+configure_logging()
+log = logging.getLogger(__name__)
 
 app = FastAPI(title="MIT Hostel Solutions API")
 
@@ -16,33 +44,142 @@ app.add_middleware(
     allow_headers=["*"],   # allow all headers
 )
 
+# ✅ One ASGI middleware for per-request state:
+#    - per-route latency / SQL statement / DB time / rows counters, scraped from /metrics
+#    - the caller from the session token, so audit entries know who acted
+#    - the caller for the replica router (read-your-writes after a commit)
+app.add_middleware(RequestContextMiddleware, binders=(bind_actor, bind_caller))
+
+
+@app.on_event("startup")
+async def startup():
+    await open_pool()
+    dashboard.start()
+    revocations.start()
+    audit.start()
+    replica_router.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    events.close()
+    await dashboard.stop()
+    await revocations.stop()
+    await audit.stop()      # flushes buffered audit entries, so before the pool closes
+    await replica_router.stop()
+    await close_pool()
+    passwords.shutdown()
+    stop_logging()
+
+
+# "field: message" strings for a pydantic ValidationError (used in bulk upload reports)
+def validation_messages(error):
+    return [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in error.errors()]
+
+
+# ✅ Connection pool + circuit breaker health (in-use / idle connections, wait time, breaker state & trips)
+@app.get("/db/stats")
+async def db_stats():
+    return {
+        "status": "success",
+        "pool": pool_stats(),
+        "breaker": breaker_stats(),
+        "dashboard": dashboard.stats(),
+        "occupancy": occupancy.stats(),
+        "passwords": passwords.stats(),
+        "sessions": revocations.stats(),
+        "events": events.stats(),
+        "audit": audit.stats(),
+        "replicas": replica_router.stats(),
+        "logging": logging_stats()
+    }
+
+
+# Prometheus text format; HOSTEL_SLOW_REQUEST_MS=<ms> also prints SQL traces of slow requests
+@app.get("/metrics")
+async def get_metrics():
+    return metrics_response()
+
+
+# Hit/miss ratios of the response cache behind /rooms, /available-rooms and /notice/all
+@app.get("/cache/stats")
+async def cache_stats():
+    return {"status": "success", "cache": response_cache.stats()}
+
+
+# Store a scrypt hash in place of a plaintext (or outdated) password after a successful login.
+# Only replaces the exact value that was verified, so a concurrent password change wins.
+# A failure here must not fail the login: the row is simply upgraded next time.
+async def upgrade_password_hash(table, key_column, key, verified_value, password):
+    try:
+        new_hash = await passwords.hash(password)
+    except PasswordBusyError:
+        return
+
+    conn = await get_connection()
+    if conn is None:
+        return
+
+    try:
+        cursor = await conn.cursor()
+        await cursor.execute(
+            f"UPDATE {table} SET password=%s WHERE {key_column}=%s AND password=%s",
+            (new_hash, key, verified_value),
+        )
+        await conn.commit()
+        await cursor.close()
+    except Error as e:
+        log.warning("Password hash upgrade failed for %s %s: %s", table, key, e)
+    finally:
+        await conn.close()
+
+
 # Pydantic model for JSON input
 class WardenLogin(BaseModel):
     email: str
     password: str
 
+# looked up by email only; the password is checked afterwards on the password pool
+WARDEN_LOGIN_QUERY = "SELECT * FROM warden WHERE email = %s"
+
 @app.post("/warden-login")
-def warden_login(credentials: WardenLogin):
+async def warden_login(credentials: WardenLogin):
     email = credentials.email
     password = credentials.password
 
-    conn = get_connection()
+    conn = await get_connection()
     if conn is None:
         return {"status": "error", "message": "Database connection failed"}
 
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM warden WHERE email = %s AND password = %s", (email, password))
-    warden = cursor.fetchone()
-
-    cursor.close()
-    conn.close()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(WARDEN_LOGIN_QUERY, (email,))
+        warden = await cursor.fetchone()
+        await cursor.close()
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
+    # verify on the password pool, after the connection is back in the DB pool
     if not warden:
         return {"status": "error", "message": "Invalid email or password"}
+    try:
+        ok, needs_rehash = await passwords.verify(password, warden["password"])
+    except PasswordBusyError as e:
+        return {"status": "error", "message": str(e)}
+    if not ok:
+        return {"status": "error", "message": "Invalid email or password"}
+    if needs_rehash:
+        await upgrade_password_hash("warden", "warden_id", warden["warden_id"], warden["password"], password)
+
+    token, expires_at = issue_token(warden["warden_id"], "warden")
 
     return {
         "status": "success",
         "message": f"Welcome {warden['name']}!",
+        "token": token,
+        "expires_at": expires_at,
         "warden": {
             "id": warden["warden_id"],
             "name": warden["name"],
@@ -64,20 +201,28 @@ class StudentInput(BaseModel):
 
 
 @app.post("/add-student")
-def add_student(student: StudentInput):
+async def add_student(student: StudentInput):
+    # hash before taking a DB connection, so the KDF never holds one
+    default_password = student.usn
     try:
-        conn = get_connection()
-        if conn is None:
-            return {"status": "error", "message": "Database connection failed"}
+        password_hash = await passwords.hash(default_password)
+    except PasswordBusyError as e:
+        return {"status": "error", "message": str(e)}
 
-        cursor = conn.cursor()
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        cursor = await conn.cursor()
 
-        default_password = student.usn
         room_status = "Pending"
 
+        await conn.start_transaction()
+
         # ✅ Insert into student table
         query_student = """
-            INSERT INTO student 
+            INSERT INTO student
             (usn, name, student_mobile, father_mobile, mother_mobile, email, department_name, year, blood_group, password, room_allocation_status)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
@@ -91,21 +236,21 @@ def add_student(student: StudentInput):
             student.department_name,
             student.year,
             student.blood_group,
-            default_password,
+            password_hash,
             room_status
         )
-        cursor.execute(query_student, values_student)
+        await cursor.execute(query_student, values_student)
 
         # ✅ Automatically add entry to fees table (exclude 'pending' since it's generated)
         query_fee = """
             INSERT INTO fees (usn, name, total_fee, paid, status, due_date)
             VALUES (%s, %s, %s, %s, %s, NULL)
         """
-        cursor.execute(query_fee, (student.usn, student.name, 0.00, 0.00, "Pending"))
+        await cursor.execute(query_fee, (student.usn, student.name, 0.00, 0.00, "Pending"))
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.commit()
+        await cursor.close()
+        dashboard.students_added(1)
 
         return {
             "status": "success",
@@ -115,100 +260,340 @@ def add_student(student: StudentInput):
         }
 
     except Error as e:
+        await conn.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+# Multi-row inserts for /students/import; plain %s placeholders only, so aiomysql
+# sends each chunk as ONE INSERT (see ROOM_INSERT_QUERY)
+STUDENT_IMPORT_QUERY = """
+    INSERT INTO student
+    (usn, name, student_mobile, father_mobile, mother_mobile, email, department_name, year, blood_group, password, room_allocation_status)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+FEE_IMPORT_QUERY = "INSERT INTO fees (usn, name, total_fee, paid, status, due_date) VALUES (%s, %s, %s, %s, %s, %s)"
+
+
+# ✅ Bulk import students from a CSV / XLSX upload
+#    curl -X POST --data-binary @intake.csv -H "Content-Type: text/csv" http://127.0.0.1:8000/students/import
+#    The body is parsed as it streams in and written in chunked transactions; bad rows are reported, not fatal.
+@app.post("/students/import")
+async def import_students(request: Request, format: Optional[str] = None):
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except ImportFormatError as e:
         return {"status": "error", "message": str(e)}
 
+    started = time.perf_counter()
+    imported = 0
+    errors = []
+    seen_usns, seen_emails = set(), set()
+
+    # a connection is only held for each chunk's queries, never while hashing passwords
+    try:
+        async for chunk in iter_row_chunks(request.stream(), fmt):
+            # ---- 1️⃣ validate every row against StudentInput ----
+            valid = []
+            for row_no, row in chunk:
+                try:
+                    student = StudentInput(**row)
+                except ValidationError as e:
+                    errors.append({
+                        "row": row_no,
+                        "usn": row.get("usn"),
+                        "errors": validation_messages(e)
+                    })
+                    continue
+                if student.usn in seen_usns or student.email in seen_emails:
+                    errors.append({"row": row_no, "usn": student.usn, "errors": ["Duplicate usn or email in file"]})
+                    continue
+                seen_usns.add(student.usn)
+                seen_emails.add(student.email)
+                valid.append((row_no, student))
+
+            if not valid:
+                continue
+
+            # ---- 2️⃣ skip students that already exist (one query per chunk) ----
+            usns = [s.usn for _, s in valid]
+            emails = [s.email for _, s in valid]
+            conn = await get_connection()
+            if conn is None:
+                return {"status": "error", "message": "Database connection failed", "imported": imported, "errors": errors}
+            try:
+                cursor = await conn.cursor(dictionary=True)
+                await cursor.execute(
+                    f"SELECT usn, email FROM student WHERE usn IN ({', '.join(['%s'] * len(usns))}) "
+                    f"OR email IN ({', '.join(['%s'] * len(emails))})",
+                    usns + emails,
+                )
+                existing = await cursor.fetchall()
+                await cursor.close()
+            finally:
+                await conn.close()
+            taken = {r["usn"] for r in existing} | {r["email"] for r in existing}
+
+            to_insert = []
+            for row_no, student in valid:
+                if student.usn in taken or student.email in taken:
+                    errors.append({"row": row_no, "usn": student.usn, "errors": ["Student with this usn or email already exists"]})
+                else:
+                    to_insert.append((row_no, student))
+
+            if not to_insert:
+                continue
+
+            # ---- 3️⃣ default password = USN, as for /add-student, hashed off the event loop ----
+            try:
+                hashes = await passwords.hash_many([s.usn for _, s in to_insert])
+            except PasswordBusyError as e:
+                for row_no, student in to_insert:
+                    errors.append({"row": row_no, "usn": student.usn, "errors": [str(e)]})
+                continue
+
+            # ---- 4️⃣ multi-row inserts, one transaction per chunk ----
+            conn = await get_connection()
+            if conn is None:
+                return {"status": "error", "message": "Database connection failed", "imported": imported, "errors": errors}
+            try:
+                cursor = await conn.cursor()
+                await conn.start_transaction()
+                await cursor.executemany(
+                    STUDENT_IMPORT_QUERY,
+                    [
+                        (s.usn, s.name, s.student_mobile, s.father_mobile, s.mother_mobile, s.email,
+                         s.department_name, s.year, s.blood_group, password_hash, "Pending")
+                        for (_, s), password_hash in zip(to_insert, hashes)
+                    ],
+                )
+                await cursor.executemany(
+                    FEE_IMPORT_QUERY,
+                    [(s.usn, s.name, Decimal("0.00"), Decimal("0.00"), "Pending", None) for _, s in to_insert],
+                )
+                await conn.commit()
+                await cursor.close()
+                imported += len(to_insert)
+                dashboard.students_added(len(to_insert))
+            except Error as e:
+                await conn.rollback()
+                for row_no, student in to_insert:
+                    errors.append({"row": row_no, "usn": student.usn, "errors": [f"Chunk rolled back: {e}"]})
+            finally:
+                await conn.close()
+
+    except ImportFormatError as e:
+        return {"status": "error", "message": str(e)}
+    except Error as e:
+        return {"status": "error", "message": str(e), "imported": imported, "errors": errors}
+
+    return {
+        "status": "success",
+        "message": f"Imported {imported} students, {len(errors)} rows rejected",
+        "imported": imported,
+        "failed": len(errors),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        "errors": errors
+    }
+
+
+# Columns selectable with /students?fields=...  (usn is always returned: it is the page cursor)
+STUDENT_FIELDS = {
+    "usn": "s.usn",
+    "name": "s.name",
+    "student_mobile": "s.student_mobile",
+    "father_mobile": "s.father_mobile",
+    "mother_mobile": "s.mother_mobile",
+    "email": "s.email",
+    "department_name": "s.department_name",
+    "year": "s.year",
+    "blood_group": "s.blood_group",
+    "room_no": "COALESCE(a.room_no, '—')",
+    "bed_no": "COALESCE(a.bed_no, '—')",
+    "room_allocation_status": "s.room_allocation_status",
+}
+DEFAULT_STUDENT_FIELDS = [
+    "usn", "name", "student_mobile", "father_mobile", "mother_mobile", "email",
+    "room_no", "bed_no", "room_allocation_status",
+]
+MAX_PAGE_SIZE = 500
+
+
+def students_query(selected, allocation_status=None, department=None, year=None, after=None, limit=None):
+    """(SQL, params) for a /students page: `selected` STUDENT_FIELDS, optional filters, at most `limit` rows."""
+    # WHERE clauses all lead with an indexed column and the ORDER BY is the primary key,
+    # so each page is an index range read no matter how deep the cursor is
+    where, params = [], []
+    if allocation_status:
+        where.append("s.room_allocation_status = %s")
+        params.append(allocation_status)
+    if department:
+        where.append("s.department_name = %s")
+        params.append(department)
+    if year is not None:
+        where.append("s.year = %s")
+        params.append(year)
+    if after:
+        where.append("s.usn > %s")
+        params.append(after)
+
+    needs_allocation = "room_no" in selected or "bed_no" in selected
+    query = f"""
+        SELECT {", ".join(f"{STUDENT_FIELDS[f]} AS {f}" for f in selected)}
+        FROM student s
+        {"LEFT JOIN allocation a ON s.usn = a.usn" if needs_allocation else ""}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.usn ASC
+    """
+    if limit:
+        query += " LIMIT %s"
+        params.append(limit)
+    return query, params
+
+
 # ✅ Get all students with room & bed info (if allocated)
+#    Optional keyset pagination: /students?limit=50 then /students?limit=50&after=<next_cursor>
+#    Filters: allocation_status=Pending|Allocated, department=..., year=...; projection: fields=usn,name,email
+#    Export: format=ndjson|csv streams every matching row (limit/after still apply)
 @app.get("/students")
-def get_students():
+async def get_students(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    allocation_status: Optional[str] = None,
+    department: Optional[str] = None,
+    year: Optional[int] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None
+):
     try:
-        conn = get_connection()
-        if conn is None:
-            return {"status": "error", "message": "Database connection failed"}
+        export_format = check_format(format) if format else None
+    except ExportFormatError as e:
+        return {"status": "error", "message": str(e)}
 
-        cursor = conn.cursor(dictionary=True)
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in STUDENT_FIELDS]
+        if unknown:
+            return {"status": "error", "message": f"Unknown fields {unknown} — use any of {list(STUDENT_FIELDS)}"}
+        if "usn" not in selected:
+            selected.insert(0, "usn")
+    else:
+        selected = DEFAULT_STUDENT_FIELDS
+
+    # one extra row tells us whether there is a next page (an export just stops at `limit`)
+    fetch = (limit if export_format else limit + 1) if limit else None
+    query, params = students_query(selected, allocation_status, department, year, after, fetch)
+
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        query = """
-            SELECT 
-                s.usn,
-                s.name,
-                s.student_mobile,
-                s.father_mobile,
-                s.mother_mobile,
-                s.email,
-                COALESCE(a.room_no, '—') AS room_no,
-                COALESCE(a.bed_no, '—') AS bed_no,
-                s.room_allocation_status
-            FROM student s
-            LEFT JOIN allocation a ON s.usn = a.usn
-            ORDER BY s.usn ASC;
-        """
+    if export_format:
+        # the stream owns the connection from here on
+        return streaming_export(conn, query, params or None, export_format, filename="students")
 
-        cursor.execute(query)
-        students = cursor.fetchall()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(query, params or None)
+        students = await cursor.fetchall()
+        await cursor.close()
 
-        cursor.close()
-        conn.close()
+        page = {}
+        if limit:
+            has_more = len(students) > limit
+            students = students[:limit]
+            page = {"has_more": has_more, "next_cursor": students[-1]["usn"] if has_more else None}
 
         if not students:
-            return {"status": "success", "data": [], "message": "No students found"}
+            return {"status": "success", "data": [], "message": "No students found", **page}
 
-        return {"status": "success", "count": len(students), "data": students}
+        return {"status": "success", "count": len(students), "data": students, **page}
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 # ✅ Model for room input
 class RoomInput(BaseModel):
-    room_no: str
+    room_no: int
     no_of_beds: int
     no_of_tables: int
     no_of_chairs: int
     no_of_fans: int
 
+    # room.room_no is an INT column: "0101" must be room 101 in the dashboard / occupancy keys too
+    @field_validator("room_no", mode="before")
+    @classmethod
+    def _room_no(cls, value):
+        return room_number(value)
 
-# ✅ Add Room API (auto-create beds)
-@app.post("/add-room")
-def add_room(room: RoomInput):
-    try:
-        conn = get_connection()
-        if conn is None:
-            return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor()
+ROOM_BATCH_SIZE = 500
 
-        # default: room is empty when created
-        no_of_occupancy = 0
+# Only plain %s placeholders in VALUES: aiomysql rewrites executemany() into one
+# multi-row INSERT only then (literals make it fall back to one execute() per row)
+ROOM_INSERT_QUERY = """
+    INSERT INTO room (room_no, no_of_beds, no_of_tables, no_of_chairs, no_of_fans, no_of_occupancy)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+BED_INSERT_QUERY = "INSERT INTO bed (room_no, bed_no, occupied_by) VALUES (%s, %s, %s)"
 
-        # ---- 1️⃣ Insert Room Details ----
-        query_room = """
-            INSERT INTO room (room_no, no_of_beds, no_of_tables, no_of_chairs, no_of_fans, no_of_occupancy)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        room_values = (
-            room.room_no,
-            room.no_of_beds,
-            room.no_of_tables,
-            room.no_of_chairs,
-            room.no_of_fans,
-            no_of_occupancy
+
+# In-memory views of rooms/beds (dashboard counters, occupancy index, cached room lists),
+# updated once the write has committed
+def rooms_created(rooms):
+    dashboard.rooms_added([(r.room_no, r.no_of_beds) for r in rooms])
+    occupancy.rooms_added([(r.room_no, r.no_of_beds) for r in rooms])
+    response_cache.invalidate("rooms")
+
+
+def beds_changed(room_nos, delta=1):
+    """One room_no per bed taken (delta=1) or freed (delta=-1)."""
+    if not room_nos:
+        return
+    dashboard.beds_allocated(room_nos, delta)
+    occupancy.beds_changed(room_nos, delta)
+    response_cache.invalidate("rooms")
+
+
+# Insert rooms + all their beds with multi-row statements (caller owns the transaction)
+async def insert_rooms(cursor, rooms):
+    for start in range(0, len(rooms), ROOM_BATCH_SIZE):
+        batch = rooms[start:start + ROOM_BATCH_SIZE]
+
+        # ---- 1️⃣ Insert Room Details (room is empty when created) ----
+        await cursor.executemany(
+            ROOM_INSERT_QUERY,
+            [(r.room_no, r.no_of_beds, r.no_of_tables, r.no_of_chairs, r.no_of_fans, 0) for r in batch],
         )
 
-        cursor.execute(query_room, room_values)
+        # ---- 2️⃣ Auto Generate Beds — one multi-row INSERT instead of one per bed ----
+        await cursor.executemany(
+            BED_INSERT_QUERY,
+            [(r.room_no, bed_no, None) for r in batch for bed_no in range(1, r.no_of_beds + 1)],
+        )
 
-        # ---- 2️⃣ Auto Generate Beds for this Room ----
-        bed_query = """
-            INSERT INTO bed (room_no, bed_no, occupied_by)
-            VALUES (%s, %s, %s)
-        """
 
-        for i in range(1, room.no_of_beds + 1):
-            bed_no = i
-            cursor.execute(bed_query, (room.room_no, bed_no, None))
+# ✅ Add Room API (auto-create beds)
+@app.post("/add-room")
+async def add_room(room: RoomInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        cursor = await conn.cursor()
+
+        # default: room is empty when created
+        no_of_occupancy = 0
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await conn.start_transaction()
+        await insert_rooms(cursor, [room])
+        await conn.commit()
+        await cursor.close()
+        rooms_created([room])
 
         return {
             "status": "success",
@@ -224,38 +609,109 @@ def add_room(room: RoomInput):
         }
 
     except Error as e:
+        await conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+
+# ✅ Bulk add rooms: JSON list of RoomInput, or a CSV with the same columns
+#    All rooms and beds are created in ONE transaction — any bad row rejects the whole upload.
+@app.post("/rooms/bulk")
+async def add_rooms_bulk(request: Request, format: Optional[str] = None):
+    started = time.perf_counter()
+    rooms = []
+    errors = []
+
+    content_type = request.headers.get("content-type") or ""
+    try:
+        if "json" in content_type and not format:
+            chunks = iter_json_chunks(await request.json())
+        else:
+            chunks = iter_row_chunks(request.stream(), detect_format(content_type, format))
+
+        async for chunk in chunks:
+            for row_no, row in chunk:
+                if not isinstance(row, dict):
+                    errors.append({"row": row_no, "room_no": None, "errors": ["Each room must be an object"]})
+                    continue
+                try:
+                    rooms.append(RoomInput(**row))
+                except ValidationError as e:
+                    errors.append({"row": row_no, "room_no": row.get("room_no"), "errors": validation_messages(e)})
+    except (ImportFormatError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+
+    if errors:
+        return {"status": "error", "message": f"{len(errors)} invalid rows — nothing was created", "errors": errors}
+    if not rooms:
+        return {"status": "error", "message": "No rooms in request"}
+
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        cursor = await conn.cursor()
+        await conn.start_transaction()
+        await insert_rooms(cursor, rooms)
+        await conn.commit()
+        await cursor.close()
+        rooms_created(rooms)
+
+        total_beds = sum(r.no_of_beds for r in rooms)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        return {
+            "status": "success",
+            "message": f"{len(rooms)} rooms added with {total_beds} beds",
+            "rooms_created": len(rooms),
+            "beds_created": total_beds,
+            "elapsed_ms": elapsed_ms
+        }
+
+    except Error as e:
+        await conn.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 
 @app.get("/rooms")
-def get_rooms():
+async def get_rooms(request: Request):
     """
     Return all room details and a top summary using ONLY the `room` table.
     Vacancy = no_of_beds - no_of_occupancy (clamped to >= 0).
+    Cached until a room is added or a bed allocated.
     """
-    try:
-        conn = get_connection()
-        if conn is None:
-            return {"status": "error", "message": "Database connection failed"}
+    return await response_cache.serve(request, {"rooms"}, load_rooms)
+
+
+ROOM_LIST_QUERY = """
+    SELECT
+        r.room_no,
+        r.no_of_beds,
+        r.no_of_tables,
+        r.no_of_chairs,
+        r.no_of_fans,
+        r.no_of_occupancy,
+        GREATEST(r.no_of_beds - r.no_of_occupancy, 0) AS vacant_beds
+    FROM room r
+    ORDER BY r.room_no ASC
+"""
+
+async def load_rooms():
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor(dictionary=True)
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
         # Use the correct table name `room`
-        query = """
-            SELECT
-                r.room_no,
-                r.no_of_beds,
-                r.no_of_tables,
-                r.no_of_chairs,
-                r.no_of_fans,
-                r.no_of_occupancy,
-                GREATEST(r.no_of_beds - r.no_of_occupancy, 0) AS vacant_beds
-            FROM room r
-            ORDER BY r.room_no ASC;
-        """
-        cursor.execute(query)
-        rooms = cursor.fetchall()
+        await cursor.execute(ROOM_LIST_QUERY)
+        rooms = await cursor.fetchall()
+        await cursor.close()
 
         # compute summary
         total_rooms = len(rooms)
@@ -263,9 +719,6 @@ def get_rooms():
         total_occupied = sum(r["no_of_occupancy"] for r in rooms) if rooms else 0
         total_vacant = sum(r["vacant_beds"] for r in rooms) if rooms else 0
 
-        cursor.close()
-        conn.close()
-
         return {
             "status": "success",
             "summary": {
@@ -279,6 +732,8 @@ def get_rooms():
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 # ✅ Model for allocation input
@@ -290,177 +745,219 @@ class AllocationInput(BaseModel):
 
 # ✅ API: Allocate room + update all related tables
 @app.post("/allocate-room")
-def allocate_room(data: AllocationInput):
+async def allocate_room(data: AllocationInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        if conn is None:
-            return {"status": "error", "message": "Database connection failed"}
-        cursor = conn.cursor()
+        # locks the student + chosen bed, so a bed can never be handed out twice
+        allocation = await allocate_bed(conn, data.usn, data.room_no, data.bed_no)
+        beds_changed([allocation["room_no"]])
+        await audit.record(f"allocated {allocation['usn']} to room {allocation['room_no']} bed {allocation['bed_no']}")
 
-        usn = data.usn
-        room_no = data.room_no
-        bed_no = data.bed_no
+        return {
+            "status": "success",
+            "message": f"Student {allocation['usn']} allocated Room {allocation['room_no']}, Bed {allocation['bed_no']} successfully!"
+        }
 
-        # start transaction
-        conn.start_transaction()
+    except AllocationError as e:
+        return {"status": "error", "message": str(e)}
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
-        # --- 1️⃣ Insert into allocation table ---
-        insert_alloc = """
-            INSERT INTO allocation (usn, room_no, bed_no)
-            VALUES (%s, %s, %s)
-        """
-        cursor.execute(insert_alloc, (usn, room_no, bed_no))
 
-        # --- 2️⃣ Update room table occupancy ---
-        update_room = """
-            UPDATE room
-            SET no_of_occupancy = no_of_occupancy + 1
-            WHERE room_no = %s
-        """
-        cursor.execute(update_room, (room_no,))
+class AutoAllocInput(BaseModel):
+    usn: str
 
-        # --- 3️⃣ Update student table status ---
-        update_student = """
-            UPDATE student
-            SET room_allocation_status = 'Allocated'
-            WHERE usn = %s
-        """
-        cursor.execute(update_student, (usn,))
 
-        # --- 4️⃣ Update bed table (mark as occupied) ---
-        update_bed = """
-            UPDATE bed
-            SET occupied_by = %s
-            WHERE room_no = %s AND bed_no = %s
-        """
-        cursor.execute(update_bed, (usn, room_no, bed_no))
+@app.post("/auto-allocate")
+async def auto_allocate(data: AutoAllocInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        # commit everything
-        conn.commit()
-        cursor.close()
-        conn.close()
+    try:
+        # ✅ first free bed, claimed with FOR UPDATE SKIP LOCKED inside one transaction
+        allocation = await allocate_free_bed(conn, data.usn)
+        beds_changed([allocation["room_no"]])
+        await audit.record(f"auto-allocated {allocation['usn']} to room {allocation['room_no']} bed {allocation['bed_no']}")
 
         return {
             "status": "success",
-            "message": f"Student {usn} allocated Room {room_no}, Bed {bed_no} successfully!"
+            "message": f"Auto allocated Student {allocation['usn']} → Room {allocation['room_no']}, Bed {allocation['bed_no']}",
+            "allocation": allocation,
         }
 
+    except AllocationError as e:
+        return {"status": "error", "message": str(e)}
     except Error as e:
-        if conn:
-            conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
-
-class AutoAllocInput(BaseModel):
+class DeallocInput(BaseModel):
     usn: str
 
 
-@app.post("/auto-allocate")
-def auto_allocate(data: AutoAllocInput):
+# ✅ Free a student's bed (room occupancy goes down in the same transaction)
+@app.post("/deallocate")
+async def deallocate_room(data: DeallocInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        usn = data.usn
+        released = await deallocate(conn, data.usn)
+        beds_changed([released["room_no"]], delta=-1)
+        await audit.record(f"released {released['usn']} from room {released['room_no']} bed {released['bed_no']}")
 
-        # ✅ Step 1 — find first empty bed
-        cursor.execute("SELECT room_no, bed_no FROM bed WHERE occupied_by IS NULL LIMIT 1")
-        bed = cursor.fetchone()
+        return {
+            "status": "success",
+            "message": f"Student {released['usn']} moved out of Room {released['room_no']}, Bed {released['bed_no']}",
+            "released": released,
+        }
 
-        if not bed:
-            return {"status": "error", "message": "No vacant beds available!"}
+    except AllocationError as e:
+        return {"status": "error", "message": str(e)}
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
-        room_no = bed["room_no"]
-        bed_no = bed["bed_no"]
 
-        # ✅ Step 2 — Insert allocation
-        cursor.execute(
-            "INSERT INTO allocation (usn, room_no, bed_no) VALUES (%s, %s, %s)",
-            (usn, room_no, bed_no),
-        )
+class BulkAllocInput(BaseModel):
+    policy: str = "fill_rooms"         # fill_rooms | spread | by_department | by_year
+    usns: Optional[List[str]] = None   # default (null / missing): every pending student; [] is rejected
 
-        # ✅ Step 3 — Update room occupancy
-        cursor.execute(
-            "UPDATE room SET no_of_occupancy = no_of_occupancy + 1 WHERE room_no = %s",
-            (room_no,),
-        )
 
-        # ✅ Step 4 — Update student status
-        cursor.execute(
-            "UPDATE student SET room_allocation_status = 'Allocated' WHERE usn = %s",
-            (usn,),
-        )
+# ✅ Place all pending students in one pass (one read, one transaction, batched writes)
+@app.post("/auto-allocate/bulk")
+async def auto_allocate_bulk(data: BulkAllocInput):
+    started = time.perf_counter()
 
-        # ✅ Step 5 — Update bed table (mark as occupied)
-        cursor.execute(
-            "UPDATE bed SET occupied_by = %s WHERE room_no = %s AND bed_no = %s",
-            (usn, room_no, bed_no),
-        )
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        # ✅ just commit at end (no start_transaction)
-        conn.commit()
-        cursor.close()
-        conn.close()
+    try:
+        result = await bulk_allocate(conn, data.policy, data.usns)
+        beds_changed([a["room_no"] for a in result["allocations"]])
+        for a in result["allocations"]:
+            await audit.record(f"bulk-allocated ({data.policy}) {a['usn']} to room {a['room_no']} bed {a['bed_no']}")
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
 
         return {
             "status": "success",
-            "message": f"Auto allocated Student {usn} → Room {room_no}, Bed {bed_no}",
-            "allocation": {"usn": usn, "room_no": room_no, "bed_no": bed_no},
+            "message": f"Allocated {result['placed']} students in {elapsed_ms} ms",
+            "elapsed_ms": elapsed_ms,
+            **result
         }
 
+    except AllocationError as e:
+        return {"status": "error", "message": str(e)}
     except Error as e:
-        if conn:
-            conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 @app.get("/available-rooms")
-def available_rooms():
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT
-                room_no,
-                no_of_beds,
-                no_of_occupancy,
-                (no_of_beds - no_of_occupancy) AS vacant_beds
-            FROM room
-            WHERE (no_of_beds - no_of_occupancy) > 0
-            ORDER BY room_no ASC;
-        """)
-        rooms = cursor.fetchall()
-        cursor.close()
-        conn.close()
+async def available_rooms(request: Request):
+    # cached until a room is added or a bed allocated
+    return await response_cache.serve(request, {"rooms"}, load_available_rooms)
 
-        # Add display string (ex: "3/4")
-        for r in rooms:
-            r["occupancy_status"] = f"{r['no_of_occupancy']}/{r['no_of_beds']}"
 
-        return {
-            "status": "success",
-            "count": len(rooms),
-            "available_rooms": rooms
+async def load_available_rooms():
+    # served from the occupancy index (built from the bed table) — no query per call
+    if not await occupancy.ensure_loaded():
+        return {"status": "error", "message": "Database connection failed"}
+
+    rooms = [
+        {
+            "room_no": room_no,
+            "no_of_beds": beds,
+            "no_of_occupancy": occupied,
+            "vacant_beds": beds - occupied,
+            "occupancy_status": f"{occupied}/{beds}"   # display string (ex: "3/4")
         }
+        for room_no, beds, occupied in occupancy.rooms_with_free_beds(1)
+    ]
+
+    return {
+        "status": "success",
+        "count": len(rooms),
+        "available_rooms": rooms
+    }
+
+
+# ✅ Rooms with at least `min_beds` free beds (e.g. to keep friends together), from the occupancy index
+@app.get("/rooms/free")
+async def rooms_with_free_beds(min_beds: int = Query(1, ge=1)):
+    if not await occupancy.ensure_loaded():
+        return {"status": "error", "message": "Database connection failed"}
+
+    rooms = occupancy.rooms_with_free_beds(min_beds)
+    return {
+        "status": "success",
+        "count": len(rooms),
+        "rooms": [{"room_no": room_no, "beds": beds, "free_beds": beds - occupied} for room_no, beds, occupied in rooms]
+    }
+
+
+# ✅ Compare room.no_of_occupancy with the bed table; POST /occupancy/repair also fixes the drift
+@app.get("/occupancy/check")
+async def occupancy_check():
+    return await run_occupancy_check(repair=False)
+
+
+@app.post("/occupancy/repair")
+async def occupancy_repair():
+    return await run_occupancy_check(repair=True)
+
 
+async def run_occupancy_check(repair):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        report = await check_consistency(conn, repair)
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+    if report["repaired"]:
+        # counters changed underneath the in-memory views; reload them
+        await occupancy.rebuild()
+        await dashboard.reconcile()
+        response_cache.invalidate("rooms")
+
+    return {"status": "success", "drift_count": len(report["drifted"]), **report}
+
+
+PENDING_STUDENTS_QUERY = """
+    SELECT usn, name, student_mobile, father_mobile, mother_mobile, email
+    FROM student
+    WHERE room_allocation_status = 'Pending'
+    ORDER BY usn ASC
+"""
 
 @app.get("/pending-students")
-def pending_students():
+async def pending_students():
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = await conn.cursor(dictionary=True)
 
-        cursor.execute("""
-            SELECT usn, name, student_mobile, father_mobile, mother_mobile, email
-            FROM student
-            WHERE room_allocation_status = 'Pending'
-            ORDER BY usn ASC;
-        """)
+        await cursor.execute(PENDING_STUDENTS_QUERY)
 
-        students = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        students = await cursor.fetchall()
+        await cursor.close()
 
         return {
             "status": "success",
@@ -470,54 +967,153 @@ def pending_students():
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 class StudentLogin(BaseModel):
     email: str
     password: str
 
+STUDENT_LOGIN_QUERY = "SELECT usn, name, email, password, room_allocation_status FROM student WHERE email = %s"
+
 @app.post("/student-login")
-def student_login(payload: StudentLogin):
+async def student_login(payload: StudentLogin):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT usn, name, email, password, room_allocation_status FROM student WHERE email=%s", (payload.email,))
-        student = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(STUDENT_LOGIN_QUERY, (payload.email,))
+        student = await cursor.fetchone()
+        await cursor.close()
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
-        if not student or student["password"] != payload.password:
-            return {"status": "error", "message": "Invalid email or password"}
+    if not student:
+        return {"status": "error", "message": "Invalid email or password"}
+    try:
+        ok, needs_rehash = await passwords.verify(payload.password, student["password"])
+    except PasswordBusyError as e:
+        return {"status": "error", "message": str(e)}
+    if not ok:
+        return {"status": "error", "message": "Invalid email or password"}
+    if needs_rehash:
+        await upgrade_password_hash("student", "usn", student["usn"], student["password"], payload.password)
 
-        return {
-            "status": "success",
-            "student": {
-                "usn": student["usn"],
-                "name": student["name"],
-                "email": student["email"],
-                "room_allocation_status": student["room_allocation_status"]
-            }
+    token, expires_at = issue_token(student["usn"], "student")
+
+    return {
+        "status": "success",
+        "token": token,
+        "expires_at": expires_at,
+        "student": {
+            "usn": student["usn"],
+            "name": student["name"],
+            "email": student["email"],
+            "room_allocation_status": student["room_allocation_status"]
         }
+    }
+
+# ✅ Who the bearer token belongs to — verified in memory, no DB query
+@app.get("/session")
+async def get_session(session=Depends(current_session)):
+    return {"status": "success", "session": session.as_dict()}
+
+
+# ✅ Revoke the bearer token (other workers drop it within HOSTEL_REVOCATION_REFRESH seconds)
+@app.post("/logout")
+async def logout(session=Depends(current_session)):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        await revocations.revoke(conn, session)
+        return {"status": "success", "message": "Logged out"}
     except Error as e:
+        await conn.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+# ✅ Live leave / complaint updates (Server-Sent Events) instead of polling the lists
+#    Wardens get every event, students only their own. EventSource can't send headers,
+#    so the session token may also be passed as ?token=...
+#    Events: leave.created, leave.status_changed, complaint.created, complaint.status_changed,
+#    and resync (refetch the lists once, e.g. after a long disconnect)
+@app.get("/events/stream")
+async def event_stream(request: Request, token: Optional[str] = None):
+    scheme, _, header_token = (request.headers.get("authorization") or "").partition(" ")
+    token = header_token.strip() if scheme.lower() == "bearer" else token
+    if not token:
+        return JSONResponse({"status": "error", "message": "Missing session token"}, status_code=401)
+    try:
+        session = verify_token(token)
+    except TokenError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=401)
+
+    last_event_id = request.headers.get("last-event-id")
+    return StreamingResponse(
+        events.stream(session.role, session.subject, int(last_event_id) if last_event_id and last_event_id.isdigit() else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ✅ Ranked, prefix-matching search over students, complaints and notices (FULLTEXT, migration 0005)
+#    /search?q=ravi kum&types=student,complaint&limit=20&offset=0
+@app.get("/search")
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    try:
+        kinds = parse_types(types)
+    except SearchError as e:
         return {"status": "error", "message": str(e)}
 
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        results = await search(conn, q, kinds, limit, offset)
+        return {"status": "success", "query": q, "limit": limit, "offset": offset, "results": results}
+    except SearchError as e:
+        return {"status": "error", "message": str(e)}
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+
+STUDENT_QUERY = """
+    SELECT s.usn, s.name, s.email, s.student_mobile, s.father_mobile, s.mother_mobile,
+           s.department_name, s.year, s.blood_group, s.room_allocation_status,
+           a.room_no, a.bed_no, a.start_date, a.end_date, a.fees_amount
+    FROM student s
+    LEFT JOIN allocation a ON s.usn = a.usn
+    WHERE s.usn = %s
+"""
+
 @app.get("/student/{usn}")
-def get_student(usn: str):
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT s.usn, s.name, s.email, s.student_mobile, s.father_mobile, s.mother_mobile,
-                   s.department_name, s.year, s.blood_group, s.room_allocation_status,
-                   a.room_no, a.bed_no, a.start_date, a.end_date, a.fees_amount
-            FROM student s
-            LEFT JOIN allocation a ON s.usn = a.usn
-            WHERE s.usn = %s;
-        """, (usn,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+async def get_student(usn: str):
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        cursor = await conn.cursor(dictionary=True)
+
+        await cursor.execute(STUDENT_QUERY, (usn,))
+        row = await cursor.fetchone()
+        await cursor.close()
 
         if not row:
             return {"status": "error", "message": "Student not found"}
@@ -525,6 +1121,8 @@ def get_student(usn: str):
         return {"status": "success", "student": row}
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 class ChangePassword(BaseModel):
@@ -533,95 +1131,111 @@ class ChangePassword(BaseModel):
     new_password: str
 
 @app.post("/student-change-password")
-def change_student_password(data: ChangePassword):
+async def change_student_password(data: ChangePassword):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT password FROM student WHERE email=%s", (data.email,))
-        row = cursor.fetchone()
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute("SELECT password FROM student WHERE email=%s", (data.email,))
+        row = await cursor.fetchone()
+        await cursor.close()
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
-        if not row:
-            cursor.close()
-            conn.close()
-            return {"status": "error", "message": "Student not found"}
+    if not row:
+        return {"status": "error", "message": "Student not found"}
 
-        if row["password"] != data.old_password:
-            cursor.close()
-            conn.close()
+    # verify and hash on the password pool, with no DB connection held
+    try:
+        ok, _ = await passwords.verify(data.old_password, row["password"])
+        if not ok:
             return {"status": "error", "message": "Old password incorrect"}
+        new_hash = await passwords.hash(data.new_password)
+    except PasswordBusyError as e:
+        return {"status": "error", "message": str(e)}
 
-        cursor.execute("UPDATE student SET password=%s WHERE email=%s", (data.new_password, data.email))
-        conn.commit()
-        cursor.close()
-        conn.close()
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
+    try:
+        cursor = await conn.cursor()
+        # only replaces the password that was verified: a concurrent change wins
+        await cursor.execute(
+            "UPDATE student SET password=%s WHERE email=%s AND password=%s",
+            (new_hash, data.email, row["password"]),
+        )
+        changed = cursor.rowcount
+        await conn.commit()
+        await cursor.close()
+
+        if not changed:
+            return {"status": "error", "message": "Password was changed meanwhile, try again"}
         return {"status": "success", "message": "Password updated successfully"}
     except Error as e:
-        if conn: conn.rollback()
+        await conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 @app.get("/student-room/{usn}")
-def student_room(usn: str):
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # get student's room
-        cursor.execute("SELECT room_no FROM allocation WHERE usn=%s", (usn,))
-        alloc = cursor.fetchone()
-        if not alloc:
-            cursor.close(); conn.close()
-            return {"status": "error", "message": "Student not allocated"}
+async def student_room(usn: str):
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        room_no = alloc["room_no"]
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
-        # fetch room info
-        cursor.execute("""
-            SELECT room_no, no_of_beds, no_of_tables, no_of_chairs, no_of_fans, no_of_occupancy,
-                   (no_of_beds - no_of_occupancy) AS available_beds
-            FROM room WHERE room_no=%s;
-        """, (room_no,))
-        room = cursor.fetchone()
-        cursor.close(); conn.close()
+        # student's allocation and room info in one query
+        await cursor.execute(STUDENT_ROOM_QUERY, (usn,))
+        room = await cursor.fetchone()
+        await cursor.close()
 
         if not room:
+            return {"status": "error", "message": "Student not allocated"}
+        if room["room_no"] is None:
             return {"status": "error", "message": "Room not found"}
 
+        del room["allocated_room"]
         room["capacity"] = room["no_of_beds"]
         room["occupied"] = room["no_of_occupancy"]
         room["available"] = room["available_beds"]
         return {"status": "success", "room_summary": room}
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 @app.get("/roommates/{usn}")
-def roommates(usn: str):
+async def roommates(usn: str):
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = await conn.cursor(dictionary=True)
 
-        # find room number
-        cursor.execute("SELECT room_no FROM allocation WHERE usn=%s", (usn,))
-        record = cursor.fetchone()
-        if not record:
-            cursor.close(); conn.close()
-            return {"status": "error", "message": "Student not allocated"}
+        # student's room and everyone in it, in one query
+        await cursor.execute(ROOMMATES_QUERY, (usn,))
+        rows = await cursor.fetchall()
+        await cursor.close()
 
-        room_no = record["room_no"]
+        if not rows:
+            return {"status": "error", "message": "Student not allocated"}
 
-        # fetch roommates
-        cursor.execute("""
-            SELECT s.usn, s.name, s.department_name, s.year, s.email, a.bed_no
-            FROM allocation a
-            JOIN student s ON a.usn = s.usn
-            WHERE a.room_no=%s;
-        """, (room_no,))
-        all_students = cursor.fetchall()
-        cursor.close(); conn.close()
+        room_no = rows[0]["room_no"]
 
         # remove self
-        roommates = [r for r in all_students if r["usn"] != usn]
+        roommates = [
+            {k: r[k] for k in ("usn", "name", "department_name", "year", "email", "bed_no")}
+            for r in rows if r["usn"] is not None and r["usn"] != usn
+        ]
 
         return {
             "status": "success",
@@ -631,6 +1245,8 @@ def roommates(usn: str):
         }
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 
@@ -643,10 +1259,13 @@ class LeaveRequestInput(BaseModel):
     contact: str
 
 @app.post("/apply-leave")
-def apply_leave(data: LeaveRequestInput):
+async def apply_leave(data: LeaveRequestInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        cursor = await conn.cursor()
 
         # default approval status
         approval_status = "Pending"
@@ -665,10 +1284,15 @@ def apply_leave(data: LeaveRequestInput):
             approval_status
         )
 
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await cursor.execute(query, values)
+        leave_id = cursor.lastrowid
+        await conn.commit()
+        await cursor.close()
+        dashboard.leave_applied()
+        events.publish(
+            "leave.created", leave_id=leave_id, usn=data.usn, room_no=data.room_no,
+            from_date=data.from_date, to_date=data.to_date, reason=data.reason, status=approval_status
+        )
 
         return {
             "status": "success",
@@ -676,8 +1300,10 @@ def apply_leave(data: LeaveRequestInput):
         }
 
     except Error as e:
-        if conn: conn.rollback()
+        await conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 class ComplaintInput(BaseModel):
     usn: str
@@ -686,10 +1312,13 @@ class ComplaintInput(BaseModel):
     description: str
 
 @app.post("/apply-complaint")
-def apply_complaint(data: ComplaintInput):
+async def apply_complaint(data: ComplaintInput):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        cursor = await conn.cursor()
 
         default_status = "Pending"
 
@@ -699,10 +1328,15 @@ def apply_complaint(data: ComplaintInput):
         """
         values = (data.usn, data.room_no, data.type, data.description, default_status)
 
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await cursor.execute(query, values)
+        complaint_id = cursor.lastrowid
+        await conn.commit()
+        await cursor.close()
+        dashboard.complaint_opened()
+        events.publish(
+            "complaint.created", complaint_id=complaint_id, usn=data.usn, room_no=data.room_no,
+            type=data.type, description=data.description, status=default_status
+        )
 
         return {
             "status": "success",
@@ -710,28 +1344,30 @@ def apply_complaint(data: ComplaintInput):
         }
 
     except Error as e:
-        if conn: conn.rollback()
+        await conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
+STUDENT_LEAVES_QUERY = """
+    SELECT leave_id, usn, room_no, from_date, to_date, reason, contact, warden_approval, created_at
+    FROM leave_request
+    WHERE usn = %s
+    ORDER BY leave_id DESC
+"""
+
 @app.get("/student-leaves/{usn}")
-def get_student_leaves(usn: str):
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+async def get_student_leaves(usn: str):
+    conn = await get_connection(read_only=True)
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT leave_id, usn, room_no, from_date, to_date, reason, contact, warden_approval, created_at
-            FROM leave_request
-            WHERE usn = %s
-            ORDER BY leave_id DESC
-        """
-        cursor.execute(query, (usn,))
-        leaves = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(STUDENT_LEAVES_QUERY, (usn,))
+        leaves = await cursor.fetchall()
+        await cursor.close()
 
         if not leaves:
             return {"status": "success", "message": "No leave records found", "leaves": []}
@@ -740,25 +1376,27 @@ def get_student_leaves(usn: str):
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+STUDENT_COMPLAINTS_QUERY = """
+    SELECT complaint_id, usn, room_no, type, description, status, created_at
+    FROM complaint
+    WHERE usn = %s
+    ORDER BY complaint_id DESC
+"""
 
 @app.get("/student-complaints/{usn}")
-def get_student_complaints(usn: str):
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+async def get_student_complaints(usn: str):
+    conn = await get_connection(read_only=True)
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT complaint_id, usn, room_no, type, description, status, created_at
-            FROM complaint
-            WHERE usn = %s
-            ORDER BY complaint_id DESC
-        """
-        cursor.execute(query, (usn,))
-        complaints = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(STUDENT_COMPLAINTS_QUERY, (usn,))
+        complaints = await cursor.fetchall()
+        await cursor.close()
 
         if not complaints:
             return {"status": "success", "message": "No complaints found", "complaints": []}
@@ -767,147 +1405,244 @@ def get_student_complaints(usn: str):
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+PENDING_LEAVES_QUERY = """
+    SELECT
+        l.leave_id,
+        l.usn,
+        s.name AS student_name,
+        s.department_name,
+        s.year,
+        l.room_no,
+        l.from_date,
+        l.to_date,
+        l.reason,
+        l.contact,
+        l.warden_approval,
+        l.created_at
+    FROM leave_request l
+    JOIN student s ON l.usn = s.usn
+    WHERE l.warden_approval = 'Pending'
+    ORDER BY l.created_at DESC
+"""
 
 @app.get("/leaves/pending")
-def get_pending_leaves():
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+async def get_pending_leaves():
+    conn = await get_connection(read_only=True)
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT 
-                l.leave_id,
-                l.usn,
-                s.name AS student_name,
-                s.department_name,
-                s.year,
-                l.room_no,
-                l.from_date,
-                l.to_date,
-                l.reason,
-                l.contact,
-                l.warden_approval,
-                l.created_at
-            FROM leave_request l
-            JOIN student s ON l.usn = s.usn
-            WHERE l.warden_approval = 'Pending'
-            ORDER BY l.created_at DESC
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(PENDING_LEAVES_QUERY)
+        results = await cursor.fetchall()
+        await cursor.close()
 
         return {"status": "success", "count": len(results), "pending_leaves": results}
 
     except Error as e:
         return {"status": "error", "message": str(e)}
-
+    finally:
+        await conn.close()
+
+
+UNRESOLVED_COMPLAINTS_QUERY = """
+    SELECT
+        c.complaint_id,
+        c.usn,
+        s.name AS student_name,
+        s.department_name,
+        s.year,
+        c.room_no,
+        c.type,
+        c.description,
+        c.status,
+        c.created_at
+    FROM complaint c
+    JOIN student s ON c.usn = s.usn
+    WHERE c.status != 'Resolved'
+    ORDER BY c.created_at DESC
+"""
+
+
+# ✅ Unresolved complaints (format=ndjson|csv streams them instead)
 @app.get("/complaints/unresolved")
-def get_unresolved_complaints():
+async def get_unresolved_complaints(format: Optional[str] = None):
     try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+        export_format = check_format(format) if format else None
+    except ExportFormatError as e:
+        return {"status": "error", "message": str(e)}
 
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT 
-                c.complaint_id,
-                c.usn,
-                s.name AS student_name,
-                s.department_name,
-                s.year,
-                c.room_no,
-                c.type,
-                c.description,
-                c.status,
-                c.created_at
-            FROM complaint c
-            JOIN student s ON c.usn = s.usn
-            WHERE c.status != 'Resolved'
-            ORDER BY c.created_at DESC
-        """
-        cursor.execute(query)
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+    conn = await get_connection(read_only=True)
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
+
+    if export_format:
+        return streaming_export(conn, UNRESOLVED_COMPLAINTS_QUERY, None, export_format, filename="unresolved_complaints")
+
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(UNRESOLVED_COMPLAINTS_QUERY)
+        results = await cursor.fetchall()
+        await cursor.close()
 
         return {"status": "success", "count": len(results), "unresolved_complaints": results}
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 from fastapi import Body
 
 @app.post("/leave/update-status")
-def update_leave_status(
+async def update_leave_status(
     leave_id: int = Body(..., example=3),
     new_status: str = Body(..., example="Approved")
 ):
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
-
-        # only allow valid statuses
-        if new_status not in ["Approved", "Rejected"]:
-            return {"status": "error", "message": "Invalid status — use Approved or Rejected"}
+    # only allow valid statuses
+    if new_status not in ["Approved", "Rejected"]:
+        return {"status": "error", "message": "Invalid status — use Approved or Rejected"}
 
-        cursor = conn.cursor()
-        query = "UPDATE leave_request SET warden_approval = %s WHERE leave_id = %s"
-        cursor.execute(query, (new_status, leave_id))
-        conn.commit()
-        affected = cursor.rowcount
-        cursor.close()
-        conn.close()
+    conn = await get_connection()
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        if affected == 0:
+    try:
+        cursor = await conn.cursor()
+        await conn.start_transaction()
+
+        # lock the row and read the old status so the dashboard counter moves by the right amount
+        await cursor.execute("SELECT warden_approval, usn FROM leave_request WHERE leave_id = %s FOR UPDATE", (leave_id,))
+        row = await cursor.fetchone()
+        if row is None:
+            await conn.rollback()
+            await cursor.close()
             return {"status": "error", "message": f"No leave found with ID {leave_id}"}
 
+        query = "UPDATE leave_request SET warden_approval = %s WHERE leave_id = %s"
+        await cursor.execute(query, (new_status, leave_id))
+        await conn.commit()
+        await cursor.close()
+        dashboard.leave_status_changed(row[0], new_status)
+        events.publish("leave.status_changed", leave_id=leave_id, usn=row[1], old_status=row[0], status=new_status)
+        await audit.record(f"leave {leave_id} status {row[0]} -> {new_status}")
+
         return {
             "status": "success",
             "message": f"Leave ID {leave_id} updated to {new_status}"
         }
 
     except Error as e:
+        await conn.rollback()
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 @app.post("/complaint/update-status")
-def update_complaint_status(
+async def update_complaint_status(
     complaint_id: int = Body(..., example=7),
     new_status: str = Body(..., example="In Progress")
 ):
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+    valid_status = ["Pending", "In Progress", "Resolved"]
+    if new_status not in valid_status:
+        return {"status": "error", "message": f"Invalid status — use one of {valid_status}"}
 
-        valid_status = ["Pending", "In Progress", "Resolved"]
-        if new_status not in valid_status:
-            return {"status": "error", "message": f"Invalid status — use one of {valid_status}"}
-
-        cursor = conn.cursor()
-        query = "UPDATE complaint SET status = %s WHERE complaint_id = %s"
-        cursor.execute(query, (new_status, complaint_id))
-        conn.commit()
-        affected = cursor.rowcount
-        cursor.close()
-        conn.close()
+    conn = await get_connection()
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        if affected == 0:
+    try:
+        cursor = await conn.cursor()
+        await conn.start_transaction()
+
+        await cursor.execute("SELECT status, usn FROM complaint WHERE complaint_id = %s FOR UPDATE", (complaint_id,))
+        row = await cursor.fetchone()
+        if row is None:
+            await conn.rollback()
+            await cursor.close()
             return {"status": "error", "message": f"No complaint found with ID {complaint_id}"}
 
+        query = "UPDATE complaint SET status = %s WHERE complaint_id = %s"
+        await cursor.execute(query, (new_status, complaint_id))
+        await conn.commit()
+        await cursor.close()
+        dashboard.complaint_status_changed(row[0], new_status)
+        events.publish("complaint.status_changed", complaint_id=complaint_id, usn=row[1], old_status=row[0], status=new_status)
+        await audit.record(f"complaint {complaint_id} status {row[0]} -> {new_status}")
+
         return {
             "status": "success",
             "message": f"Complaint ID {complaint_id} updated to {new_status}"
         }
 
+    except Error as e:
+        await conn.rollback()
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+
+class BulkStatusInput(BaseModel):
+    new_status: str
+    ids: Optional[List[int]] = None          # and / or filters:
+    from_date: Optional[date] = None         # leaves overlapping / complaints raised in the range
+    to_date: Optional[date] = None
+    department: Optional[str] = None
+    current_status: Optional[str] = None
+
+
+async def run_bulk_status(flow, data, session):
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        results, changes = await bulk_set_status(
+            conn, flow, data.new_status, session.subject, data.ids,
+            data.from_date, data.to_date, data.department, data.current_status
+        )
+    except WorkflowError as e:
+        return {"status": "error", "message": str(e)}
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+    # committed — same hooks as the single-ID endpoints
+    for item_id, usn, old_status in changes:
+        if flow is LEAVE_FLOW:
+            dashboard.leave_status_changed(old_status, data.new_status)
+            events.publish("leave.status_changed", leave_id=item_id, usn=usn, old_status=old_status, status=data.new_status)
+        else:
+            dashboard.complaint_status_changed(old_status, data.new_status)
+            events.publish("complaint.status_changed", complaint_id=item_id, usn=usn, old_status=old_status, status=data.new_status)
+
+    counts = {"updated": 0, "unchanged": 0, "not_found": 0}
+    for r in results:
+        counts[r["result"]] += 1
+    return {
+        "status": "success",
+        "message": f"{counts['updated']} {flow.kind}s updated to {data.new_status}",
+        **counts,
+        "results": results
+    }
+
+
+# ✅ Approve / reject many leaves in one transaction (warden token required)
+#    {"new_status": "Approved", "current_status": "Pending", "from_date": "2026-03-06", "to_date": "2026-03-08"}
+@app.post("/leaves/bulk-status")
+async def bulk_leave_status(data: BulkStatusInput, session=Depends(require_role("warden"))):
+    return await run_bulk_status(LEAVE_FLOW, data, session)
+
+
+# ✅ Move many complaints to a new status in one transaction (warden token required)
+@app.post("/complaints/bulk-status")
+async def bulk_complaint_status(data: BulkStatusInput, session=Depends(require_role("warden"))):
+    return await run_bulk_status(COMPLAINT_FLOW, data, session)
 
 
 from datetime import date
@@ -921,13 +1656,13 @@ class NoticeInput(BaseModel):
     description: str = Field(..., example="All students must vacate their rooms for cleaning on Sunday at 10 AM.")
 
 @app.post("/notice/add")
-def add_notice(notice: NoticeInput):
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+async def add_notice(notice: NoticeInput):
+    conn = await get_connection()
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor()
+    try:
+        cursor = await conn.cursor()
 
         # ✅ Use correct column: date_posted
         query = """
@@ -936,10 +1671,10 @@ def add_notice(notice: NoticeInput):
         """
         values = (notice.title, notice.description, date.today())
 
-        cursor.execute(query, values)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await cursor.execute(query, values)
+        await conn.commit()
+        await cursor.close()
+        response_cache.invalidate("notices")
 
         return {
             "status": "success",
@@ -953,27 +1688,36 @@ def add_notice(notice: NoticeInput):
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 @app.get("/notice/all")
-def get_all_notices():
-    try:
-        conn = get_connection()
-        if not conn:
-            return {"status": "error", "message": "Database connection failed"}
+async def get_all_notices(request: Request):
+    # cached until the next /notice/add
+    return await response_cache.serve(request, {"notices"}, load_notices)
+
+
+NOTICES_QUERY = """
+    SELECT notice_id, title, description, date_posted
+    FROM notice
+    ORDER BY date_posted DESC, notice_id DESC
+"""
+
+async def load_notices():
+    # a miss reloads from a replica; /notice/add commits without a session, so reads right
+    # after it go to the primary anyway (see replicas.py)
+    conn = await get_connection(read_only=True)
+    if not conn:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor = conn.cursor(dictionary=True)
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
         # ✅ Use correct column name
-        query = """
-            SELECT notice_id, title, description, date_posted
-            FROM notice
-            ORDER BY date_posted DESC, notice_id DESC
-        """
-        cursor.execute(query)
-        notices = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        await cursor.execute(NOTICES_QUERY)
+        notices = await cursor.fetchall()
+        await cursor.close()
 
         if not notices:
             return {"status": "success", "message": "No notices found", "notices": []}
@@ -986,26 +1730,30 @@ def get_all_notices():
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
 @app.post("/fees/update-common-fee")
-def update_common_fee(data: dict):
+async def update_common_fee(data: dict):
     total_fee = data.get("total_fee")
 
     if total_fee is None:
         return {"status": "error", "message": "total_fee is required"}
 
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        cursor = await conn.cursor()
 
         # update all student fees at once
         query = "UPDATE fees SET total_fee = %s"
-        cursor.execute(query, (total_fee,))
-        conn.commit()
-
-        cursor.close()
-        conn.close()
+        await cursor.execute(query, (total_fee,))
+        await conn.commit()
+        await cursor.close()
+        await audit.record(f"set total_fee to {total_fee} for all students")
 
         return {
             "status": "success",
@@ -1014,24 +1762,28 @@ def update_common_fee(data: dict):
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 @app.post("/fees/update-due-date")
-def update_due_date(data: dict):
+async def update_due_date(data: dict):
     due_date = data.get("due_date")
 
     if not due_date:
         return {"status": "error", "message": "due_date is required in format YYYY-MM-DD"}
 
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
+        cursor = await conn.cursor()
 
         query = "UPDATE fees SET due_date = %s"
-        cursor.execute(query, (due_date,))
-        conn.commit()
-
-        cursor.close()
-        conn.close()
+        await cursor.execute(query, (due_date,))
+        await conn.commit()
+        await cursor.close()
+        await audit.record(f"set fee due_date to {due_date} for all students")
 
         return {
             "status": "success",
@@ -1040,72 +1792,182 @@ def update_due_date(data: dict):
 
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
 
 
+# ✅ One payment: ledger row + atomic paid/status update in one transaction.
+#    Optional idempotency_key makes retries safe (a repeated key is not applied twice).
 @app.post("/fees/update-payment")
-def update_payment(data: dict):
+async def update_payment(data: dict):
     usn = data.get("usn")
     payment_amount = data.get("payment_amount")
+    idempotency_key = data.get("idempotency_key")
 
     if not usn or payment_amount is None:
         return {"status": "error", "message": "usn and payment_amount are required"}
 
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Fetch current payment details
-        cursor.execute("SELECT total_fee, paid FROM fees WHERE usn = %s", (usn,))
-        record = cursor.fetchone()
-
-        if not record:
-            return {"status": "error", "message": f"No fee record found for USN {usn}"}
+        amount = Decimal(str(payment_amount))
+    except InvalidOperation:
+        return {"status": "error", "message": "payment_amount must be a number"}
+    if amount <= 0:
+        return {"status": "error", "message": "payment_amount must be greater than 0"}
 
-        total_fee = record["total_fee"]
-        paid = record["paid"]
-
-        new_paid = paid + payment_amount
-
-        # Determine status
-        if new_paid >= total_fee:
-            status = "Paid"
-            new_paid = total_fee
-        elif new_paid > 0:
-            status = "Partially Paid"
-        else:
-            status = "Pending"
-
-        # Update table
-        query = """
-            UPDATE fees
-            SET paid = %s, status = %s
-            WHERE usn = %s
-        """
-        cursor.execute(query, (new_paid, status, usn))
-        conn.commit()
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor.close()
-        conn.close()
+    try:
+        applied, fee = await record_payment(conn, usn, amount, idempotency_key, data.get("reference"))
+        if applied:
+            await audit.record(f"fee payment {amount} for {usn}, paid now {fee['paid']} ({fee['status']})")
 
         return {
             "status": "success",
-            "message": f"Payment updated for {usn}",
+            "message": f"Payment updated for {usn}" if applied else f"Payment {idempotency_key} was already applied for {usn}",
+            "applied": applied,
             "updated": {
-                "paid": new_paid,
-                "status": status
+                "paid": fee["paid"],
+                "status": fee["status"]
             }
         }
 
+    except PaymentError as e:
+        return {"status": "error", "message": str(e)}
     except Error as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
+
+class PaymentRow(BaseModel):
+    usn: str
+    amount: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2)
+    idempotency_key: str = Field(..., min_length=1, max_length=100)
+    reference: Optional[str] = Field(None, max_length=100)
+    paid_on: Optional[date] = None
+
+
+def payment_row(row):
+    """CSV/XLSX row -> PaymentRow fields (blank cells dropped; payment_amount / reference accepted as fallbacks)."""
+    row = {k: v for k, v in row.items() if v not in ("", None)}
+    if "amount" not in row and "payment_amount" in row:
+        row["amount"] = row["payment_amount"]
+    if "idempotency_key" not in row and "reference" in row:
+        row["idempotency_key"] = row["reference"]
+    return row
+
+
+# ✅ Bulk payments (bank statement) from a CSV / XLSX upload
+#    columns: usn, amount, idempotency_key (or reference), [reference], [paid_on]
+#    curl -X POST --data-binary @statement.csv -H "Content-Type: text/csv" http://127.0.0.1:8000/fees/payments/bulk
+#    Applied in transactions of PAYMENT_BATCH_ROWS rows; re-uploading the same file applies nothing twice.
+@app.post("/fees/payments/bulk")
+async def bulk_payments(request: Request, format: Optional[str] = None):
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except ImportFormatError as e:
+        return {"status": "error", "message": str(e)}
+
+    conn = await get_connection()
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    started = time.perf_counter()
+    rows = applied = duplicates = 0
+    total_amount = Decimal("0")
+    errors = []
+
+    try:
+        async for chunk in iter_row_chunks(request.stream(), fmt, PAYMENT_BATCH_ROWS):
+            rows += len(chunk)
+
+            # ---- 1️⃣ validate ----
+            payments = []
+            for row_no, row in chunk:
+                try:
+                    payment = PaymentRow(**payment_row(row))
+                except ValidationError as e:
+                    errors.append({"row": row_no, "usn": row.get("usn"), "errors": validation_messages(e)})
+                    continue
+                payments.append({"row": row_no, **dict(payment)})
+
+            # ---- 2️⃣ ledger + fees in one transaction per chunk ----
+            try:
+                result = await record_payments(conn, payments, source="bulk")
+            except Error as e:
+                for p in payments:
+                    errors.append({"row": p["row"], "usn": p["usn"], "errors": [f"Chunk rolled back: {e}"]})
+                continue
+
+            applied += len(result["applied"])
+            duplicates += len(result["duplicates"])
+            total_amount += sum(p["amount"] for p in result["applied"])
+            for p in result["unknown"]:
+                errors.append({"row": p["row"], "usn": p["usn"], "errors": [f"No fee record found for USN {p['usn']}"]})
+
+    except ImportFormatError as e:
+        return {"status": "error", "message": str(e)}
+    except Error as e:
+        return {"status": "error", "message": str(e), "applied": applied, "errors": errors}
+    finally:
+        await conn.close()
+
+    await audit.record(f"bulk fee payments: {applied} applied ({total_amount}), {duplicates} duplicates, {len(errors)} rejected")
+
+    elapsed = time.perf_counter() - started
+    return {
+        "status": "success",
+        "message": f"Applied {applied} payments, {duplicates} already applied, {len(errors)} rows rejected",
+        "rows": rows,
+        "applied": applied,
+        "duplicates": duplicates,
+        "failed": len(errors),
+        "total_amount": total_amount,
+        "elapsed_ms": round(elapsed * 1000, 2),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed else None,
+        "errors": errors
+    }
+
+
+STUDENT_PAYMENTS_QUERY = """
+    SELECT payment_id, amount, idempotency_key, reference, paid_on, source, created_at
+    FROM fee_payment
+    WHERE usn = %s
+    ORDER BY payment_id DESC
+"""
+
+# ✅ Payment ledger of one student (newest first)
+@app.get("/fees/payments/{usn}")
+async def get_payments(usn: str):
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(STUDENT_PAYMENTS_QUERY, (usn,))
+        payments = await cursor.fetchall()
+        await cursor.close()
+
+        return {"status": "success", "usn": usn, "count": len(payments), "payments": payments}
+    except Error as e:
+        return {"status": "error", "message": str(e)}
+    finally:
+        await conn.close()
+
 
 @app.get("/fees/summary")
-def get_fee_summary():
+async def get_fee_summary():
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = await conn.cursor(dictionary=True)
 
-        cursor.execute("""
+        await cursor.execute("""
             SELECT COUNT(*) AS total_students,
                    SUM(total_fee) AS total_fee_to_collect,
                    SUM(paid) AS total_collected,
@@ -1114,10 +1976,8 @@ def get_fee_summary():
                    SUM(CASE WHEN status != 'Paid' THEN 1 ELSE 0 END) AS students_unpaid
             FROM fees
         """)
-        result = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+        result = await cursor.fetchone()
+        await cursor.close()
 
         return {
             "status": "success",
@@ -1133,37 +1993,41 @@ def get_fee_summary():
 
     except Error as e:
         return {"status": "error", "message": str(e)}
-
+    finally:
+        await conn.close()
+
+
+STUDENT_FEE_QUERY = """
+    SELECT
+        f.usn,
+        COALESCE(s.name, f.name) AS name,
+        f.total_fee,
+        f.paid,
+        f.pending,
+        f.status,
+        f.due_date
+    FROM fees f
+    LEFT JOIN student s ON f.usn = s.usn
+    WHERE f.usn = %s
+"""
 
 @app.post("/fees/student")
-def get_student_fee(data: dict):
+async def get_student_fee(data: dict):
     usn = data.get("usn")
     if not usn:
         return {"status": "error", "message": "USN is required"}
 
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = await conn.cursor(dictionary=True)
 
         # safer LEFT JOIN (to avoid missing record issues)
-        query = """
-            SELECT 
-                f.usn,
-                COALESCE(s.name, f.name) AS name,
-                f.total_fee,
-                f.paid,
-                f.pending,
-                f.status,
-                f.due_date
-            FROM fees f
-            LEFT JOIN student s ON f.usn = s.usn
-            WHERE f.usn = %s
-        """
-        cursor.execute(query, (usn,))
-        record = cursor.fetchone()
-
-        cursor.close()
-        conn.close()
+        await cursor.execute(STUDENT_FEE_QUERY, (usn,))
+        record = await cursor.fetchone()
+        await cursor.close()
 
         if not record:
             return {
@@ -1187,53 +2051,73 @@ def get_student_fee(data: dict):
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
+
+
+# join fees and student for complete info
+ALL_FEES_QUERY = """
+    SELECT
+        f.usn,
+        COALESCE(s.name, f.name) AS name,
+        s.department_name,
+        s.year,
+        f.total_fee,
+        f.paid,
+        f.pending,
+        f.status,
+        f.due_date
+    FROM fees f
+    LEFT JOIN student s ON f.usn = s.usn
+    ORDER BY s.year, s.department_name, f.usn
+"""
+
+
+# format data for cleaner frontend
+# keys of fee_record(), in order (CSV header of /fees/all?format=csv)
+FEE_RECORD_FIELDS = ["usn", "name", "department", "year", "total_fee", "paid", "pending", "status", "due_date"]
+
+
+def fee_record(row):
+    return {
+        "usn": row["usn"],
+        "name": row["name"],
+        "department": row["department_name"],
+        "year": row["year"],
+        "total_fee": float(row["total_fee"] or 0),
+        "paid": float(row["paid"] or 0),
+        "pending": float(row["pending"] or 0),
+        "status": row["status"],
+        "due_date": str(row["due_date"]) if row["due_date"] else None
+    }
 
+
+# ✅ All fee records (format=ndjson|csv streams them instead)
 @app.get("/fees/all")
-def get_all_fees():
+async def get_all_fees(format: Optional[str] = None):
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        export_format = check_format(format) if format else None
+    except ExportFormatError as e:
+        return {"status": "error", "message": str(e)}
 
-        # join fees and student for complete info
-        query = """
-            SELECT 
-                f.usn,
-                COALESCE(s.name, f.name) AS name,
-                s.department_name,
-                s.year,
-                f.total_fee,
-                f.paid,
-                f.pending,
-                f.status,
-                f.due_date
-            FROM fees f
-            LEFT JOIN student s ON f.usn = s.usn
-            ORDER BY s.year, s.department_name, f.usn;
-        """
-        cursor.execute(query)
-        records = cursor.fetchall()
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    if export_format:
+        return streaming_export(conn, ALL_FEES_QUERY, None, export_format, transform=fee_record, filename="fees",
+                                columns=FEE_RECORD_FIELDS)
 
-        cursor.close()
-        conn.close()
+    try:
+        cursor = await conn.cursor(dictionary=True)
+        await cursor.execute(ALL_FEES_QUERY)
+        records = await cursor.fetchall()
+        await cursor.close()
 
         if not records:
             return {"status": "error", "message": "No fee records found"}
 
-        # format data for cleaner frontend
-        data = [
-            {
-                "usn": row["usn"],
-                "name": row["name"],
-                "department": row["department_name"],
-                "year": row["year"],
-                "total_fee": float(row["total_fee"] or 0),
-                "paid": float(row["paid"] or 0),
-                "pending": float(row["pending"] or 0),
-                "status": row["status"],
-                "due_date": str(row["due_date"]) if row["due_date"] else None
-            }
-            for row in records
-        ]
+        data = [fee_record(row) for row in records]
 
         return {
             "status": "success",
@@ -1243,75 +2127,49 @@ def get_all_fees():
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
 
+# ✅ Served from the in-memory counters in dashboard_stats (kept up to date by the write endpoints)
 @app.get("/dashboard/summary")
-def dashboard_summary():
+async def dashboard_summary():
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # total students
-        cursor.execute("SELECT COUNT(*) AS total_students FROM student;")
-        total_students = cursor.fetchone()["total_students"]
-
-        # occupied rooms
-        cursor.execute("SELECT COUNT(*) AS occupied_rooms FROM room WHERE no_of_occupancy > 0;")
-        occupied_rooms = cursor.fetchone()["occupied_rooms"]
-
-        # vacant rooms
-        cursor.execute("SELECT COUNT(*) AS vacant_rooms FROM room WHERE no_of_occupancy < no_of_beds;")
-        vacant_rooms = cursor.fetchone()["vacant_rooms"]
-
-        # pending complaints (fixed table name)
-        cursor.execute("SELECT COUNT(*) AS pending_complaints FROM complaint WHERE status != 'Resolved';")
-        pending_complaints = cursor.fetchone()["pending_complaints"]
+        summary = await dashboard.summary()
+    except Error as e:
+        return {"status": "error", "message": str(e).strip()}
 
-        # pending leaves
-        cursor.execute("SELECT COUNT(*) AS pending_leaves FROM leave_request WHERE warden_approval IN ('No', 'Pending');")
-        pending_leaves = cursor.fetchone()["pending_leaves"]
+    if summary is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        cursor.close()
-        conn.close()
+    return {"status": "success", "dashboard_summary": summary}
 
-        return {
-            "status": "success",
-            "dashboard_summary": {
-                "total_students": total_students,
-                "occupied_rooms": occupied_rooms,
-                "vacant_rooms": vacant_rooms,
-                "pending_complaints": pending_complaints,
-                "pending_leaves": pending_leaves
-            }
-        }
-
-    except Error as e:
-        return {"status": "error", "message": str(e).strip()}
 
+RECENT_COMPLAINTS_QUERY = """
+    SELECT
+        c.usn,
+        s.name,
+        c.room_no,
+        c.type,
+        c.description,
+        c.status
+    FROM complaint c
+    LEFT JOIN student s ON c.usn = s.usn
+    ORDER BY c.complaint_id DESC
+    LIMIT 4
+"""
 
 @app.get("/dashboard/recent-complaints")
-def recent_complaints():
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+async def recent_complaints():
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        query = """
-            SELECT 
-                c.usn,
-                s.name,
-                c.room_no,
-                c.type,
-                c.description,
-                c.status
-            FROM complaint c
-            LEFT JOIN student s ON c.usn = s.usn
-            ORDER BY c.complaint_id DESC
-            LIMIT 4;
-        """
-        cursor.execute(query)
-        complaints = cursor.fetchall()
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
-        cursor.close()
-        conn.close()
+        await cursor.execute(RECENT_COMPLAINTS_QUERY)
+        complaints = await cursor.fetchall()
+        await cursor.close()
 
         return {
             "status": "success",
@@ -1320,32 +2178,36 @@ def recent_complaints():
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
+
+RECENT_LEAVES_QUERY = """
+    SELECT
+        l.usn,
+        s.name,
+        l.room_no,
+        l.from_date,
+        l.to_date,
+        l.reason,
+        l.warden_approval
+    FROM leave_request l
+    LEFT JOIN student s ON l.usn = s.usn
+    ORDER BY l.leave_id DESC
+    LIMIT 4
+"""
 
 @app.get("/dashboard/recent-leaves")
-def recent_leaves():
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+async def recent_leaves():
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        query = """
-            SELECT 
-                l.usn,
-                s.name,
-                l.room_no,
-                l.from_date,
-                l.to_date,
-                l.reason,
-                l.warden_approval
-            FROM leave_request l
-            LEFT JOIN student s ON l.usn = s.usn
-            ORDER BY l.leave_id DESC
-            LIMIT 4;
-        """
-        cursor.execute(query)
-        leaves = cursor.fetchall()
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
-        cursor.close()
-        conn.close()
+        await cursor.execute(RECENT_LEAVES_QUERY)
+        leaves = await cursor.fetchall()
+        await cursor.close()
 
         return {
             "status": "success",
@@ -1354,27 +2216,31 @@ def recent_leaves():
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
+
+ACTIVE_COMPLAINTS_QUERY = """
+    SELECT COUNT(*) AS active_complaints
+    FROM complaint
+    WHERE usn = %s AND status != 'Resolved'
+"""
 
 @app.post("/complaint/active-count")
-def get_active_complaint_count(data: dict):
+async def get_active_complaint_count(data: dict):
     usn = data.get("usn")
     if not usn:
         return {"status": "error", "message": "USN is required"}
 
-    try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
-        query = """
-            SELECT COUNT(*) AS active_complaints
-            FROM complaint
-            WHERE usn = %s AND status != 'Resolved';
-        """
-        cursor.execute(query, (usn,))
-        result = cursor.fetchone()
+    try:
+        cursor = await conn.cursor(dictionary=True)
 
-        cursor.close()
-        conn.close()
+        await cursor.execute(ACTIVE_COMPLAINTS_QUERY, (usn,))
+        result = await cursor.fetchone()
+        await cursor.close()
 
         active_count = result["active_complaints"] or 0
 
@@ -1386,115 +2252,112 @@ def get_active_complaint_count(data: dict):
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
 
 
 @app.post("/room/details")
-def get_room_details(data: dict):
+async def get_room_details(data: dict):
     room_no = data.get("room_no")
-    if not room_no:
+    if room_no is None or room_no == "":
         return {"status": "error", "message": "room_no is required"}
+    try:
+        room_no = room_number(room_no)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
 
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # 1️⃣ Fetch room details
-        cursor.execute("""
-            SELECT 
-                room_no,
-                no_of_beds,
-                no_of_tables,
-                no_of_chairs,
-                no_of_fans,
-                no_of_occupancy,
-                (no_of_beds - no_of_occupancy) AS vacant_beds
-            FROM room
-            WHERE room_no = %s
-        """, (room_no,))
-        room = cursor.fetchone()
+        # room, members and free beds in one round trip
+        details = await fetch_room_details(conn, [room_no])
 
-        if not room:
-            cursor.close()
-            conn.close()
+        if room_no not in details:
             return {"status": "error", "message": f"No room found with room_no {room_no}"}
 
-        # 2️⃣ Fetch students allocated in that room
-        cursor.execute("""
-            SELECT 
-                s.usn,
-                s.name,
-                s.department_name,
-                s.year,
-                a.bed_no,
-                a.start_date,
-                a.end_date
-            FROM allocation a
-            JOIN student s ON a.usn = s.usn
-            WHERE a.room_no = %s
-        """, (room_no,))
-        members = cursor.fetchall()
-
-        # 3️⃣ Fetch available beds in that room
-        cursor.execute("""
-            SELECT bed_no 
-            FROM bed 
-            WHERE room_no = %s AND occupied_by IS NULL
-        """, (room_no,))
-        available_beds = [row["bed_no"] for row in cursor.fetchall()]
-
-        cursor.close()
-        conn.close()
+        return {
+            "status": "success",
+            "room_details": details[room_no]
+        }
+
+    except Error as e:
+        return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
+
+
+class RoomDetailsBatchInput(BaseModel):
+    room_nos: List[str]
+
+
+# ✅ Details for many rooms at once (floor-plan view) — still a single query
+@app.post("/rooms/details")
+async def get_rooms_details(data: RoomDetailsBatchInput):
+    if not data.room_nos:
+        return {"status": "error", "message": "room_nos is required"}
+    if len(data.room_nos) > ROOM_DETAILS_MAX:
+        return {"status": "error", "message": f"At most {ROOM_DETAILS_MAX} rooms per request"}
+    try:
+        requested = list(dict.fromkeys(room_number(r) for r in data.room_nos))
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
+    try:
+        details = await fetch_room_details(conn, requested)
 
         return {
             "status": "success",
-            "room_details": {
-                "room_no": room["room_no"],
-                "total_beds": room["no_of_beds"],
-                "tables": room["no_of_tables"],
-                "chairs": room["no_of_chairs"],
-                "fans": room["no_of_fans"],
-                "occupied_beds": room["no_of_occupancy"],
-                "vacant_beds": room["vacant_beds"],
-                "available_bed_numbers": available_beds,
-                "members": members
-            }
+            "count": len(details),
+            "rooms": [details[r] for r in requested if r in details],
+            "not_found": [r for r in requested if r not in details]
         }
 
     except Error as e:
         return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
+
+STUDENT_RECENT_LEAVES_QUERY = """
+    SELECT
+        leave_id,
+        usn,
+        room_no,
+        from_date,
+        to_date,
+        reason,
+        contact,
+        warden_approval,
+        created_at
+    FROM leave_request
+    WHERE usn = %s
+    ORDER BY created_at DESC
+    LIMIT 5
+"""
 
 @app.post("/student/recent-leaves")
-def get_recent_leaves(data: dict):
+async def get_recent_leaves(data: dict):
     usn = data.get("usn")
     if not usn:
         return {"status": "error", "message": "USN is required"}
 
+    conn = await get_connection(read_only=True)
+    if conn is None:
+        return {"status": "error", "message": "Database connection failed"}
+
     try:
-        conn = get_connection()
-        cursor = conn.cursor(dictionary=True)
+        cursor = await conn.cursor(dictionary=True)
 
         # Fetch latest leave requests for the student
-        cursor.execute("""
-            SELECT 
-                leave_id,
-                usn,
-                room_no,
-                from_date,
-                to_date,
-                reason,
-                contact,
-                warden_approval,
-                created_at
-            FROM leave_request
-            WHERE usn = %s
-            ORDER BY created_at DESC
-            LIMIT 5
-        """, (usn,))
-
-        leaves = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
+        await cursor.execute(STUDENT_RECENT_LEAVES_QUERY, (usn,))
+
+        leaves = await cursor.fetchall()
+        await cursor.close()
 
         if not leaves:
             return {
@@ -1510,4 +2373,6 @@ def get_recent_leaves(data: dict):
         }
 
     except Error as e:
-        return {"status": "error", "message": str(e).strip()}
\ No newline at end of file
+        return {"status": "error", "message": str(e).strip()}
+    finally:
+        await conn.close()
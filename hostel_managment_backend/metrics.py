@@ -0,0 +1,198 @@
+import logging
+import os
+from contextvars import ContextVar
+
+from fastapi.responses import PlainTextResponse
+
+log = logging.getLogger(__name__)
+
+
+# requests slower than this (ms) log a trace of their SQL statements; 0 = off
+SLOW_REQUEST_MS = float(os.environ.get("HOSTEL_SLOW_REQUEST_MS", "0"))
+# statements kept per request for the slow trace
+TRACE_STATEMENTS = 50
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# DB work done outside a request (background reconcile, startup...) is counted under this route
+BACKGROUND_ROUTE = "(background)"
+
+
+class RequestMetrics:
+    """What one request spent on the database. Filled in by async_database as it runs."""
+
+    __slots__ = ("statements", "db_time", "acquire_time", "rows", "trace")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.acquire_time = 0.0
+        self.rows = 0
+        self.trace = []
+
+
+_current = ContextVar("hostel_request_metrics", default=None)
+
+
+class _RouteStats:
+    __slots__ = ("requests", "statuses", "buckets", "latency_sum", "statements", "db_time", "acquire_time", "rows")
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses = {}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.statements = 0
+        self.db_time = 0.0
+        self.acquire_time = 0.0
+        self.rows = 0
+
+    def add_db(self, m):
+        self.statements += m.statements
+        self.db_time += m.db_time
+        self.acquire_time += m.acquire_time
+        self.rows += m.rows
+
+
+# (method, route template) -> _RouteStats
+_routes = {}
+
+
+def _stats_for(method, route):
+    stats = _routes.get((method, route))
+    if stats is None:
+        stats = _routes[(method, route)] = _RouteStats()
+    return stats
+
+
+# ---- hooks called by async_database ----
+
+def record_acquire(seconds):
+    m = _current.get()
+    if m is not None:
+        m.acquire_time += seconds
+    else:
+        _stats_for("", BACKGROUND_ROUTE).acquire_time += seconds
+
+
+def record_statement(query, seconds):
+    m = _current.get()
+    if m is None:
+        stats = _stats_for("", BACKGROUND_ROUTE)
+        stats.statements += 1
+        stats.db_time += seconds
+        return
+    m.statements += 1
+    m.db_time += seconds
+    if SLOW_REQUEST_MS and len(m.trace) < TRACE_STATEMENTS:
+        m.trace.append((" ".join(query.split())[:200], seconds))
+
+
+def record_statement_time(seconds):
+    """DB time that isn't a new statement (fetches on an unbuffered cursor)."""
+    m = _current.get()
+    if m is not None:
+        m.db_time += seconds
+    else:
+        _stats_for("", BACKGROUND_ROUTE).db_time += seconds
+
+
+def record_rows(count):
+    m = _current.get()
+    if m is not None:
+        m.rows += count
+    else:
+        _stats_for("", BACKGROUND_ROUTE).rows += count
+
+
+# ---- per request (driven by request_context.RequestContextMiddleware) ----
+
+def begin_request():
+    """Start counting a request's DB work; returns its RequestMetrics and the context token."""
+    m = RequestMetrics()
+    return m, _current.set(m)
+
+
+def finish_request(method, route, status, elapsed, m):
+    """Book one finished request (its last body byte sent) under method / route."""
+    stats = _stats_for(method, route)
+    stats.requests += 1
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+    stats.latency_sum += elapsed
+    for i, bound in enumerate(LATENCY_BUCKETS):
+        if elapsed <= bound:
+            stats.buckets[i] += 1
+            break
+    stats.add_db(m)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        _log_slow_trace(method, route, status, elapsed, m)
+
+
+def _log_slow_trace(method, route, status, elapsed, m):
+    other = max(elapsed - m.db_time - m.acquire_time, 0.0)
+    log.warning("Slow request %s %s", method, route, extra={
+        "status": status,
+        "total_ms": round(elapsed * 1000, 1),
+        "acquire_ms": round(m.acquire_time * 1000, 1),
+        "db_ms": round(m.db_time * 1000, 1),
+        "app_ms": round(other * 1000, 1),
+        "statements": m.statements,
+        "rows": m.rows,
+        "trace": [f"{seconds * 1000:.2f} ms  {query}" for query, seconds in m.trace],
+    })
+
+
+# ---- Prometheus text exposition ----
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def render():
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+
+    routes = sorted(_routes.items())
+    metric("hostel_http_requests_total", "counter", "Requests by route and status.", [
+        f"hostel_http_requests_total{{{_labels(method=method, route=route, status=status)}}} {n}"
+        for (method, route), s in routes if method for status, n in sorted(s.statuses.items())
+    ])
+
+    histogram = []
+    for (method, route), s in routes:
+        if not method:
+            continue
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, s.buckets):
+            cumulative += n
+            histogram.append(f"hostel_http_request_duration_seconds_bucket{{{_labels(method=method, route=route, le=bound)}}} {cumulative}")
+        histogram.append(f"hostel_http_request_duration_seconds_bucket{{{_labels(method=method, route=route, le='+Inf')}}} {s.requests}")
+        histogram.append(f"hostel_http_request_duration_seconds_sum{{{_labels(method=method, route=route)}}} {s.latency_sum:.6f}")
+        histogram.append(f"hostel_http_request_duration_seconds_count{{{_labels(method=method, route=route)}}} {s.requests}")
+    metric("hostel_http_request_duration_seconds", "histogram", "Request latency.", histogram)
+
+    for name, attr, help_text, fmt in (
+        ("hostel_db_statements_total", "statements", "SQL statements executed.", "{}"),
+        ("hostel_db_query_seconds_total", "db_time", "Time spent executing and fetching SQL.", "{:.6f}"),
+        ("hostel_db_acquire_seconds_total", "acquire_time", "Time spent waiting for a pooled connection.", "{:.6f}"),
+        ("hostel_db_rows_total", "rows", "Rows fetched from MySQL.", "{}"),
+    ):
+        metric(name, "counter", help_text, [
+            f"{name}{{{_labels(method=method, route=route)}}} {fmt.format(getattr(s, attr))}"
+            for (method, route), s in routes
+        ])
+
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
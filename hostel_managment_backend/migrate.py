@@ -0,0 +1,202 @@
+"""
+Versioned schema migrations.
+
+Each file in migrations/ is named NNNN_description.sql and has two sections:
+
+    -- upgrade
+    CREATE INDEX ...;
+    -- downgrade
+    DROP INDEX ...;
+
+Applied versions are recorded in the schema_migrations table.
+
+    python migrate.py status
+    python migrate.py upgrade [version]      # default: latest
+    python migrate.py downgrade <version>    # revert everything above <version> (0 = all)
+"""
+import hashlib
+import os
+import re
+import sys
+
+from database import get_connection
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+STATE_TABLE = "schema_migrations"
+
+_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+class MigrationError(Exception):
+    """A migration file is malformed or one of its statements failed."""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        self.checksum = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        self.upgrade_statements, self.downgrade_statements = _parse(text, path)
+
+    def __repr__(self):
+        return f"<Migration {self.version:04d} {self.name}>"
+
+
+def _parse(text, path):
+    sections = {"upgrade": [], "downgrade": []}
+    current = None
+    statement = []
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        marker = stripped.lower()
+        if marker in ("-- upgrade", "-- downgrade"):
+            if statement:
+                raise MigrationError(f"{path}: statement without ';' before '{stripped}'")
+            current = sections[marker[3:]]
+            continue
+        if not stripped or stripped.startswith("--"):
+            continue
+        if current is None:
+            raise MigrationError(f"{path}: SQL before the '-- upgrade' marker")
+        statement.append(line)
+        if stripped.endswith(";"):
+            current.append("\n".join(statement).strip().rstrip(";"))
+            statement = []
+
+    if statement:
+        raise MigrationError(f"{path}: last statement is missing its ';'")
+    if not sections["upgrade"]:
+        raise MigrationError(f"{path}: empty upgrade section")
+    return sections["upgrade"], sections["downgrade"]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILE_PATTERN.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version:04d}: {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def _ensure_state_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(40) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    _ensure_state_table(cursor)
+    cursor.execute(f"SELECT version, checksum FROM {STATE_TABLE} ORDER BY version")
+    return dict(cursor.fetchall())
+
+
+def _run(cursor, migration, statements, direction):
+    # MySQL commits DDL implicitly, so a failure part way leaves the earlier statements applied
+    for number, statement in enumerate(statements, start=1):
+        try:
+            cursor.execute(statement)
+        except Exception as e:
+            raise MigrationError(
+                f"{migration!r} {direction} failed at statement {number}/{len(statements)}: {e}\n"
+                f"   {statement}\n"
+                f"   Statements before it were applied; fix the schema by hand, then re-run."
+            ) from e
+
+
+def upgrade(conn, target=None):
+    """Apply pending migrations up to `target` (default: latest). Returns the applied migrations."""
+    cursor = conn.cursor()
+    applied = applied_versions(cursor)
+    done = []
+    for migration in load_migrations():
+        if target is not None and migration.version > target:
+            break
+        if migration.version in applied:
+            continue
+        print(f"   ⬆️  {migration.version:04d} {migration.name}")
+        _run(cursor, migration, migration.upgrade_statements, "upgrade")
+        cursor.execute(
+            f"INSERT INTO {STATE_TABLE} (version, name, checksum) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, migration.checksum),
+        )
+        done.append(migration)
+    cursor.close()
+    return done
+
+
+def downgrade(conn, target):
+    """Revert applied migrations newer than `target`, newest first. Returns the reverted migrations."""
+    cursor = conn.cursor()
+    applied = applied_versions(cursor)
+    by_version = {m.version: m for m in load_migrations()}
+    done = []
+    for version in sorted(applied, reverse=True):
+        if version <= target:
+            break
+        migration = by_version.get(version)
+        if migration is None:
+            raise MigrationError(f"Version {version:04d} is applied but its file is missing from {MIGRATIONS_DIR}")
+        print(f"   ⬇️  {migration.version:04d} {migration.name}")
+        _run(cursor, migration, migration.downgrade_statements, "downgrade")
+        cursor.execute(f"DELETE FROM {STATE_TABLE} WHERE version = %s", (version,))
+        done.append(migration)
+    cursor.close()
+    return done
+
+
+def status(conn):
+    """[(migration, applied, checksum_changed)] for every migration file."""
+    cursor = conn.cursor()
+    applied = applied_versions(cursor)
+    cursor.close()
+    return [
+        (m, m.version in applied, m.version in applied and applied[m.version] != m.checksum)
+        for m in load_migrations()
+    ]
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    argument = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    if command not in ("status", "upgrade", "downgrade") or (command == "downgrade" and argument is None):
+        print(__doc__)
+        sys.exit(2)
+
+    conn = get_connection()
+    if conn is None:
+        print("❌ Could not connect to MySQL")
+        sys.exit(1)
+
+    try:
+        if command == "upgrade":
+            done = upgrade(conn, argument)
+            print(f"✅ Applied {len(done)} migration(s)")
+        elif command == "downgrade":
+            done = downgrade(conn, argument)
+            print(f"✅ Reverted {len(done)} migration(s)")
+        else:
+            for migration, is_applied, changed in status(conn):
+                mark = "✅" if is_applied else "⏳"
+                note = "  ⚠️  file changed since it was applied" if changed else ""
+                print(f"   {mark} {migration.version:04d} {migration.name}{note}")
+    except MigrationError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
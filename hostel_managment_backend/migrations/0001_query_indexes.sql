@@ -0,0 +1,52 @@
+-- Indexes matched to the hot queries in main.py / allocation.py / dashboard_stats.py.
+-- InnoDB secondary indexes carry the primary key, so (x) also serves "WHERE x = ? ORDER BY <pk>".
+-- Several of these start with a foreign-key column; MySQL then drops the implicit FK index,
+-- which is why the downgrade puts a plain FK index back before dropping ours.
+
+-- upgrade
+
+-- allocate_free_bed: WHERE occupied_by IS NULL ORDER BY bed_id LIMIT 1 ... SKIP LOCKED
+CREATE INDEX idx_bed_free ON bed (occupied_by, bed_id);
+-- allocate_bed / room details: WHERE room_no = ? AND bed_no = ?  (and no bed can exist twice)
+ALTER TABLE bed ADD CONSTRAINT uq_bed_room_bed UNIQUE (room_no, bed_no);
+
+-- roommates / room details: WHERE a.room_no = ?
+CREATE INDEX idx_allocation_room ON allocation (room_no, bed_no);
+
+-- pending-students, bulk allocation, /students?allocation_status=...  (ORDER BY usn for free)
+CREATE INDEX idx_student_allocation_status ON student (room_allocation_status);
+-- /students?department=... and ?year=...
+CREATE INDEX idx_student_department ON student (department_name);
+CREATE INDEX idx_student_year ON student (year);
+
+-- complaints/unresolved + dashboard: WHERE status != 'Resolved' ORDER BY created_at DESC
+CREATE INDEX idx_complaint_status_created ON complaint (status, created_at);
+-- student complaints + active-count: WHERE usn = ? [AND status != 'Resolved']
+CREATE INDEX idx_complaint_usn_status ON complaint (usn, status);
+
+-- leaves/pending + dashboard: WHERE warden_approval IN (...) ORDER BY created_at DESC
+CREATE INDEX idx_leave_approval_created ON leave_request (warden_approval, created_at);
+-- student leaves / recent leaves: WHERE usn = ? ORDER BY created_at DESC LIMIT 5
+CREATE INDEX idx_leave_usn_created ON leave_request (usn, created_at);
+
+-- downgrade
+
+CREATE INDEX fk_leave_usn ON leave_request (usn);
+DROP INDEX idx_leave_usn_created ON leave_request;
+DROP INDEX idx_leave_approval_created ON leave_request;
+
+CREATE INDEX fk_complaint_usn ON complaint (usn);
+DROP INDEX idx_complaint_usn_status ON complaint;
+DROP INDEX idx_complaint_status_created ON complaint;
+
+DROP INDEX idx_student_year ON student;
+DROP INDEX idx_student_department ON student;
+DROP INDEX idx_student_allocation_status ON student;
+
+CREATE INDEX fk_allocation_room ON allocation (room_no);
+DROP INDEX idx_allocation_room ON allocation;
+
+CREATE INDEX fk_bed_room ON bed (room_no);
+ALTER TABLE bed DROP INDEX uq_bed_room_bed;
+CREATE INDEX fk_bed_occupied_by ON bed (occupied_by);
+DROP INDEX idx_bed_free ON bed;
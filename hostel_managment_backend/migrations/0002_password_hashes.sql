@@ -0,0 +1,12 @@
+-- Room for scrypt hashes (passwords.py, ~90 chars today) and stronger parameters later.
+-- Existing plaintext passwords stay as they are and are hashed on the next successful login.
+
+-- upgrade
+
+ALTER TABLE warden MODIFY password VARCHAR(255) NOT NULL;
+ALTER TABLE student MODIFY password VARCHAR(255) NOT NULL;
+
+-- downgrade
+
+ALTER TABLE student MODIFY password VARCHAR(100) NOT NULL;
+ALTER TABLE warden MODIFY password VARCHAR(100) NOT NULL;
@@ -0,0 +1,17 @@
+-- Logged-out session tokens (sessions.py). Rows are only needed until the token
+-- would have expired anyway; the revocation refresh deletes them after that.
+
+-- upgrade
+
+CREATE TABLE revoked_token (
+    jti CHAR(24) PRIMARY KEY,
+    subject VARCHAR(20) NOT NULL,
+    role ENUM('student','warden') NOT NULL,
+    expires_at INT UNSIGNED NOT NULL,
+    revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_revoked_token_expires (expires_at)
+);
+
+-- downgrade
+
+DROP TABLE revoked_token;
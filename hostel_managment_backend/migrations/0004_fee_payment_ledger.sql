@@ -0,0 +1,23 @@
+-- Append-only ledger of fee payments (fee_payments.py). fees.paid stays the running
+-- total; each payment is also a row here. idempotency_key (bank reference, client
+-- request id...) is unique so a re-sent payment or re-uploaded statement applies once.
+
+-- upgrade
+
+CREATE TABLE fee_payment (
+    payment_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    usn VARCHAR(20) NOT NULL,
+    amount DECIMAL(10,2) NOT NULL,
+    idempotency_key VARCHAR(100),
+    reference VARCHAR(100),
+    paid_on DATE,
+    source ENUM('api','bulk') NOT NULL DEFAULT 'api',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_fee_payment_idempotency (idempotency_key),
+    INDEX idx_fee_payment_usn (usn, payment_id),
+    FOREIGN KEY (usn) REFERENCES fees(usn) ON DELETE CASCADE
+);
+
+-- downgrade
+
+DROP TABLE fee_payment;
@@ -0,0 +1,15 @@
+-- FULLTEXT indexes behind GET /search (search.py). InnoDB keeps them up to date on every
+-- write, so search stays an index lookup however large the tables grow.
+-- Words shorter than innodb_ft_min_token_size (default 3) are not indexed.
+
+-- upgrade
+
+CREATE FULLTEXT INDEX ft_student_search ON student (name, email, usn);
+CREATE FULLTEXT INDEX ft_complaint_search ON complaint (description);
+CREATE FULLTEXT INDEX ft_notice_search ON notice (title, description);
+
+-- downgrade
+
+DROP INDEX ft_notice_search ON notice;
+DROP INDEX ft_complaint_search ON complaint;
+DROP INDEX ft_student_search ON student;
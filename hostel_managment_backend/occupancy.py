@@ -0,0 +1,189 @@
+import time
+
+from async_database import get_connection
+
+
+# Ground truth is the bed table: a bed is taken iff occupied_by IS NOT NULL
+BED_COUNTS_QUERY = """
+    SELECT room_no, COUNT(*) AS beds, COUNT(occupied_by) AS occupied
+    FROM bed
+    GROUP BY room_no
+"""
+
+# rooms whose no_of_occupancy counter disagrees with their beds
+DRIFT_QUERY = """
+    SELECT r.room_no, r.no_of_beds, r.no_of_occupancy,
+           COALESCE(b.beds, 0) AS beds, COALESCE(b.occupied, 0) AS occupied
+    FROM room r
+    LEFT JOIN (SELECT room_no, COUNT(*) AS beds, COUNT(occupied_by) AS occupied FROM bed GROUP BY room_no) b
+        ON b.room_no = r.room_no
+    WHERE r.no_of_occupancy <> COALESCE(b.occupied, 0) OR r.no_of_beds <> COALESCE(b.beds, 0)
+    ORDER BY r.room_no
+"""
+
+# one statement fixes every drifted counter
+REPAIR_QUERY = """
+    UPDATE room r
+    LEFT JOIN (SELECT room_no, COUNT(occupied_by) AS occupied FROM bed GROUP BY room_no) b
+        ON b.room_no = r.room_no
+    SET r.no_of_occupancy = COALESCE(b.occupied, 0)
+    WHERE r.no_of_occupancy <> COALESCE(b.occupied, 0)
+"""
+
+
+class OccupancyIndex:
+    """
+    In-memory bed occupancy per room, built from the bed table.
+
+    - rooms are bucketed by free-bed count, so "rooms with >= N free beds" only
+      touches the buckets >= N (at most max-beds-per-room of them), never every room
+    - allocation endpoints call beds_changed() after their transaction commits
+    - rebuild() reloads from bed; check_consistency() compares room.no_of_occupancy
+      against bed and can repair all drift with one UPDATE
+
+    Room numbers are keyed as strings (API input is a string, the column may be INT).
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self._rooms = {}     # str(room_no) -> [beds, occupied, room_no as stored]
+        self._by_free = {}   # free beds -> {room_no}
+        self._loaded = False
+
+        # stats
+        self._rebuilds = 0
+        self._last_rebuild = None
+        self._last_rebuild_ms = 0.0
+
+    def _unlink(self, room_no):
+        room = self._rooms.get(room_no)
+        if room is None:
+            return None
+        bucket = self._by_free[room[0] - room[1]]
+        bucket.discard(room_no)
+        if not bucket:
+            del self._by_free[room[0] - room[1]]
+        return room
+
+    def _place(self, key, beds, occupied, room_no):
+        occupied = min(max(occupied, 0), beds)
+        self._rooms[key] = [beds, occupied, room_no]
+        self._by_free.setdefault(beds - occupied, set()).add(key)
+
+    # ---- updates (call after the write has committed) ----
+
+    def rooms_added(self, rooms):
+        """rooms: iterable of (room_no, no_of_beds) for newly created, empty rooms."""
+        if not self._loaded:
+            return
+        for room_no, beds in rooms:
+            key = str(room_no)
+            self._unlink(key)
+            self._place(key, beds, 0, room_no)
+
+    def beds_changed(self, room_nos, delta=1):
+        """One entry per bed taken (delta=1) or freed (delta=-1)."""
+        if not self._loaded:
+            return
+        for room_no in room_nos:
+            key = str(room_no)
+            room = self._unlink(key)
+            if room is None:
+                # room made outside the API; the next rebuild picks it up
+                continue
+            self._place(key, room[0], room[1] + delta, room[2])
+
+    # ---- queries ----
+
+    async def ensure_loaded(self):
+        if not self._loaded:
+            return await self.rebuild()
+        return True
+
+    def count_with_free_beds(self, min_free=1):
+        return sum(len(rooms) for free, rooms in self._by_free.items() if free >= min_free)
+
+    def rooms_with_free_beds(self, min_free=1):
+        """[(room_no, beds, occupied)] for rooms with at least `min_free` free beds, by room number."""
+        found = [key for free, rooms in self._by_free.items() if free >= min_free for key in rooms]
+        found.sort(key=lambda k: (len(k), k))   # numeric order for numeric room numbers
+        return [(self._rooms[key][2], self._rooms[key][0], self._rooms[key][1]) for key in found]
+
+    # ---- rebuild / consistency ----
+
+    async def rebuild(self):
+        """Reload from the bed table. Returns False if no connection was available."""
+        conn = await get_connection()
+        if conn is None:
+            return False
+
+        started = time.perf_counter()
+        try:
+            cursor = await conn.cursor(dictionary=True)
+            await cursor.execute(BED_COUNTS_QUERY)
+            counts = await cursor.fetchall()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+        self._rooms = {}
+        self._by_free = {}
+        for row in counts:
+            self._place(str(row["room_no"]), int(row["beds"]), int(row["occupied"]), row["room_no"])
+        self._loaded = True
+        self._rebuilds += 1
+        self._last_rebuild = time.time()
+        self._last_rebuild_ms = round((time.perf_counter() - started) * 1000, 3)
+        return True
+
+    def stats(self):
+        return {
+            "loaded": self._loaded,
+            "rooms": len(self._rooms),
+            "rooms_with_free_beds": self.count_with_free_beds(1),
+            "free_bed_buckets": {free: len(rooms) for free, rooms in sorted(self._by_free.items())},
+            "rebuilds": self._rebuilds,
+            "last_rebuild": self._last_rebuild,
+            "last_rebuild_ms": self._last_rebuild_ms,
+        }
+
+
+async def check_consistency(conn, repair=False):
+    """
+    Rooms whose no_of_occupancy / no_of_beds disagree with the bed table.
+    With repair=True every occupancy counter is corrected in one UPDATE (bed count
+    mismatches are only reported: they need beds created or removed by hand).
+    """
+    cursor = await conn.cursor(dictionary=True)
+    await conn.start_transaction()
+    try:
+        await cursor.execute(DRIFT_QUERY)
+        drifted = await cursor.fetchall()
+        repaired = 0
+        if repair and drifted:
+            await cursor.execute(REPAIR_QUERY)
+            repaired = cursor.rowcount
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    return {
+        "checked_at": time.time(),
+        "drifted": [
+            {
+                "room_no": row["room_no"],
+                "no_of_occupancy": row["no_of_occupancy"],
+                "occupied_beds": row["occupied"],
+                "no_of_beds": row["no_of_beds"],
+                "beds": row["beds"],
+            }
+            for row in drifted
+        ],
+        "repaired": repaired,
+    }
+
+
+occupancy = OccupancyIndex()
@@ -0,0 +1,182 @@
+"""
+Password hashing for the login endpoints.
+
+- hashes are scrypt (hashlib, no extra dependency) stored as
+      scrypt$<n>$<r>$<p>$<salt b64>$<key b64>
+- hashing/verifying is CPU heavy (~tens of ms each), so it runs on a dedicated thread
+  pool of HOSTEL_PASSWORD_WORKERS threads. hashlib.scrypt releases the GIL, so the
+  workers use every core without blocking the event loop or FastAPI's own threadpool
+- at most HOSTEL_PASSWORD_QUEUE jobs may be waiting or running; beyond that
+  PasswordBusyError is raised at once instead of queueing an unbounded login storm
+- rows still holding a plaintext password verify by constant-time compare and report
+  needs_rehash, so the caller can store a hash after the next successful login
+
+Benchmark (login verifications/s for several pool sizes):
+    python passwords.py --logins 200 --workers 1,2,4,8
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+SCRYPT_N = int(os.environ.get("HOSTEL_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+PASSWORD_WORKERS = int(os.environ.get("HOSTEL_PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+# hash/verify jobs allowed in flight (running + waiting) before logins are turned away
+PASSWORD_QUEUE = int(os.environ.get("HOSTEL_PASSWORD_QUEUE", str(PASSWORD_WORKERS * 8)))
+
+PREFIX = "scrypt$"
+
+
+class PasswordBusyError(Exception):
+    """Too many hash/verify jobs already queued; the caller should answer 'try again'."""
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _derive(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * n * r * p + 1024 * 1024, dklen=KEY_BYTES)
+
+
+def hash_password_sync(password):
+    salt = os.urandom(SALT_BYTES)
+    key = _derive(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"{PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+
+def hash_passwords_sync(passwords):
+    return [hash_password_sync(password) for password in passwords]
+
+
+def is_hashed(stored):
+    return stored.startswith(PREFIX)
+
+
+def verify_password_sync(password, stored):
+    """(matches, needs_rehash). Plaintext rows always need a rehash when they match."""
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+        return ok, ok
+
+    try:
+        n, r, p, salt, key = stored[len(PREFIX):].split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt, key = base64.b64decode(salt), base64.b64decode(key)
+        # a corrupt row (n not a power of 2, ...) fails the login rather than the request
+        derived = _derive(password, salt, n, r, p)
+    except ValueError:
+        return False, False
+
+    ok = hmac.compare_digest(derived, key)
+    return ok, ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+class PasswordHasher:
+    """Bounded worker pool in front of the sync functions above (used from the event loop only)."""
+
+    def __init__(self, workers=PASSWORD_WORKERS, max_pending=PASSWORD_QUEUE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = 0
+
+        # stats
+        self._jobs = 0
+        self._rejected = 0
+        self._busy_time = 0.0
+        self._peak_pending = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise PasswordBusyError("Too many logins in progress, please try again")
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+
+        self._pending += 1
+        self._peak_pending = max(self._peak_pending, self._pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self._jobs += 1
+            self._busy_time += time.perf_counter() - started
+
+    async def hash(self, password):
+        return await self._run(hash_password_sync, password)
+
+    async def hash_many(self, passwords):
+        """Hashes for a batch (bulk imports), spread over the workers as one job per worker."""
+        slices = [passwords[i::self.workers] for i in range(min(self.workers, len(passwords)))]
+        hashed = await asyncio.gather(*(self._run(hash_passwords_sync, part) for part in slices))
+        result = [None] * len(passwords)
+        for i, part in enumerate(hashed):
+            result[i::self.workers] = part
+        return result
+
+    async def verify(self, password, stored):
+        """(matches, needs_rehash) — see verify_password_sync."""
+        return await self._run(verify_password_sync, password, stored)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "peak_pending": self._peak_pending,
+            "jobs": self._jobs,
+            "rejected": self._rejected,
+            "avg_ms": round(self._busy_time / self._jobs * 1000, 2) if self._jobs else 0.0,
+            "scrypt_n": SCRYPT_N,
+        }
+
+
+passwords = PasswordHasher()
+
+
+# ---- benchmark ----
+
+async def _bench(workers, logins, stored):
+    hasher = PasswordHasher(workers=workers, max_pending=logins)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(hasher.verify("benchmark-password", stored) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    assert all(ok for ok, _ in results)
+    return elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Login verification throughput on this machine")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", default=",".join(str(w) for w in sorted({1, 2, 4, os.cpu_count() or 1})))
+    args = parser.parse_args()
+
+    stored = hash_password_sync("benchmark-password")
+    print(f"scrypt n={SCRYPT_N} r={SCRYPT_R} p={SCRYPT_P}, {os.cpu_count()} CPUs, {args.logins} logins per run")
+    baseline = None
+    for workers in (int(w) for w in args.workers.split(",")):
+        elapsed = asyncio.run(_bench(workers, args.logins, stored))
+        rate = args.logins / elapsed
+        baseline = baseline or rate
+        print(f"  workers={workers:<3} {rate:8.1f} logins/s  ({elapsed * 1000 / args.logins:.1f} ms each, x{rate / baseline:.2f})")
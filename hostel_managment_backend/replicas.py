@@ -0,0 +1,304 @@
+"""
+Read replicas for the read-only endpoints.
+
+- HOSTEL_DB_REPLICAS="host:port,host:port" lists MySQL replicas of the primary
+  (HOSTEL_DB_HOST / HOSTEL_DB_PORT); they share its user, password and database.
+  Unset -> everything runs on the primary, exactly as before
+- handlers that only read ask for `await get_connection(read_only=True)`; those
+  connections come from the replicas, round robin. Everything else (and all writes)
+  stays on the primary
+- a background checker reads each replica's Seconds_Behind_Source every
+  HOSTEL_REPLICA_LAG_CHECK seconds; a replica more than HOSTEL_REPLICA_MAX_LAG seconds
+  behind, not replicating, or unreachable (own circuit breaker) gets no reads until
+  it catches up. With no usable replica, reads fall back to the primary
+- read-your-writes: once a caller commits a write, its reads go to the primary for
+  HOSTEL_READ_YOUR_WRITES seconds, so it never sees its own change "undone" by a
+  lagging replica. A caller is its session (bearer token). Most write routes take no
+  token, and an IP would lump every client behind one NAT / proxy together, so a
+  commit without a token sends *every* read to the primary for the window instead.
+  The window is per worker process; keep it at least HOSTEL_REPLICA_MAX_LAG
+
+Trying it locally with two MySQL instances (primary on 3306, replica on 3307):
+
+    # replica: CHANGE REPLICATION SOURCE TO SOURCE_HOST='127.0.0.1', SOURCE_PORT=3306, ...;
+    #          START REPLICA;
+    HOSTEL_DB_REPLICAS=127.0.0.1:3307 python replicas.py     # lag + routing check
+    HOSTEL_DB_REPLICAS=127.0.0.1:3307 uvicorn main:app
+
+The account needs REPLICATION CLIENT on the replicas to read their status.
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+import mysql.connector
+
+import database
+from database import DB_CONFIG, HealthMonitor, ConnectionPool
+from logging_config import SAMPLED, configure_logging
+from request_context import bearer_token
+
+log = logging.getLogger(__name__)
+
+
+REPLICA_MAX_LAG = float(os.environ.get("HOSTEL_REPLICA_MAX_LAG", "5"))
+REPLICA_LAG_CHECK = float(os.environ.get("HOSTEL_REPLICA_LAG_CHECK", "2"))
+READ_YOUR_WRITES = float(os.environ.get("HOSTEL_READ_YOUR_WRITES", "5"))
+# callers remembered for read-your-writes (oldest forgotten first)
+STICKY_CALLERS_MAX = int(os.environ.get("HOSTEL_STICKY_CALLERS_MAX", "10000"))
+
+# MySQL error for an unknown statement: servers before 8.0.22 only know SHOW SLAVE STATUS
+_ER_PARSE_ERROR = 1064
+
+# the calling session's bearer token (set by bind_caller), for read-your-writes; None = anonymous
+_caller = ContextVar("hostel_replica_caller", default=None)
+
+
+def parse_replicas(text):
+    """"host:port,host" -> [(host, port)]; the port defaults to the primary's."""
+    replicas = []
+    for item in (text or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        replicas.append((host, int(port) if port else DB_CONFIG["port"]))
+    return replicas
+
+
+class Replica:
+    """One replica: its own connection pool, circuit breaker and last measured lag."""
+
+    def __init__(self, host, port):
+        self.name = f"{host}:{port}"
+        self.config = {**DB_CONFIG, "host": host, "port": port}
+        self.health = HealthMonitor(self._probe)
+        # serves the reads in sync mode; in async mode only the lag checks use it
+        self.pool = ConnectionPool(self._connect)
+        # aiomysql pool (+ its checkout counters), opened by async_database on first use
+        self.async_pool = None
+        self.async_stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "wait_time": 0.0, "max_wait": 0.0}
+
+        self.lag = None          # seconds behind the primary; None = unknown / not replicating
+        self.checked_at = None
+        self.lag_error = None
+        self.reads = 0
+
+    def _probe(self):
+        conn = database._open_raw_connection(self.config)
+        conn.close()
+        return True
+
+    def _connect(self):
+        return database.connect_to(self.config, self.health)
+
+    def usable(self, max_lag=REPLICA_MAX_LAG):
+        return self.health.state == HealthMonitor.CLOSED and self.lag is not None and self.lag <= max_lag
+
+    def check_lag(self):
+        """Measure replication lag (blocking; run it in a thread). Returns the lag or None."""
+        lag, error = None, None
+        conn = self.pool.acquire()
+        if conn is None:
+            error = "unreachable"
+        else:
+            try:
+                rows, column = self._replica_status(conn)
+                if not rows:
+                    error = "not replicating"
+                else:
+                    # one row per replication channel: the slowest one counts, a stopped one makes it unusable
+                    lags = [row.get(column) for row in rows]
+                    if any(value is None for value in lags):
+                        error = "replication stopped"
+                    else:
+                        lag = max(int(value) for value in lags)
+            except mysql.connector.Error as e:
+                error = str(e)
+            finally:
+                conn.close()
+
+        if error and error != self.lag_error:
+            log.warning("Replica %s has no usable lag (%s); reads go elsewhere", self.name, error, extra=SAMPLED)
+        self.lag, self.lag_error, self.checked_at = lag, error, time.time()
+        return lag
+
+    @staticmethod
+    def _replica_status(conn):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+            return cursor.fetchall(), "Seconds_Behind_Source"
+        except mysql.connector.Error as e:
+            if e.errno != _ER_PARSE_ERROR:
+                raise
+        finally:
+            cursor.close()
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW SLAVE STATUS")
+            return cursor.fetchall(), "Seconds_Behind_Master"
+        finally:
+            cursor.close()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "usable": self.usable(),
+            "lag_seconds": self.lag,
+            "lag_error": self.lag_error,
+            "checked_at": self.checked_at,
+            "reads": self.reads,
+            "breaker": self.health.stats(),
+        }
+
+
+class ReplicaRouter:
+    """Picks the replica for each read-only connection. Runs on the event loop, so no locking is needed."""
+
+    def __init__(self, replicas, max_lag=REPLICA_MAX_LAG, read_your_writes=READ_YOUR_WRITES):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.read_your_writes = read_your_writes
+        self._turn = itertools.count()
+        self._last_write = OrderedDict()   # caller -> monotonic time of its last commit
+        self._anonymous_write = None       # monotonic time of the last commit without a caller
+        self._task = None
+
+        # stats
+        self._sticky_reads = 0
+        self._anonymous_write_reads = 0
+        self._lagging_reads = 0
+        self._fallbacks = 0
+
+    # ---- read-your-writes ----
+
+    def note_write(self):
+        """Called after every commit; the current caller's reads stick to the primary for a while.
+
+        A commit with no caller can't be told apart from anyone else's, so all reads do.
+        """
+        if not self.replicas:
+            return
+        caller = _caller.get()
+        if caller is None:
+            self._anonymous_write = time.monotonic()
+            return
+        self._last_write[caller] = time.monotonic()
+        self._last_write.move_to_end(caller)
+        while len(self._last_write) > STICKY_CALLERS_MAX:
+            self._last_write.popitem(last=False)
+
+    def _sticky(self, caller):
+        wrote_at = self._last_write.get(caller)
+        if wrote_at is None:
+            return False
+        if time.monotonic() - wrote_at < self.read_your_writes:
+            return True
+        del self._last_write[caller]
+        return False
+
+    def _after_anonymous_write(self):
+        if self._anonymous_write is None:
+            return False
+        if time.monotonic() - self._anonymous_write < self.read_your_writes:
+            return True
+        self._anonymous_write = None
+        return False
+
+    # ---- routing ----
+
+    def pick(self):
+        """Replica for a read-only connection, or None to use the primary."""
+        if not self.replicas:
+            return None
+        caller = _caller.get()
+        if caller is not None and self._sticky(caller):
+            self._sticky_reads += 1
+            return None
+        if self._after_anonymous_write():
+            self._anonymous_write_reads += 1
+            return None
+
+        candidates = [r for r in self.replicas if r.usable(self.max_lag)]
+        if not candidates:
+            self._lagging_reads += 1
+            return None
+        replica = candidates[next(self._turn) % len(candidates)]
+        replica.reads += 1
+        return replica
+
+    def fell_back(self, replica):
+        """A picked replica had no connection to give; the read goes to the primary instead."""
+        replica.reads -= 1
+        self._fallbacks += 1
+
+    # ---- lag checks ----
+
+    async def check_lag(self):
+        await asyncio.gather(*(asyncio.to_thread(r.check_lag) for r in self.replicas))
+
+    async def _check_loop(self, interval):
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+    def start(self, interval=REPLICA_LAG_CHECK):
+        if self._task is None and self.replicas:
+            self._task = asyncio.get_running_loop().create_task(self._check_loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "replicas": [r.stats() for r in self.replicas],
+            "max_lag_seconds": self.max_lag,
+            "read_your_writes_seconds": self.read_your_writes,
+            "sticky_callers": len(self._last_write),
+            "sticky_reads": self._sticky_reads,
+            "anonymous_write_reads": self._anonymous_write_reads,
+            "lagging_reads": self._lagging_reads,
+            "fallbacks": self._fallbacks,
+        }
+
+
+router = ReplicaRouter([Replica(host, port) for host, port in parse_replicas(os.environ.get("HOSTEL_DB_REPLICAS"))])
+
+
+def bind_caller(scope):
+    """Remember which session is calling, so its commits make its own later reads use the primary."""
+    return _caller.set(bearer_token(scope))
+
+
+# Check every replica from the command line: reachable? lag? would it get reads?
+if __name__ == "__main__":
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Replication lag / routing check for HOSTEL_DB_REPLICAS")
+    parser.add_argument("--reads", type=int, default=6, help="read-only picks to simulate")
+    args = parser.parse_args()
+
+    if not router.replicas:
+        print("HOSTEL_DB_REPLICAS is not set — every read goes to the primary")
+        raise SystemExit(1)
+
+    asyncio.run(router.check_lag())
+    for replica in router.replicas:
+        status = "usable" if replica.usable() else f"skipped ({replica.lag_error or f'lag {replica.lag}s > {REPLICA_MAX_LAG:g}s'})"
+        print(f"{replica.name:<25} lag={replica.lag!s:<6} {status}")
+
+    picks = [router.pick() for _ in range(args.reads)]
+    print("routing:", ", ".join(r.name if r else "primary" for r in picks))
+    raise SystemExit(0 if any(r.usable() for r in router.replicas) else 1)
@@ -0,0 +1,75 @@
+"""
+Per-request context for the whole app, in one pure ASGI middleware.
+
+- metrics: a RequestMetrics is current while the request runs; the request is booked
+  (status, latency, DB work) when its final http.response.body message has been sent,
+  so StreamingResponse / SSE bodies (exports, /events) are timed to their last byte
+- binders: callables `bind(scope) -> ContextVar token` that set one context variable
+  for the request (audit's actor, the replica router's caller); every token is reset
+  when the request is done
+
+Being plain ASGI (not @app.middleware("http")), it adds no task or memory-stream hop
+per request, and context variables set here are seen by the handler directly.
+"""
+import time
+
+from metrics import begin_request, finish_request
+
+
+def header(scope, name):
+    """First value of a request header (name in lower case), or None."""
+    name = name.encode("latin-1")
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def bearer_token(scope):
+    """The token of an `Authorization: Bearer ...` header, or None."""
+    scheme, _, token = (header(scope, "authorization") or "").partition(" ")
+    token = token.strip()
+    return token if scheme.lower() == "bearer" and token else None
+
+
+class RequestContextMiddleware:
+
+    def __init__(self, app, binders=()):
+        self.app = app
+        self.binders = tuple(binders)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        m, metrics_token = begin_request()
+        tokens = [bind(scope) for bind in self.binders]
+        started = time.perf_counter()
+        status = 500
+        booked = False
+
+        def book():
+            nonlocal booked
+            booked = True
+            route = scope.get("route")
+            route = route.path if route is not None else "(unmatched)"
+            finish_request(scope["method"], route, status, time.perf_counter() - started, m)
+
+        async def send_and_book(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False) and not booked:
+                book()
+
+        try:
+            await self.app(scope, receive, send_and_book)
+        finally:
+            # an exception, or a client that went away mid-body: book it as far as it got
+            if not booked:
+                book()
+            for token in reversed(tokens):
+                token.var.reset(token)
+            metrics_token.var.reset(metrics_token)
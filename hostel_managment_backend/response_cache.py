@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+
+# ---- Cache settings (override with environment variables) ----
+CACHE_MAX_ENTRIES = int(os.environ.get("HOSTEL_CACHE_MAX_ENTRIES", "256"))
+# seconds an entry may be served without re-querying, even if nothing invalidated it
+CACHE_TTL = float(os.environ.get("HOSTEL_CACHE_TTL", "30"))
+
+
+class _CacheEntry:
+    __slots__ = ("body", "etag", "expires_at", "tags")
+
+    def __init__(self, body, etag, expires_at, tags):
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+    """
+    In-process cache of encoded JSON responses.
+
+    - at most `max_entries` entries; the least recently used one is evicted first
+    - entries expire after `ttl` seconds
+    - every entry carries tags ("rooms", "notices"); write endpoints call invalidate(tag)
+    - responses carry an ETag; a matching If-None-Match gets an empty 304
+
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        # bumped by invalidate(); a load that started before an invalidation is not stored
+        self._generations = {}
+
+        # stats
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._entries[key]
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key, body, tags, now):
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        entry = _CacheEntry(body, etag, now + self.ttl, tags)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+        return entry
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of `tags`."""
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+        stale = [key for key, entry in self._entries.items() if entry.tags & set(tags)]
+        for key in stale:
+            del self._entries[key]
+        self._invalidations += len(stale)
+
+    @staticmethod
+    def _response(request, entry, status):
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache", "X-Cache": status}
+        if request.headers.get("if-none-match") == entry.etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    async def serve(self, request, tags, load):
+        """
+        Answer `request` from the cache, or await `load()` (returns the usual response dict)
+        and cache it under the request path + query string. Error responses are not cached.
+        """
+        key = request.url.path + ("?" + request.url.query if request.url.query else "")
+        tags = frozenset(tags)
+        now = time.monotonic()
+
+        entry = self._lookup(key, now)
+        if entry is not None:
+            self._hits += 1
+            if request.headers.get("if-none-match") == entry.etag:
+                self._not_modified += 1
+            return self._response(request, entry, "HIT")
+
+        self._misses += 1
+        generations = {tag: self._generations.get(tag, 0) for tag in tags}
+        data = await load()
+        if not isinstance(data, dict) or data.get("status") != "success":
+            return data
+
+        body = json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if any(self._generations.get(tag, 0) != gen for tag, gen in generations.items()):
+            # a write landed while we were reading; answer this request but don't keep it
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+        entry = self._store(key, body, tags, time.monotonic())
+        return self._response(request, entry, "MISS")
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+            "not_modified": self._not_modified,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "invalidations": self._invalidations,
+        }
+
+
+response_cache = ResponseCache()
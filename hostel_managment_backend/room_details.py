@@ -0,0 +1,118 @@
+import os
+
+
+# most rooms one /rooms/details call may ask for (a floor plan is well under this)
+ROOM_DETAILS_MAX = int(os.environ.get("HOSTEL_ROOM_DETAILS_MAX", "500"))
+
+# Room row, its members and its free beds in ONE statement: the three parts are
+# stacked with UNION ALL and told apart by `part` (0 = room, 1 = member, 2 = free bed).
+# Columns a part doesn't use are NULL. A stored procedure returning three result sets
+# would also be one round trip, but aiomysql and mysql.connector read extra result
+# sets differently (nextset() vs stored_results()); one result set works with both.
+_ROOM_DETAILS_TEMPLATE = """
+    SELECT 0 AS part, room_no, no_of_beds, no_of_tables, no_of_chairs, no_of_fans, no_of_occupancy,
+           NULL AS usn, NULL AS name, NULL AS department_name, NULL AS year,
+           NULL AS bed_no, NULL AS start_date, NULL AS end_date
+    FROM room
+    WHERE room_no IN ({rooms})
+    UNION ALL
+    SELECT 1, a.room_no, NULL, NULL, NULL, NULL, NULL,
+           s.usn, s.name, s.department_name, s.year,
+           a.bed_no, a.start_date, a.end_date
+    FROM allocation a
+    JOIN student s ON a.usn = s.usn
+    WHERE a.room_no IN ({rooms})
+    UNION ALL
+    SELECT 2, room_no, NULL, NULL, NULL, NULL, NULL,
+           NULL, NULL, NULL, NULL,
+           bed_no, NULL, NULL
+    FROM bed
+    WHERE room_no IN ({rooms}) AND occupied_by IS NULL
+    ORDER BY room_no, part, bed_no
+"""
+
+# /student-room/{usn}: allocation -> room in one query (LEFT JOIN tells "not allocated" from "room missing")
+STUDENT_ROOM_QUERY = """
+    SELECT a.room_no AS allocated_room,
+           r.room_no, r.no_of_beds, r.no_of_tables, r.no_of_chairs, r.no_of_fans, r.no_of_occupancy,
+           (r.no_of_beds - r.no_of_occupancy) AS available_beds
+    FROM allocation a
+    LEFT JOIN room r ON r.room_no = a.room_no
+    WHERE a.usn = %s
+"""
+
+# /roommates/{usn}: everyone sharing the student's room, the student included
+ROOMMATES_QUERY = """
+    SELECT mine.room_no, s.usn, s.name, s.department_name, s.year, s.email, a.bed_no
+    FROM allocation mine
+    LEFT JOIN allocation a ON a.room_no = mine.room_no
+    LEFT JOIN student s ON s.usn = a.usn
+    WHERE mine.usn = %s
+"""
+
+
+def room_number(value):
+    """room.room_no is an INT column: 101, "101" and "0101" all mean room 101. ValueError otherwise."""
+    text = str(value).strip()
+    if isinstance(value, bool) or not (text.isascii() and text.isdigit()):
+        raise ValueError(f"room_no must be a whole number, got {value!r}")
+    return int(text)
+
+
+def room_details_query(count):
+    """The combined query for `count` rooms; pass the room numbers 3 times (see room_details_params)."""
+    return _ROOM_DETAILS_TEMPLATE.format(rooms=", ".join(["%s"] * count))
+
+
+def room_details_params(room_nos):
+    return tuple(room_nos) * 3
+
+
+async def fetch_room_details(conn, room_nos):
+    """
+    {room_no (int): details} for every requested room that exists, read in a single
+    round trip however many rooms are asked for. Missing rooms are simply absent.
+    Raises ValueError for a room number that isn't one (see room_number).
+    """
+    room_nos = list(dict.fromkeys(room_number(r) for r in room_nos))
+    if not room_nos:
+        return {}
+
+    cursor = await conn.cursor(dictionary=True)
+    try:
+        await cursor.execute(room_details_query(len(room_nos)), room_details_params(room_nos))
+        rows = await cursor.fetchall()
+    finally:
+        await cursor.close()
+
+    details = {}
+    for row in rows:
+        key = row["room_no"]
+        if row["part"] == 0:
+            details[key] = {
+                "room_no": row["room_no"],
+                "total_beds": row["no_of_beds"],
+                "tables": row["no_of_tables"],
+                "chairs": row["no_of_chairs"],
+                "fans": row["no_of_fans"],
+                "occupied_beds": row["no_of_occupancy"],
+                "vacant_beds": row["no_of_beds"] - row["no_of_occupancy"],
+                "available_bed_numbers": [],
+                "members": [],
+            }
+        elif key not in details:
+            continue   # beds / allocations pointing at a room row that doesn't exist
+        elif row["part"] == 1:
+            details[key]["members"].append({
+                "usn": row["usn"],
+                "name": row["name"],
+                "department_name": row["department_name"],
+                "year": row["year"],
+                "bed_no": row["bed_no"],
+                "start_date": row["start_date"],
+                "end_date": row["end_date"],
+            })
+        else:
+            details[key]["available_bed_numbers"].append(row["bed_no"])
+
+    return details
@@ -0,0 +1,90 @@
+import os
+import re
+
+
+SEARCH_MAX_TERMS = 8
+SEARCH_MAX_LIMIT = 100
+# deep offsets on a ranked result make MySQL score and sort everything before them
+SEARCH_MAX_OFFSET = int(os.environ.get("HOSTEL_SEARCH_MAX_OFFSET", "1000"))
+# innodb_ft_min_token_size: shorter words are not in the FULLTEXT index
+MIN_TERM_LENGTH = int(os.environ.get("HOSTEL_SEARCH_MIN_TERM", "3"))
+
+# kind -> (query, columns). Each query takes (boolean query, boolean query, limit, offset)
+# and must use the FULLTEXT index created by migration 0005 for its MATCH() columns.
+SEARCH_QUERIES = {
+    "student": """
+        SELECT usn, name, email, department_name, year, room_allocation_status,
+               MATCH(name, email, usn) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM student
+        WHERE MATCH(name, email, usn) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY score DESC, usn
+        LIMIT %s OFFSET %s
+    """,
+    "complaint": """
+        SELECT complaint_id, usn, room_no, type, status, description, created_at,
+               MATCH(description) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM complaint
+        WHERE MATCH(description) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY score DESC, complaint_id DESC
+        LIMIT %s OFFSET %s
+    """,
+    "notice": """
+        SELECT notice_id, title, description, date_posted,
+               MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) AS score
+        FROM notice
+        WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+        ORDER BY score DESC, notice_id DESC
+        LIMIT %s OFFSET %s
+    """,
+}
+
+# letters/digits runs; everything else (including boolean-mode operators) separates words
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchError(Exception):
+    """Search request can't be run (no usable words, unknown type...)."""
+
+
+def boolean_query(text):
+    """
+    'ravi kum' -> '+ravi* +kum*': every word must match, each as a prefix.
+    Words too short for the FULLTEXT index are dropped (they would match nothing).
+    """
+    words = [w for w in _WORD.findall(text.lower()) if len(w) >= MIN_TERM_LENGTH]
+    words = list(dict.fromkeys(words))[:SEARCH_MAX_TERMS]
+    if not words:
+        raise SearchError(f"Search needs at least one word of {MIN_TERM_LENGTH}+ characters")
+    return " ".join(f"+{w}*" for w in words)
+
+
+def parse_types(types):
+    kinds = [t.strip() for t in types.split(",") if t.strip()] if types else list(SEARCH_QUERIES)
+    unknown = [k for k in kinds if k not in SEARCH_QUERIES]
+    if unknown:
+        raise SearchError(f"Unknown search type {unknown} — use {', '.join(SEARCH_QUERIES)}")
+    return list(dict.fromkeys(kinds))
+
+
+async def search(conn, text, kinds, limit=20, offset=0):
+    """
+    {kind: {"results": [...], "has_more": bool}} ranked by relevance within each kind
+    (scores of different tables aren't comparable, so kinds are not merged).
+    """
+    if offset > SEARCH_MAX_OFFSET:
+        raise SearchError(f"offset can be at most {SEARCH_MAX_OFFSET} — refine the search instead")
+    query = boolean_query(text)
+
+    found = {}
+    cursor = await conn.cursor(dictionary=True)
+    try:
+        for kind in kinds:
+            # one extra row tells whether there is a next page without a COUNT(*)
+            await cursor.execute(SEARCH_QUERIES[kind], (query, query, limit + 1, offset))
+            rows = await cursor.fetchall()
+            for row in rows:
+                row["score"] = round(float(row["score"]), 4)
+            found[kind] = {"results": rows[:limit], "has_more": len(rows) > limit}
+    finally:
+        await cursor.close()
+    return found
@@ -0,0 +1,171 @@
+"""
+Fill a development database with a realistically sized, reproducible dataset.
+
+Seeded rows are easy to find again: USNs start with SEED_PREFIX and room numbers
+with SEED_ROOM_BASE, so `--clear` removes them without touching real data.
+
+    python seed.py --students 5000 --rooms 1500 --complaints 10000 --leaves 10000
+    python seed.py --clear
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from database import get_connection
+
+
+SEED_PREFIX = "SEED"
+SEED_ROOM_BASE = 500000
+BATCH_ROWS = 1000
+
+DEPARTMENTS = ["CSE", "ECE", "MECH", "CIVIL", "EEE", "ISE", "AIML", "BIOTECH"]
+BLOOD_GROUPS = ["A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-"]
+COMPLAINT_TYPES = ["Electrical", "Plumbing", "Furniture", "Other"]
+# most complaints and leaves in a live hostel are already closed
+COMPLAINT_STATUSES = ["Resolved"] * 8 + ["In Progress", "Pending"]
+LEAVE_STATUSES = ["Approved"] * 7 + ["Rejected", "Pending", "Pending"]
+
+
+def _insert(cursor, query, rows):
+    for start in range(0, len(rows), BATCH_ROWS):
+        cursor.executemany(query, rows[start:start + BATCH_ROWS])
+
+
+def seed(conn, students=5000, rooms=1500, beds_per_room=3, complaints=10000, leaves=10000,
+         occupancy=0.8, random_seed=42):
+    """
+    Insert seeded students (with fees), rooms with beds, allocations for `occupancy` of
+    the beds, complaints and leave requests. Returns the number of rows per table.
+    """
+    rng = random.Random(random_seed)
+    usns = [f"{SEED_PREFIX}{n:07d}" for n in range(students)]
+    room_nos = [SEED_ROOM_BASE + n for n in range(rooms)]
+    beds = [(room_no, bed_no) for room_no in room_nos for bed_no in range(1, beds_per_room + 1)]
+
+    placed = min(len(usns), int(len(beds) * occupancy))
+    plan = list(zip(usns[:placed], beds[:placed]))
+    allocated = {usn for usn, _ in plan}
+    occupancy_by_room = {}
+    for _, (room_no, _) in plan:
+        occupancy_by_room[room_no] = occupancy_by_room.get(room_no, 0) + 1
+
+    cursor = conn.cursor()
+    conn.start_transaction()
+    try:
+        _insert(cursor, """
+            INSERT INTO student
+            (usn, name, student_mobile, father_mobile, mother_mobile, email, password,
+             department_name, year, blood_group, room_allocation_status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (usn, f"Seed Student {n}", f"9{n:09d}", f"8{n:09d}", f"7{n:09d}", f"{usn.lower()}@seed.test", usn,
+             rng.choice(DEPARTMENTS), rng.randint(1, 4), rng.choice(BLOOD_GROUPS),
+             "Allocated" if usn in allocated else "Pending")
+            for n, usn in enumerate(usns)
+        ])
+        _insert(cursor, """
+            INSERT INTO fees (usn, name, total_fee, paid, status, due_date)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (usn, f"Seed Student {n}", 85000, paid, "Paid" if paid == 85000 else "Pending", date.today() + timedelta(days=30))
+            for n, usn in enumerate(usns)
+            for paid in [rng.choice([0, 40000, 85000])]
+        ])
+
+        _insert(cursor, """
+            INSERT INTO room (room_no, no_of_beds, no_of_tables, no_of_chairs, no_of_fans, no_of_occupancy)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [(room_no, beds_per_room, beds_per_room, beds_per_room, 2, occupancy_by_room.get(room_no, 0))
+              for room_no in room_nos])
+        _insert(cursor, "INSERT INTO allocation (usn, room_no, bed_no, start_date) VALUES (%s, %s, %s, %s)",
+                [(usn, room_no, bed_no, date.today()) for usn, (room_no, bed_no) in plan])
+        occupied_by = {bed: usn for usn, bed in plan}
+        _insert(cursor, "INSERT INTO bed (room_no, bed_no, occupied_by) VALUES (%s, %s, %s)",
+                [(room_no, bed_no, occupied_by.get((room_no, bed_no))) for room_no, bed_no in beds])
+
+        room_of = {usn: room_no for usn, (room_no, _) in plan}
+        senders = sorted(allocated) or usns
+        _insert(cursor, """
+            INSERT INTO complaint (usn, room_no, type, description, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, [
+            (usn, room_of.get(usn), rng.choice(COMPLAINT_TYPES), "Seeded complaint", rng.choice(COMPLAINT_STATUSES),
+             f"{date.today() - timedelta(days=rng.randint(0, 365))} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00")
+            for usn in (rng.choice(senders) for _ in range(complaints))
+        ])
+        _insert(cursor, """
+            INSERT INTO leave_request (usn, room_no, from_date, to_date, reason, contact, warden_approval, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (usn, room_of.get(usn), start, start + timedelta(days=rng.randint(1, 7)), "Seeded leave", "9000000000",
+             rng.choice(LEAVE_STATUSES), f"{start - timedelta(days=2)} 10:00:00")
+            for usn in (rng.choice(senders) for _ in range(leaves))
+            for start in [date.today() - timedelta(days=rng.randint(0, 365))]
+        ])
+
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        "student": len(usns), "fees": len(usns), "room": len(room_nos), "bed": len(beds),
+        "allocation": len(plan), "complaint": complaints, "leave_request": leaves,
+    }
+
+
+def clear(conn):
+    """Remove every seeded row (student deletes cascade to fees/allocation/complaints/leaves)."""
+    cursor = conn.cursor()
+    conn.start_transaction()
+    try:
+        cursor.execute("DELETE FROM student WHERE usn LIKE %s", (SEED_PREFIX + "%",))
+        cursor.execute("DELETE FROM bed WHERE room_no >= %s", (SEED_ROOM_BASE,))
+        cursor.execute("DELETE FROM room WHERE room_no >= %s", (SEED_ROOM_BASE,))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def analyze(conn):
+    # refresh optimizer statistics so EXPLAIN sees the new table sizes
+    cursor = conn.cursor()
+    for table in ("student", "fees", "room", "bed", "allocation", "complaint", "leave_request", "notice"):
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the hostel database with test data")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--rooms", type=int, default=1500)
+    parser.add_argument("--beds-per-room", type=int, default=3)
+    parser.add_argument("--complaints", type=int, default=10000)
+    parser.add_argument("--leaves", type=int, default=10000)
+    parser.add_argument("--occupancy", type=float, default=0.8, help="fraction of beds to fill")
+    parser.add_argument("--clear", action="store_true", help="only remove previously seeded rows")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    if conn is None:
+        raise SystemExit("❌ Could not connect to MySQL")
+
+    try:
+        started = time.perf_counter()
+        clear(conn)
+        if not args.clear:
+            counts = seed(conn, args.students, args.rooms, args.beds_per_room, args.complaints, args.leaves, args.occupancy)
+            analyze(conn)
+            print("✅ Seeded " + ", ".join(f"{n} {table}" for table, n in counts.items()))
+        else:
+            print("✅ Seed data removed")
+        print(f"   took {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
@@ -0,0 +1,216 @@
+"""
+Signed, expiring session tokens.
+
+- /student-login and /warden-login issue a token  <payload b64>.<HMAC-SHA256 b64>
+  whose payload carries sub (usn / warden_id), role, iat, exp and a random jti
+- current_session / require_role(...) are FastAPI dependencies that verify the token
+  from "Authorization: Bearer <token>" purely in memory: no student / warden lookup
+- /logout puts the jti in the revoked_token table (migration 0003). Every worker keeps
+  a local copy of the unexpired revocations, refreshed every HOSTEL_REVOCATION_REFRESH
+  seconds, so checking it costs no query either; a logout made on another worker is
+  seen after at most one refresh
+
+HOSTEL_SESSION_SECRET must be set (and shared by every worker) in production. Without it
+a random secret is generated, so tokens stop working when the process restarts.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from async_database import get_connection, Error
+from logging_config import SAMPLED
+
+log = logging.getLogger(__name__)
+
+
+SESSION_TTL = int(os.environ.get("HOSTEL_SESSION_TTL", str(8 * 3600)))
+REVOCATION_REFRESH = float(os.environ.get("HOSTEL_REVOCATION_REFRESH", "30"))
+
+ROLES = ("student", "warden")
+
+SECRET_FROM_ENV = bool(os.environ.get("HOSTEL_SESSION_SECRET"))
+SECRET = (os.environ.get("HOSTEL_SESSION_SECRET") or secrets.token_hex(32)).encode("utf-8")
+
+
+class TokenError(Exception):
+    """Token is malformed, has a bad signature, has expired or was revoked."""
+
+
+class Session:
+    __slots__ = ("subject", "role", "issued_at", "expires_at", "jti")
+
+    def __init__(self, subject, role, issued_at, expires_at, jti):
+        self.subject = subject
+        self.role = role
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.jti = jti
+
+    def as_dict(self):
+        return {"subject": self.subject, "role": self.role, "issued_at": self.issued_at, "expires_at": self.expires_at}
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload_b64):
+    return _b64encode(hmac.new(SECRET, payload_b64.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(subject, role, ttl=SESSION_TTL):
+    """(token, expires_at) for a freshly logged-in student (usn) or warden (warden_id)."""
+    if role not in ROLES:
+        raise ValueError(f"Unknown role '{role}'")
+    now = int(time.time())
+    payload = {"sub": subject, "role": role, "iat": now, "exp": now + ttl, "jti": secrets.token_hex(12)}
+    payload_b64 = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return f"{payload_b64}.{_sign(payload_b64)}", payload["exp"]
+
+
+def verify_token(token):
+    """Session for a valid token; raises TokenError otherwise. No database access."""
+    try:
+        payload_b64, signature = token.split(".")
+        # non-ASCII text can't be a token of ours (and would make _sign / compare_digest raise)
+        valid = hmac.compare_digest(signature.encode("ascii"), _sign(payload_b64).encode("ascii"))
+    except (ValueError, TypeError, UnicodeError):
+        raise TokenError("Malformed token")
+    if not valid:
+        raise TokenError("Invalid token signature")
+
+    try:
+        payload = json.loads(_b64decode(payload_b64))
+        session = Session(payload["sub"], payload["role"], payload["iat"], payload["exp"], payload["jti"])
+    except (ValueError, KeyError, TypeError):
+        raise TokenError("Malformed token")
+
+    if session.expires_at <= time.time():
+        raise TokenError("Token expired")
+    if revocations.is_revoked(session.jti):
+        raise TokenError("Token revoked")
+    return session
+
+
+class RevocationList:
+    """Local copy of revoked_token (jti -> expires_at); only refresh() and revoke() query MySQL."""
+
+    def __init__(self):
+        self._revoked = {}
+        self._task = None
+
+        # stats
+        self._refreshes = 0
+        self._last_refresh = None
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+    async def revoke(self, conn, session):
+        cursor = await conn.cursor()
+        await cursor.execute(
+            "INSERT IGNORE INTO revoked_token (jti, subject, role, expires_at) VALUES (%s, %s, %s, %s)",
+            (session.jti, str(session.subject), session.role, session.expires_at),
+        )
+        await conn.commit()
+        await cursor.close()
+        self._revoked[session.jti] = session.expires_at
+
+    async def refresh(self):
+        """Reload unexpired revocations (and purge expired rows). False if no connection was available."""
+        conn = await get_connection()
+        if conn is None:
+            return False
+
+        now = int(time.time())
+        try:
+            cursor = await conn.cursor()
+            await cursor.execute("DELETE FROM revoked_token WHERE expires_at <= %s", (now,))
+            await conn.commit()
+            await cursor.execute("SELECT jti, expires_at FROM revoked_token")
+            rows = await cursor.fetchall()
+            await cursor.close()
+        finally:
+            await conn.close()
+
+        # keep local revocations the SELECT may have missed (revoke() racing this refresh)
+        revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+        revoked.update((jti, expires_at) for jti, expires_at in rows)
+        self._revoked = revoked
+        self._refreshes += 1
+        self._last_refresh = time.time()
+        return True
+
+    async def _refresh_loop(self, interval):
+        while True:
+            try:
+                await self.refresh()
+            except Error as e:
+                log.warning("Revocation list refresh failed: %s", e, extra=SAMPLED)
+            await asyncio.sleep(interval)
+
+    def start(self, interval=REVOCATION_REFRESH):
+        if not SECRET_FROM_ENV:
+            log.warning("HOSTEL_SESSION_SECRET is not set; using a random secret (sessions end on restart)")
+        if self._task is None and interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._refresh_loop(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "revoked": len(self._revoked),
+            "refreshes": self._refreshes,
+            "refresh_interval": REVOCATION_REFRESH,
+            "last_refresh": self._last_refresh,
+        }
+
+
+revocations = RevocationList()
+
+
+# ---- FastAPI dependencies ----
+
+def _unauthorized(message):
+    return HTTPException(status_code=401, detail=message, headers={"WWW-Authenticate": "Bearer"})
+
+
+async def current_session(authorization: Optional[str] = Header(None)):
+    """Depends(current_session) -> Session from the bearer token, or 401."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise _unauthorized("Missing bearer token")
+    try:
+        return verify_token(token.strip())
+    except TokenError as e:
+        raise _unauthorized(str(e))
+
+
+def require_role(*roles):
+    """Depends(require_role("warden")) -> Session whose role is one of `roles`, else 401 / 403."""
+    async def dependency(authorization: Optional[str] = Header(None)):
+        session = await current_session(authorization)
+        if session.role not in roles:
+            raise HTTPException(status_code=403, detail="Not allowed for this role")
+        return session
+    return dependency
@@ -0,0 +1,22 @@
+"""
+Every statement sent through executemany() must keep aiomysql's multi-row rewrite:
+with a SQL literal in VALUES it silently runs one INSERT per row instead.
+"""
+import pytest
+
+aiomysql_cursors = pytest.importorskip("aiomysql.cursors")
+
+import main
+
+
+BULK_INSERTS = {
+    "room": main.ROOM_INSERT_QUERY,
+    "bed": main.BED_INSERT_QUERY,
+    "student import": main.STUDENT_IMPORT_QUERY,
+    "fee import": main.FEE_IMPORT_QUERY,
+}
+
+
+@pytest.mark.parametrize("name", sorted(BULK_INSERTS))
+def test_bulk_insert_is_rewritten_to_multi_row(name):
+    assert aiomysql_cursors.RE_INSERT_VALUES.match(BULK_INSERTS[name]), f"{name} insert has literals in VALUES"
@@ -0,0 +1,64 @@
+"""Read-your-writes routing in ReplicaRouter (no MySQL needed: the replica is a stand-in)."""
+import replicas
+from replicas import ReplicaRouter, _caller
+
+
+class FakeReplica:
+    name = "replica:3307"
+
+    def __init__(self):
+        self.reads = 0
+
+    def usable(self, max_lag):
+        return True
+
+    def stats(self):
+        return {"name": self.name, "reads": self.reads}
+
+
+def _read(router, caller):
+    reset = _caller.set(caller)
+    try:
+        return router.pick()
+    finally:
+        _caller.reset(reset)
+
+
+def _write(router, caller):
+    reset = _caller.set(caller)
+    try:
+        router.note_write()
+    finally:
+        _caller.reset(reset)
+
+
+def test_reads_use_the_replica_without_recent_writes():
+    replica = FakeReplica()
+    router = ReplicaRouter([replica], read_your_writes=5)
+    assert _read(router, None) is replica
+
+
+def test_anonymous_write_sends_following_reads_to_the_primary(monkeypatch):
+    replica = FakeReplica()
+    router = ReplicaRouter([replica], read_your_writes=5)
+    now = [1000.0]
+    monkeypatch.setattr(replicas.time, "monotonic", lambda: now[0])
+
+    _write(router, None)
+    assert _read(router, None) is None
+    assert _read(router, "some-token") is None
+    assert router.stats()["anonymous_write_reads"] == 2
+
+    now[0] += 5
+    assert _read(router, None) is replica
+
+
+def test_session_write_only_pins_that_session(monkeypatch):
+    replica = FakeReplica()
+    router = ReplicaRouter([replica], read_your_writes=5)
+    monkeypatch.setattr(replicas.time, "monotonic", lambda: 1000.0)
+
+    _write(router, "token-a")
+    assert _read(router, "token-a") is None
+    assert _read(router, "token-b") is replica
+    assert _read(router, None) is replica
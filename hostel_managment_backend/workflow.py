@@ -0,0 +1,132 @@
+import os
+from datetime import timedelta
+
+
+# most IDs one bulk status call may touch
+BULK_STATUS_MAX = int(os.environ.get("HOSTEL_BULK_STATUS_MAX", "1000"))
+
+
+class WorkflowError(Exception):
+    """Bulk status change rejected before touching the database (bad status, no selection...)."""
+
+
+class StatusFlow:
+    """Where a workflow item's status lives and which values it may be set to."""
+
+    def __init__(self, kind, table, id_column, status_column, statuses, date_filter):
+        self.kind = kind
+        self.table = table
+        self.id_column = id_column
+        self.status_column = status_column
+        self.statuses = statuses
+        # (from_date, to_date) -> (SQL condition, params) on alias t
+        self.date_filter = date_filter
+
+
+def _leave_dates(from_date, to_date):
+    # leaves overlapping the range
+    return "t.from_date <= %s AND t.to_date >= %s", [to_date, from_date]
+
+
+def _complaint_dates(from_date, to_date):
+    # complaints raised within the range (whole days)
+    return "t.created_at >= %s AND t.created_at < %s", [from_date, to_date + timedelta(days=1)]
+
+
+LEAVE_FLOW = StatusFlow("leave", "leave_request", "leave_id", "warden_approval", ("Approved", "Rejected"), _leave_dates)
+COMPLAINT_FLOW = StatusFlow("complaint", "complaint", "complaint_id", "status", ("Pending", "In Progress", "Resolved"), _complaint_dates)
+
+
+def _placeholders(n):
+    return ", ".join(["%s"] * n)
+
+
+async def bulk_set_status(conn, flow, new_status, actor_id, ids=None, from_date=None, to_date=None,
+                          department=None, current_status=None):
+    """
+    Move every selected item to `new_status` in ONE transaction:
+
+    1️⃣ SELECT ... FOR UPDATE the selection (ids and/or filters) with each row's old status
+    2️⃣ one UPDATE ... WHERE id IN (...) for the rows whose status actually changes
+    3️⃣ one multi-row INSERT into activity_log, one audit row per changed item
+
+    Returns (results, changes): results is one {"id", "result", ...} per requested /
+    matched ID; changes is [(id, usn, old_status)] for the caller's after-commit hooks.
+    """
+    if new_status not in flow.statuses:
+        raise WorkflowError(f"Invalid status — use one of {list(flow.statuses)}")
+    if not ids and not (from_date or to_date or department or current_status):
+        raise WorkflowError("Give ids and/or at least one filter (from_date, to_date, department, current_status)")
+    ids = list(dict.fromkeys(ids or []))
+    if len(ids) > BULK_STATUS_MAX:
+        raise WorkflowError(f"At most {BULK_STATUS_MAX} ids per request")
+
+    where, params = [], []
+    if ids:
+        where.append(f"t.{flow.id_column} IN ({_placeholders(len(ids))})")
+        params += ids
+    if from_date or to_date:
+        condition, values = flow.date_filter(from_date or to_date, to_date or from_date)
+        where.append(condition)
+        params += values
+    if department:
+        where.append("s.department_name = %s")
+        params.append(department)
+    if current_status:
+        where.append(f"t.{flow.status_column} = %s")
+        params.append(current_status)
+
+    cursor = await conn.cursor()
+    await conn.start_transaction()
+    try:
+        await cursor.execute(
+            f"""
+            SELECT t.{flow.id_column}, t.usn, t.{flow.status_column}
+            FROM {flow.table} t
+            {"JOIN student s ON s.usn = t.usn" if department else ""}
+            WHERE {" AND ".join(where)}
+            ORDER BY t.{flow.id_column}
+            LIMIT {BULK_STATUS_MAX + 1}
+            FOR UPDATE OF t
+            """,
+            params,
+        )
+        rows = await cursor.fetchall()
+        if len(rows) > BULK_STATUS_MAX:
+            raise WorkflowError(f"Filters match more than {BULK_STATUS_MAX} items — narrow them down")
+
+        changes = [(item_id, usn, old) for item_id, usn, old in rows if old != new_status]
+
+        if changes:
+            changed_ids = [item_id for item_id, _, _ in changes]
+            await cursor.execute(
+                f"UPDATE {flow.table} SET {flow.status_column} = %s WHERE {flow.id_column} IN ({_placeholders(len(changed_ids))})",
+                [new_status] + changed_ids,
+            )
+            await cursor.executemany(
+                "INSERT INTO activity_log (user_type, user_id, action) VALUES (%s, %s, %s)",
+                [("Warden", str(actor_id), f"{flow.kind} {item_id} status {old} -> {new_status} (bulk)")
+                 for item_id, _, old in changes],
+            )
+
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    finally:
+        await cursor.close()
+
+    found = {item_id: (usn, old) for item_id, usn, old in rows}
+    results = []
+    for item_id in ids:
+        if item_id not in found:
+            results.append({"id": item_id, "result": "not_found", "message": "No such ID, or excluded by the filters"})
+    for item_id, usn, old in rows:
+        results.append({
+            "id": item_id,
+            "usn": usn,
+            "result": "unchanged" if old == new_status else "updated",
+            "old_status": old,
+            "status": new_status,
+        })
+    return results, changes